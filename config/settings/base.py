@@ -56,8 +56,10 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'pymentorat.metrics.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
+    'pymentorat.replica.ReplicaMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
@@ -70,7 +72,8 @@ ROOT_URLCONF = 'config.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # Django templates, timed for the metrics of the requests
+        'BACKEND': 'pymentorat.metrics.DjangoTemplates',
         'DIRS': [],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -102,6 +105,60 @@ def FILTERS_VERBOSE_LOOKUPS():
 
 IMPORT_EXPORT_USE_TRANSACTIONS = True
 
+# Number of processes rendering the bulk PDF exports (None: one per CPU, at most 4)
+PDF_EXPORT_PROCESSES = None
+
+# Cache of the rendered PDF files (None to disable it), and its maximum size in bytes
+PDF_CACHE_DIR = os.path.join(BASE_DIR, 'pdf_cache')
+PDF_CACHE_MAX_SIZE = 200 * 1024 * 1024
+
+# Cache shared by the processes of the server, holding the home page data
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.path.join(BASE_DIR, 'django_cache'),
+    }
+}
+
+# Files uploaded to and written by the background import and export jobs, kept JOB_FILES_MAX_AGE days
+# after the end of the job. A running job without progress for JOB_TIMEOUT seconds is failed.
+JOB_FILES_DIR = os.path.join(BASE_DIR, 'job_files')
+JOB_FILES_MAX_AGE = 7
+JOB_TIMEOUT = 30 * 60
+
+
+# The read-only views read from the 'replica' database when it is configured, except during the
+# seconds following a write of the same session
+DATABASE_ROUTERS = ['pymentorat.replica.ReplicaRouter']
+DATABASE_REPLICA = 'replica'
+DATABASE_REPLICA_PIN = 10
+
+# Budgets of the requests, the requests over them are logged as warnings by the metrics middleware
+METRICS_QUERY_BUDGET = 50
+METRICS_TIME_BUDGET = 1000  # milliseconds
+METRICS_VIEW_BUDGETS = {
+    'pymentorat:index': {'queries': 10, 'time': 300},
+}
+# Send the measures of each request in the Server-Timing header
+METRICS_SERVER_TIMING = True
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        # Only the requests over budget (WARNING), set the level to INFO to log the measures of every request
+        'pymentorat.metrics': {
+            'handlers': ['console'],
+            'level': 'WARNING',
+        },
+    },
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/2.1/ref/settings/#auth-password-validators
@@ -27,7 +27,13 @@ DATABASES = {
         'HOST': '',
         'PORT': '5432',
         'ATOMIC_REQUESTS': True,    #toute les requêtes DB sont inclues dans une transaction
-    }
+    },
+    # Réplique en lecture des vues en lecture seule, une copie SQLite suffit pour tester
+    # 'replica': {
+    #     'ENGINE': 'django.db.backends.sqlite3',
+    #     'NAME': os.path.join(BASE_DIR, 'replica.sqlite3'),
+    #     'TEST': {'MIRROR': 'default'},
+    # },
 }
 
 
@@ -40,5 +46,8 @@ DATABASES = {
 #     'debug_toolbar.middleware.DebugToolbarMiddleware'
 # ]
 
+# Journaliser les mesures de toutes les requêtes, pas seulement celles qui dépassent leur budget
+# LOGGING['loggers']['pymentorat.metrics']['level'] = 'INFO'
+
 # Specific url file for local dev environment
 ROOT_URLCONF = 'config.urls-local'
@@ -1,16 +1,90 @@
-from django.contrib import admin
-from import_export.admin import ImportExportModelAdmin
+from django import forms
+from django.contrib import admin, messages
+from django.core.exceptions import PermissionDenied
+from django.http import FileResponse, Http404
+from django.shortcuts import get_object_or_404, redirect
+from django.template.response import TemplateResponse
+from django.urls import path, reverse
+from django.utils.html import format_html
+
+from .contract_tree import RELATED as CONTRACT_RELATED
+from .importers import FORMATS, get_format
+from .jobs import enqueue_import, enqueue_export
+from .models import Discipline, Student, Teacher, Mentor, EDA, Contract, Convocation, Job
+from .models import ArchivedMentor, ArchivedEDA, ArchivedContract, ArchivedConvocation
+
+
+class ImportJobForm(forms.Form):
+    file = forms.FileField(label='Fichier')
+    file_format = forms.ChoiceField(label='Format', required=False,
+                                    choices=[('', "D'après l'extension")] + [(f, f.upper()) for f in FORMATS])
+    dry_run = forms.BooleanField(label='Test seulement', required=False)
+
+    def clean(self):
+        cleaned_data = super().clean()
+        if cleaned_data.get('file') and not cleaned_data.get('file_format'):
+            cleaned_data['file_format'] = get_format(cleaned_data['file'].name)
+            if cleaned_data['file_format'] is None:
+                raise forms.ValidationError("Format de fichier inconnu, choisissez-le.")
+        return cleaned_data
+
+
+class ExportJobForm(forms.Form):
+    file_format = forms.ChoiceField(label='Format', choices=[(f, f.upper()) for f in FORMATS])
+
+
+class JobImportExportAdmin(admin.ModelAdmin):
+    """ Admin whose imports and exports are queued as jobs, run by the run_jobs command """
+
+    # Key of the resource in importers.RESOURCES
+    job_resource = None
+    change_list_template = 'admin/pymentorat/job_import_export_change_list.html'
+
+    def get_urls(self):
+        info = self.model._meta.app_label, self.model._meta.model_name
+        return [
+            path('import/', self.admin_site.admin_view(self.import_view), name='%s_%s_import' % info),
+            path('export/', self.admin_site.admin_view(self.export_view), name='%s_%s_export' % info),
+        ] + super().get_urls()
+
+    def import_view(self, request):
+        if not self.has_add_permission(request):
+            raise PermissionDenied
+        form = ImportJobForm(request.POST or None, request.FILES or None)
+        if request.method == 'POST' and form.is_valid():
+            job = enqueue_import(self.job_resource, form.cleaned_data['file'], form.cleaned_data['file_format'],
+                                 request.user, form.cleaned_data['dry_run'])
+            messages.info(request, "L'import a été mis en attente.")
+            return redirect('admin:pymentorat_job_change', job.pk)
+        return self._job_form_response(request, form, "Importer")
+
+    def export_view(self, request):
+        if not self.has_view_permission(request):
+            raise PermissionDenied
+        form = ExportJobForm(request.POST or None)
+        if request.method == 'POST' and form.is_valid():
+            job = enqueue_export(self.job_resource, form.cleaned_data['file_format'], request.user)
+            messages.info(request, "L'export a été mis en attente.")
+            return redirect('admin:pymentorat_job_change', job.pk)
+        return self._job_form_response(request, form, "Exporter")
+
+    def _job_form_response(self, request, form, title):
+        context = dict(
+            self.admin_site.each_context(request),
+            opts=self.model._meta,
+            form=form,
+            title="{0} : {1}".format(title, self.model._meta.verbose_name_plural),
+        )
+        return TemplateResponse(request, 'admin/pymentorat/job_form.html', context)
 
-from .models import Discipline, Student, Teacher, Mentor, EDA, Contract, Convocation
-from .resources import StudentResource, TeacherResource, DisciplineResource
 
 @admin.register(Discipline)
-class DisciplineAdmin(ImportExportModelAdmin):
-    resource_class = DisciplineResource
+class DisciplineAdmin(JobImportExportAdmin):
+    job_resource = 'discipline'
 
 @admin.register(Student)
-class StudentAdmin(ImportExportModelAdmin):
-    resource_class = StudentResource
+class StudentAdmin(JobImportExportAdmin):
+    job_resource = 'student'
     list_display = [
         'name',
         'vorname',
@@ -20,8 +94,8 @@ class StudentAdmin(ImportExportModelAdmin):
     ordering = ['name']
 
 @admin.register(Teacher)
-class TeacherAdmin(ImportExportModelAdmin):
-    resource_class = TeacherResource
+class TeacherAdmin(JobImportExportAdmin):
+    job_resource = 'teacher'
     list_display = [
         'name',
         'vorname',
@@ -70,10 +144,138 @@ class MentorAdmin(admin.ModelAdmin):
 
 @admin.register(Contract)
 class ContractAdmin(admin.ModelAdmin):
-    pass
+    # Displayed by the label of each contract
+    list_select_related = CONTRACT_RELATED
 
 @admin.register(Convocation)
 class ConvocationAdmin(admin.ModelAdmin):
-    pass
+    # Displayed by the label of each convocation
+    list_select_related = ('contract__eda__student', 'contract__mentor__student')
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = [
+        'id',
+        'action',
+        'resource',
+        'status',
+        'rows',
+        'user',
+        'creation_date',
+        'finished_at',
+    ]
+    list_filter = (
+        'action',
+        'status',
+        'resource',
+    )
+    fields = [
+        'action',
+        'resource',
+        'file_format',
+        'dry_run',
+        'status',
+        'rows',
+        'message',
+        'user',
+        'creation_date',
+        'started_at',
+        'finished_at',
+        'download',
+    ]
+    readonly_fields = fields
+    ordering = ['-id']
+    change_form_template = 'admin/pymentorat/job_change_form.html'
+
+    def has_add_permission(self, request):
+        # The jobs are created by the import and export buttons of the other models
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def get_urls(self):
+        return [
+            path('<int:id_job>/download/', self.admin_site.admin_view(self.download_view),
+                 name='pymentorat_job_download'),
+        ] + super().get_urls()
+
+    def download(self, job):
+        if job.action != Job.EXPORT or job.status != Job.DONE or not job.path:
+            return '-'
+        return format_html('<a href="{0}">Télécharger</a>', reverse('admin:pymentorat_job_download', args=[job.pk]))
+    download.short_description = 'Fichier'
+
+    def download_view(self, request, id_job):
+        job = get_object_or_404(Job, pk=id_job, action=Job.EXPORT, status=Job.DONE)
+        if not self.has_view_permission(request, job):
+            raise PermissionDenied
+        try:
+            file = open(job.path, 'rb')
+        except FileNotFoundError:
+            raise Http404("Le fichier n'existe plus")
+        return FileResponse(file, as_attachment=True,
+                            filename="{0}_{1}.{2}".format(job.resource, job.pk, job.file_format))
+
 
+class ArchiveAdmin(admin.ModelAdmin):
+    """ Read-only admin of the rows moved to the archives by the archive_year command """
 
+    list_filter = ('year',)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+@admin.register(ArchivedMentor)
+class ArchivedMentorAdmin(ArchiveAdmin):
+    list_display = [
+        'student',
+        'discipline',
+        'year',
+        'inscription_date',
+        'is_active',
+    ]
+    list_select_related = ('student', 'discipline')
+    search_fields = ('student__name', 'student__vorname',)
+    ordering = ['-year', 'inscription_date']
+
+@admin.register(ArchivedEDA)
+class ArchivedEDAAdmin(ArchiveAdmin):
+    list_display = [
+        'student',
+        'discipline',
+        'year',
+        'inscription_date',
+        'is_active',
+    ]
+    list_select_related = ('student', 'discipline')
+    search_fields = ('student__name', 'student__vorname',)
+    ordering = ['-year', 'inscription_date']
+
+@admin.register(ArchivedContract)
+class ArchivedContractAdmin(ArchiveAdmin):
+    list_display = [
+        '__str__',
+        'year',
+        'begin_date',
+        'end_date',
+    ]
+    list_select_related = ('eda__student', 'mentor__student', 'discipline')
+    search_fields = ('eda__student__name', 'mentor__student__name',)
+    ordering = ['-year', 'begin_date']
+
+@admin.register(ArchivedConvocation)
+class ArchivedConvocationAdmin(ArchiveAdmin):
+    list_display = [
+        '__str__',
+        'date',
+        'time',
+    ]
+    list_filter = ('contract__year',)
+    ordering = ['-date', '-time']
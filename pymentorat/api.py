@@ -0,0 +1,183 @@
+from collections import namedtuple
+from datetime import datetime, time
+
+from django.contrib.auth.decorators import login_required
+from django.db.models import F
+from django.http import JsonResponse
+from django.utils.dateparse import parse_date, parse_datetime
+from django.utils.timezone import is_naive, make_aware
+
+from .filter import StudentFilter, TeacherFilter, MentorFilter, EDAFilter, ContractFilter, ConvocationFilter
+from .models import Student, Teacher, Mentor, EDA, Contract, Convocation
+from .pagination import KeysetPaginator
+from .replica import read_only
+
+# Number of rows of a page, and maximum number of rows a client can ask with ?limit=
+PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+# Model and filter of each resource, and its fields: name in the response and field read with values().
+# The fields named like their lookup are columns of the table, the others need a join and are
+# only returned when asked with ?fields=.
+Resource = namedtuple('Resource', ['model', 'filterset', 'fields'])
+
+TIMESTAMP_FIELDS = {
+    'id': 'id',
+    'creation_date': 'creation_date',
+    'modification_date': 'modification_date',
+}
+PERSON_FIELDS = {
+    'name': 'name',
+    'vorname': 'vorname',
+    'id_OD': 'id_OD',
+}
+HOLDER_FIELDS = {
+    'student_id': 'student_id',
+    'discipline_id': 'discipline_id',
+    'teacher_id': 'teacher_id',
+    'year': 'year',
+    'inscription_date': 'inscription_date',
+    'is_active': 'is_active',
+    'remark': 'remark',
+    'student_name': 'student__name',
+    'student_vorname': 'student__vorname',
+    'student_classe': 'student__classe',
+    'discipline_name': 'discipline__name',
+    'teacher_name': 'teacher__name',
+    'teacher_vorname': 'teacher__vorname',
+}
+
+RESOURCES = {
+    'students': Resource(Student, StudentFilter, dict(TIMESTAMP_FIELDS, **PERSON_FIELDS, **{
+        'classe': 'classe',
+        'email': 'email',
+        'portable': 'portable',
+        'tel': 'tel',
+    })),
+    'teachers': Resource(Teacher, TeacherFilter, dict(TIMESTAMP_FIELDS, **PERSON_FIELDS)),
+    'mentors': Resource(Mentor, MentorFilter, dict(TIMESTAMP_FIELDS, **HOLDER_FIELDS)),
+    'edas': Resource(EDA, EDAFilter, dict(TIMESTAMP_FIELDS, **HOLDER_FIELDS)),
+    'contracts': Resource(Contract, ContractFilter, dict(TIMESTAMP_FIELDS, **{
+        'eda_id': 'eda_id',
+        'mentor_id': 'mentor_id',
+        'discipline_id': 'discipline_id',
+        'contract_parent_id': 'contract_parent_id',
+        'year': 'year',
+        'begin_date': 'begin_date',
+        'end_date': 'end_date',
+        'remark': 'remark',
+        'eda_name': 'eda__student__name',
+        'eda_vorname': 'eda__student__vorname',
+        'eda_classe': 'eda__student__classe',
+        'mentor_name': 'mentor__student__name',
+        'mentor_vorname': 'mentor__student__vorname',
+        'mentor_classe': 'mentor__student__classe',
+        'discipline_name': 'discipline__name',
+    })),
+    'convocations': Resource(Convocation, ConvocationFilter, dict(TIMESTAMP_FIELDS, **{
+        'contract_id': 'contract_id',
+        'date': 'date',
+        'time': 'time',
+        'place': 'place',
+        'message': 'message',
+        'eda_name': 'contract__eda__student__name',
+        'eda_vorname': 'contract__eda__student__vorname',
+        'mentor_name': 'contract__mentor__student__name',
+        'mentor_vorname': 'contract__mentor__student__vorname',
+        'discipline_name': 'contract__discipline__name',
+    })),
+}
+
+
+class ApiError(Exception):
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def get_fields(resource, requested):
+    """ Return the {name: lookup} of the fields asked in ?fields= (comma separated), the columns of the table by default """
+    if not requested:
+        return {name: lookup for name, lookup in resource.fields.items() if name == lookup}
+    fields = {}
+    for name in requested.split(','):
+        name = name.strip()
+        if name not in resource.fields:
+            raise ApiError("Unknown field: {0}".format(name))
+        fields[name] = resource.fields[name]
+    return fields
+
+
+def parse_since(value):
+    """ Datetime of ?since=, an ISO date or datetime, in the current time zone if it has none """
+    since = parse_datetime(value)
+    if since is None:
+        day = parse_date(value)
+        if day is None:
+            raise ApiError("Invalid since: {0}".format(value))
+        since = datetime.combine(day, time())
+    return make_aware(since) if is_naive(since) else since
+
+
+def parse_limit(value):
+    if not value:
+        return PAGE_SIZE
+    if not value.isdigit() or not 1 <= int(value) <= MAX_PAGE_SIZE:
+        raise ApiError("The limit must be between 1 and {0}".format(MAX_PAGE_SIZE))
+    return int(value)
+
+
+def get_page(request, resource):
+    """ Filter the rows of the resource with the query string, and return the values of a page.
+
+    The rows only hold the fields asked with ?fields=, even when the ordering needs other fields.
+    """
+    fields = get_fields(resource, request.GET.get('fields'))
+    queryset = resource.model.objects.all()
+    # The rows are in the order of their key, or of their modification for a synchronisation
+    ordering = ('id',)
+    if request.GET.get('since'):
+        queryset = queryset.filter(modification_date__gte=parse_since(request.GET['since']))
+        ordering = ('modification_date', 'id')
+    year = request.GET.get('year')
+    if year and 'year' in resource.fields:
+        if not year.isdigit():
+            raise ApiError("Invalid year: {0}".format(year))
+        queryset = queryset.filter(year=year)
+
+    resource_filter = resource.filterset(request.GET, queryset=queryset)
+    if not resource_filter.is_valid():
+        raise ApiError(resource_filter.errors.get_json_data())
+
+    # The fields of the ordering are always read, the paginator needs them
+    columns = [name for name, lookup in fields.items() if name == lookup]
+    columns += [field for field in ordering if field not in fields]
+    joined = {name: F(lookup) for name, lookup in fields.items() if name != lookup}
+    rows = resource_filter.qs.values(*columns, **joined)
+    paginator = KeysetPaginator(rows, ordering, per_page=parse_limit(request.GET.get('limit')))
+    page = paginator.get_page(request.GET)
+    # Only the asked fields are returned, the cursors are already encoded
+    page.object_list = [{name: row[name] for name in fields} for row in page.object_list]
+    return page
+
+
+@login_required
+@read_only
+def api_list(request, resource):
+    """ Rows of a resource in JSON, filtered like the lists and paginated with the 'next' and 'previous' urls.
+
+    ?fields= selects the returned fields, ?since= the rows modified since a date or datetime.
+    """
+    try:
+        if resource not in RESOURCES:
+            raise ApiError("Unknown resource: {0}".format(resource), status=404)
+        page = get_page(request, RESOURCES[resource])
+    except ApiError as e:
+        return JsonResponse({'error': e.args[0]}, status=e.status)
+
+    return JsonResponse({
+        'results': page.object_list,
+        'next': request.build_absolute_uri('?' + page.next_query) if page.has_next else None,
+        'previous': request.build_absolute_uri('?' + page.previous_query) if page.has_previous else None,
+    })
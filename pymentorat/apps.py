@@ -4,3 +4,7 @@ CURRENT_YEAR=2021
 
 class PymentoratConfig(AppConfig):
     name = 'pymentorat'
+
+    def ready(self):
+        # Connect the signal receivers
+        from . import signals
@@ -0,0 +1,71 @@
+from django.db import transaction
+from django.db.models import Q
+
+from .models import Mentor, EDA, Contract, Convocation
+from .models import ArchivedMentor, ArchivedEDA, ArchivedContract, ArchivedConvocation
+
+# Number of rows copied or deleted at once
+BATCH_SIZE = 1000
+
+# Live model, archive model and filter selecting the rows of a year, in the order they are copied
+ARCHIVES = [
+    (Mentor, ArchivedMentor, 'year'),
+    (EDA, ArchivedEDA, 'year'),
+    (Contract, ArchivedContract, 'year'),
+    (Convocation, ArchivedConvocation, 'contract__year'),
+]
+
+
+class ArchiveError(Exception):
+    pass
+
+
+def get_crossing_contracts(year):
+    """ Contracts linking a row of the year to a row of another year, which would be broken by the archival """
+    in_year = Q(year=year)
+    linked_to_year = Q(mentor__year=year) | Q(eda__year=year) | Q(contract_parent__year=year)
+    linked_to_other = ~Q(mentor__year=year) | ~Q(eda__year=year) | (
+        Q(contract_parent__isnull=False) & ~Q(contract_parent__year=year))
+    return Contract.objects.filter((~in_year & linked_to_year) | (in_year & linked_to_other))
+
+
+def _batches(ids):
+    for i in range(0, len(ids), BATCH_SIZE):
+        yield ids[i:i + BATCH_SIZE]
+
+
+def archive_year(year, dry_run=False):
+    """ Move the mentors, EDAs, contracts and convocations of a year to the archive tables.
+
+    Everything is done in one transaction, rolled back with dry_run. Returns the number
+    of rows moved for each live model.
+    """
+    counts = {}
+    with transaction.atomic():
+        crossing = list(get_crossing_contracts(year).values_list('pk', flat=True)[:20])
+        if crossing:
+            raise ArchiveError("Contracts linked to another year: {0}".format(', '.join(map(str, crossing))))
+
+        for model, archive_model, year_lookup in ARCHIVES:
+            fields = [field.attname for field in archive_model._meta.concrete_fields]
+            rows = model.objects.filter(**{year_lookup: year}).order_by('pk').values(*fields)
+            batch = []
+            counts[model] = 0
+            for row in rows.iterator(chunk_size=BATCH_SIZE):
+                batch.append(archive_model(**row))
+                if len(batch) == BATCH_SIZE:
+                    archive_model.objects.bulk_create(batch)
+                    counts[model] += len(batch)
+                    batch = []
+            archive_model.objects.bulk_create(batch)
+            counts[model] += len(batch)
+
+        # Delete the dependent rows first, so that the deletions do not cascade
+        for model, archive_model, year_lookup in reversed(ARCHIVES):
+            ids = list(model.objects.filter(**{year_lookup: year}).values_list('pk', flat=True))
+            for batch in _batches(ids):
+                model.objects.filter(pk__in=batch).delete()
+
+        if dry_run:
+            transaction.set_rollback(True)
+    return counts
@@ -0,0 +1,184 @@
+import math
+import subprocess
+import time
+import tracemalloc
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, connections
+from django.test import Client
+from django.urls import URLPattern, reverse
+from django.utils.timezone import now
+
+from . import pdf_cache, urls
+from .apps import CURRENT_YEAR
+from .metrics import RequestMetrics
+from .models import Discipline, Student, Teacher, Mentor, EDA, Contract, Convocation
+
+# Number of timed requests by route
+REPEAT = 20
+
+
+class BenchmarkError(Exception):
+    pass
+
+
+def get_sample_ids():
+    """ Arguments of the routes: a contract of the current year following another one if possible,
+    with its EDA, mentor, student, teacher and convocation """
+    contracts = Contract.objects.select_related('eda').order_by('pk')
+    contract = (contracts.filter(year=CURRENT_YEAR, contract_parent__isnull=False).first()
+                or contracts.filter(year=CURRENT_YEAR).first() or contracts.first())
+    if contract is None:
+        raise BenchmarkError("The database has no contract to benchmark the views with")
+    convocation = contract.convocation_set.order_by('pk').first() or Convocation.objects.order_by('pk').first()
+    return {
+        'id_student': contract.eda.student_id,
+        'id_teacher': contract.eda.teacher_id,
+        'id_mentor': contract.mentor_id,
+        'id_eda': contract.eda_id,
+        'id_contract': contract.pk,
+        'id_convocation': convocation.pk if convocation is not None else None,
+        'resource': 'contracts',
+    }
+
+
+def get_routes(names=None, excluded=()):
+    """ (name, url) of the routes of pymentorat/urls.py, optionally only the routes named in names """
+    ids = get_sample_ids()
+    routes = []
+    for pattern in urls.urlpatterns:
+        # The included login pages are skipped
+        if not isinstance(pattern, URLPattern) or not pattern.name:
+            continue
+        name = '{0}:{1}'.format(urls.app_name, pattern.name)
+        if (names and pattern.name not in names and name not in names) or pattern.name in excluded:
+            continue
+        kwargs = {key: ids[key] for key in pattern.pattern.converters}
+        if None in kwargs.values():
+            continue
+        routes.append((name, reverse(name, kwargs=kwargs)))
+    return routes
+
+
+def percentile(values, percent):
+    """ Nearest-rank percentile of the values """
+    values = sorted(values)
+    return values[max(math.ceil(percent / 100 * len(values)) - 1, 0)]
+
+
+def _get(client, url):
+    """ Request the url and read the whole response, so that the streamed responses are rendered """
+    response = client.get(url)
+    if response.streaming:
+        for chunk in response.streaming_content:
+            pass
+    return response
+
+
+def clear_caches():
+    """ Empty the cache of the home page and the PDF cache, so that the next requests render their pages """
+    cache.clear()
+    pdf = pdf_cache.get_cache()
+    if pdf is not None:
+        pdf.clear()
+
+
+def _timings(durations):
+    return {
+        'p50_ms': round(percentile(durations, 50) * 1000, 2),
+        'p95_ms': round(percentile(durations, 95) * 1000, 2),
+        'max_ms': round(max(durations) * 1000, 2),
+    }
+
+
+def measure(client, url, repeat=REPEAT):
+    """ Request the url repeat times with empty caches (cold), then repeat times after a request
+    filling the caches (warm).
+
+    Returns the status, the number of queries of the last cold request, the cold and warm latencies
+    in milliseconds, and the peak of memory allocated by Python during one more cold request.
+    """
+    # Imports and first connection, outside of the measures
+    _get(client, url)
+    cold = []
+    for i in range(repeat):
+        clear_caches()
+        metrics = RequestMetrics()
+        with ExitStack() as stack:
+            for alias in connections:
+                stack.enter_context(connections[alias].execute_wrapper(metrics.execute))
+            start = time.perf_counter()
+            response = _get(client, url)
+            cold.append(time.perf_counter() - start)
+
+    warm = []
+    _get(client, url)
+    for i in range(repeat):
+        start = time.perf_counter()
+        _get(client, url)
+        warm.append(time.perf_counter() - start)
+
+    # Measured apart, tracing the allocations slows the requests down
+    clear_caches()
+    tracemalloc.start()
+    try:
+        _get(client, url)
+        current, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        'url': url,
+        'status': response.status_code,
+        'queries': metrics.queries,
+        'cold': _timings(cold),
+        'warm': _timings(warm),
+        'peak_memory_kb': round(peak / 1024),
+    }
+
+
+def get_commit():
+    """ Current git commit of the project, or None """
+    try:
+        result = subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=settings.BASE_DIR, capture_output=True,
+                                text=True, check=True)
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return result.stdout.strip()
+
+
+def run_benchmark(user, routes, repeat=REPEAT, progress=None):
+    """ Measure the routes as the user, and return the report of the run.
+
+    progress is called with the name of each route and its measures.
+    """
+    client = Client(raise_request_exception=False)
+    client.force_login(user)
+    results = {}
+    for name, url in routes:
+        results[name] = measure(client, url, repeat)
+        if progress is not None:
+            progress(name, results[name])
+    return {
+        'date': now().isoformat(),
+        'commit': get_commit(),
+        'database': connection.vendor,
+        'repeat': repeat,
+        'rows': {model._meta.model_name: model.objects.count()
+                 for model in (Discipline, Student, Teacher, Mentor, EDA, Contract, Convocation)},
+        'routes': results,
+    }
+
+
+def compare_reports(report, previous):
+    """ Yield (route, previous p50, p50, change in percent, previous queries, queries) for the routes of both
+    reports, from the cold latencies which measure the rendering """
+    for name, result in report['routes'].items():
+        before = previous['routes'].get(name)
+        if before is None or 'cold' not in before:
+            continue
+        p50, previous_p50 = result['cold']['p50_ms'], before['cold']['p50_ms']
+        change = (p50 - previous_p50) / previous_p50 * 100 if previous_p50 else 0
+        yield name, previous_p50, p50, change, before['queries'], result['queries']
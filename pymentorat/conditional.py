@@ -0,0 +1,103 @@
+import hashlib
+from datetime import date
+from functools import wraps
+
+from django.db.models import Count, Max
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import condition
+
+from .apps import CURRENT_YEAR
+from .models import Student, Mentor, EDA, Contract, Convocation
+from .pdf_cache import LAYOUT_VERSION
+
+# Change it when the templates of the detail pages change, to invalidate the pages kept by the browsers
+VERSION = 1
+
+# Rows displayed by a contract, relative to the contract
+CONTRACT_ROWS = ['', 'eda__student', 'mentor__student', 'discipline']
+# Rows displayed by a mentor or an EDA, relative to it
+HOLDER_ROWS = ['', 'student', 'teacher', 'discipline']
+
+
+def _join(prefix, path):
+    return '__'.join(part for part in (prefix, path) if part)
+
+
+def _validators(queryset, rows, counted=(), *extra):
+    """ (ETag, Last-Modified) of the page of the single row of queryset, from the latest modification
+    of the rows it displays and the number of rows of its reverse relations, read in one aggregate query.
+
+    rows are the paths of the displayed rows from the row of queryset ('' for the row itself), counted the
+    paths of its reverse relations, whose rows can be deleted. Returns None when the row does not exist.
+    """
+    aggregates = {'latest_{0}'.format(i): Max(_join(path, 'modification_date')) for i, path in enumerate(rows)}
+    aggregates.update({'count_{0}'.format(i): Count(path, distinct=True) for i, path in enumerate(counted)})
+    values = queryset.aggregate(**aggregates)
+    dates = [value for key, value in values.items() if key.startswith('latest_') and value is not None]
+    if not dates:
+        return None
+    parts = [str(value) for key, value in sorted(values.items())]
+    parts.extend(str(value) for value in extra)
+    return hashlib.sha256('|'.join(parts).encode('utf-8')).hexdigest(), max(dates)
+
+
+def student_validators(id_student):
+    """ The student, its mentors and EDAs, and the contracts of both with the other side of each contract """
+    rows = [''] + [_join(holder, path) for holder in ('mentor', 'eda') for path in HOLDER_ROWS]
+    rows += ['mentor__contract', 'mentor__contract__eda__student', 'mentor__contract__discipline',
+             'eda__contract', 'eda__contract__mentor__student', 'eda__contract__discipline']
+    counted = ['mentor', 'eda', 'mentor__contract', 'eda__contract']
+    return _validators(Student.objects.filter(pk=id_student), rows, counted, 'student', VERSION, CURRENT_YEAR)
+
+
+def mentor_validators(id_mentor):
+    """ The mentor and its contracts """
+    rows = HOLDER_ROWS + [_join('contract', path) for path in CONTRACT_ROWS]
+    return _validators(Mentor.objects.filter(pk=id_mentor), rows, ['contract'], 'mentor', VERSION, CURRENT_YEAR)
+
+
+def eda_validators(id_eda):
+    """ The EDA and its contracts """
+    rows = HOLDER_ROWS + [_join('contract', path) for path in CONTRACT_ROWS]
+    return _validators(EDA.objects.filter(pk=id_eda), rows, ['contract'], 'eda', VERSION, CURRENT_YEAR)
+
+
+def contract_validators(id_contract):
+    """ The rows printed on the contract, like pdf_cache.contract_key """
+    return _validators(Contract.objects.filter(pk=id_contract), CONTRACT_ROWS, (), 'contract', LAYOUT_VERSION)
+
+
+def convocation_validators(id_convocation):
+    """ The rows printed on the convocation, which is also dated from the day it is printed """
+    rows = ['', 'contract__eda__student', 'contract__mentor__student']
+    return _validators(Convocation.objects.filter(pk=id_convocation), rows, (), 'convocation', LAYOUT_VERSION,
+                       date.today().isoformat())
+
+
+def conditional_get(validators):
+    """ Answer the GET requests of the view with a 304 Not Modified, before calling it, when the page
+    did not change since the ETag or the Last-Modified date the browser holds.
+
+    validators is called with the arguments of the view and returns (ETag, Last-Modified), or None
+    when the object does not exist and the view answers itself. The browsers revalidate the page on
+    every request (Cache-Control: no-cache). Put it under read_only, to read the validators from the replica.
+    """
+
+    def decorator(view):
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return view(request, *args, **kwargs)
+            result = validators(*args, **kwargs)
+            if result is None:
+                return view(request, *args, **kwargs)
+            etag, last_modified = result
+            response = condition(etag_func=lambda *a, **k: etag,
+                                 last_modified_func=lambda *a, **k: last_modified)(view)(request, *args, **kwargs)
+            patch_cache_control(response, private=True, no_cache=True)
+            return response
+
+        return wrapper
+
+    return decorator
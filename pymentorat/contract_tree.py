@@ -0,0 +1,26 @@
+from .models import Contract
+
+# Maximum number of ids sent in a single IN clause (SQLite limits query parameters)
+BATCH_SIZE = 500
+
+# Related objects displayed with each contract
+RELATED = ('eda__student', 'mentor__student', 'discipline')
+
+
+def link_contract_tree(contracts, using):
+    """ Load the direct children of the already loaded contracts and link them in memory.
+
+    Every contract gets a ``children`` list with its direct children, ordered by begin date, so the
+    templates can list them without querying the database. Only the direct children are rendered,
+    the deeper descendants are not loaded.
+    """
+    by_id = {contract.pk: contract for contract in contracts}
+    for contract in contracts:
+        contract.children = []
+
+    parent_ids = list(by_id)
+    for i in range(0, len(parent_ids), BATCH_SIZE):
+        children = Contract.objects.using(using).filter(contract_parent_id__in=parent_ids[i:i + BATCH_SIZE])
+        for child in children.order_by('begin_date', 'pk'):
+            # Reuse the children which are also in the list, already loaded
+            by_id[child.contract_parent_id].children.append(by_id.get(child.pk, child))
@@ -0,0 +1,106 @@
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Q, Sum
+
+from .models import Mentor, EDA, Contract, DisciplineCounter
+
+# Counter field of each counted model, and the condition of the counted rows
+COUNTED = {
+    Mentor: ('nb_mentors', Q(is_active=True)),
+    EDA: ('nb_edas', Q(is_active=True)),
+    Contract: ('nb_contracts', Q(end_date=None)),
+}
+FIELDS = ('nb_mentors', 'nb_edas', 'nb_contracts')
+
+
+def is_counted(instance):
+    if isinstance(instance, Contract):
+        return instance.end_date is None
+    return instance.is_active
+
+
+def get_counted_key(instance):
+    """ Return the (discipline_id, year) counter of the row, or None if the row is not counted """
+    if not is_counted(instance):
+        return None
+    return instance.discipline_id, instance.year
+
+
+def get_saved_key(instance):
+    """ Return the counter of the row as it is in the database, before it is saved """
+    if instance.pk is None:
+        return None
+    model = type(instance)
+    field, condition = COUNTED[model]
+    row = model.objects.filter(condition, pk=instance.pk).values_list('discipline_id', 'year').first()
+    return tuple(row) if row is not None else None
+
+
+def add_to_counter(model, key, delta):
+    """ Add delta to the counter of the model for the (discipline_id, year) key """
+    field = COUNTED[model][0]
+    discipline_id, year = key
+    counters = DisciplineCounter.objects.filter(discipline_id=discipline_id, year=year)
+    if counters.update(**{field: F(field) + delta}):
+        return
+    try:
+        with transaction.atomic():
+            DisciplineCounter.objects.create(discipline_id=discipline_id, year=year, **{field: delta})
+    except IntegrityError:
+        # Created by a concurrent transaction in the meantime
+        counters.update(**{field: F(field) + delta})
+
+
+def move_counted_row(model, old_key, new_key):
+    """ Update the counters after a row moved from old_key to new_key, None meaning not counted """
+    if old_key == new_key:
+        return
+    if old_key is not None:
+        add_to_counter(model, old_key, -1)
+    if new_key is not None:
+        add_to_counter(model, new_key, 1)
+
+
+def get_totals(year):
+    """ Return the totals of the counters of a year, in a single query """
+    totals = DisciplineCounter.objects.filter(year=year).aggregate(**{field: Sum(field) for field in FIELDS})
+    return {field: value or 0 for field, value in totals.items()}
+
+
+def count_from_scratch():
+    """ Return the counters computed from the Mentor, EDA and Contract tables, keyed by (discipline_id, year) """
+    expected = {}
+    for model, (field, condition) in COUNTED.items():
+        rows = model.objects.filter(condition).order_by().values('discipline_id', 'year').annotate(n=Count('pk'))
+        for row in rows:
+            key = row['discipline_id'], row['year']
+            expected.setdefault(key, dict.fromkeys(FIELDS, 0))[field] = row['n']
+    return expected
+
+
+def reconcile_counters(fix=True):
+    """ Compare the counters with the tables and return the drifts as (key, field, stored, expected).
+
+    With fix, the counters are rebuilt from scratch in a transaction.
+    """
+    with transaction.atomic():
+        expected = count_from_scratch()
+        stored = {
+            (counter.discipline_id, counter.year): {field: getattr(counter, field) for field in FIELDS}
+            for counter in DisciplineCounter.objects.select_for_update()
+        }
+        drifts = []
+        zero = dict.fromkeys(FIELDS, 0)
+        for key in sorted(expected.keys() | stored.keys()):
+            for field in FIELDS:
+                stored_value = stored.get(key, zero)[field]
+                expected_value = expected.get(key, zero)[field]
+                if stored_value != expected_value:
+                    drifts.append((key, field, stored_value, expected_value))
+
+        if fix and drifts:
+            DisciplineCounter.objects.all().delete()
+            DisciplineCounter.objects.bulk_create([
+                DisciplineCounter(discipline_id=discipline_id, year=year, **values)
+                for (discipline_id, year), values in expected.items()
+            ])
+    return drifts
@@ -0,0 +1,62 @@
+from datetime import date
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F
+from django.utils.timezone import now
+
+from .apps import CURRENT_YEAR
+from .counters import get_totals
+from .models import Contract, Convocation
+
+# The upcoming convocations change every day, so the entries expire at the latest the next day
+TIMEOUT = 24 * 60 * 60
+
+# Names of the students of a contract, as values() expressions
+PERSON_FIELDS = {
+    'eda_name': F('eda__student__name'),
+    'eda_vorname': F('eda__student__vorname'),
+    'eda_classe': F('eda__student__classe'),
+    'mentor_name': F('mentor__student__name'),
+    'mentor_vorname': F('mentor__student__vorname'),
+    'mentor_classe': F('mentor__student__classe'),
+}
+
+
+def _key(year, day):
+    return 'pymentorat:dashboard:{0}:{1}'.format(year, day.isoformat())
+
+
+def build_dashboard(year=CURRENT_YEAR):
+    """ Compute the data of the home page, in three queries, as plain values which can be cached """
+    contracts = list(Contract.objects.filter(year=year, end_date=None).order_by('discipline').values(
+        'pk', 'begin_date', discipline_name=F('discipline__name'), **PERSON_FIELDS))
+    convocation_fields = {key: F('contract__' + field.name) for key, field in PERSON_FIELDS.items()}
+    convocations = list(Convocation.objects.filter(date__gt=now()).order_by('date', 'time').values(
+        'pk', 'date', 'time', 'place', **convocation_fields))
+    totals = get_totals(year)
+    return {
+        'nb_mentors': totals['nb_mentors'],
+        'nb_edas': totals['nb_edas'],
+        'contracts': contracts,
+        'nb_contracts': len(contracts),
+        'convocations': convocations,
+        'nbconvocations': len(convocations),
+    }
+
+
+def get_dashboard(year=CURRENT_YEAR):
+    """ Return the data of the home page from the cache, computing it on a miss """
+    key = _key(year, date.today())
+    data = cache.get(key)
+    if data is None:
+        data = build_dashboard(year)
+        cache.set(key, data, TIMEOUT)
+    return data
+
+
+def invalidate_dashboard(*years):
+    """ Remove the cached home page of the years (the current year by default) once the transaction is committed """
+    keys = [_key(year, date.today()) for year in set(years or [CURRENT_YEAR])]
+    # Deleted after the commit, so that a concurrent request cannot cache the data of before the change again
+    transaction.on_commit(lambda: cache.delete_many(keys))
@@ -0,0 +1,110 @@
+import csv
+import io
+
+from .importers import RESOURCES
+
+# Number of rows fetched from the database at once
+CHUNK_SIZE = 2000
+
+# Columns of the exported lists: header and field read with values_list
+HOLDER_COLUMNS = [
+    ('id', 'id'),
+    ('Nom', 'student__name'),
+    ('Prénom', 'student__vorname'),
+    ('Classe', 'student__classe'),
+    ('E-mail', 'student__email'),
+    ('Branche', 'discipline__name'),
+    ('Maître de branche', 'teacher__name'),
+    ('Prénom du maître', 'teacher__vorname'),
+    ('Année', 'year'),
+    ("Date d'inscription", 'inscription_date'),
+    ('Actif', 'is_active'),
+    ('Remarque', 'remark'),
+]
+MENTOR_COLUMNS = HOLDER_COLUMNS
+EDA_COLUMNS = HOLDER_COLUMNS
+CONTRACT_COLUMNS = [
+    ('id', 'id'),
+    ('Année', 'year'),
+    ('Branche', 'discipline__name'),
+    ('Nom EDA', 'eda__student__name'),
+    ('Prénom EDA', 'eda__student__vorname'),
+    ('Classe EDA', 'eda__student__classe'),
+    ('Nom mentor', 'mentor__student__name'),
+    ('Prénom mentor', 'mentor__student__vorname'),
+    ('Classe mentor', 'mentor__student__classe'),
+    ('Date de début', 'begin_date'),
+    ('Date de fin', 'end_date'),
+    ('Contrat parent', 'contract_parent_id'),
+    ('Remarque', 'remark'),
+]
+
+
+class Echo:
+    """ File-like object returning what is written to it, so that the CSV writer yields its lines """
+
+    def write(self, value):
+        return value
+
+
+def write_rows(output, file_format, headers, rows):
+    """ Write the headers and the rows to a binary file in CSV or XLSX, one row at a time """
+    if file_format == 'csv':
+        text = io.TextIOWrapper(output, encoding='utf-8-sig', newline='')
+        writer = csv.writer(text)
+        writer.writerow(headers)
+        for row in rows:
+            writer.writerow(row)
+        # Leave the binary file open for the caller
+        text.flush()
+        text.detach()
+    elif file_format == 'xlsx':
+        # Imported here, openpyxl is only needed for the XLSX files
+        from openpyxl import Workbook
+        workbook = Workbook(write_only=True)
+        sheet = workbook.create_sheet()
+        sheet.append(headers)
+        for row in rows:
+            sheet.append(row)
+        workbook.save(output)
+    else:
+        raise ValueError("Unsupported format: {0}".format(file_format))
+
+
+def export_file(kind, output, file_format, progress=None):
+    """ Export all the rows of a roster to a binary file, in the format read by the importers.
+
+    The rows are read from the database by chunks, the whole table is never held in memory.
+    progress is called with the number of exported rows after each chunk. Returns the number of rows.
+    """
+    resource = RESOURCES[kind]()
+    exported = 0
+
+    def rows():
+        nonlocal exported
+        for instance in resource.get_queryset().order_by('pk').iterator(chunk_size=CHUNK_SIZE):
+            yield resource.export_resource(instance)
+            exported += 1
+            if progress is not None and exported % CHUNK_SIZE == 0:
+                progress(exported)
+
+    write_rows(output, file_format, resource.get_export_headers(), rows())
+    return exported
+
+
+def get_headers(columns):
+    return [header for header, field in columns]
+
+
+def queryset_rows(queryset, columns):
+    """ Iterate over the values of the columns, fetched by chunks without building model instances """
+    fields = [field for header, field in columns]
+    return queryset.values_list(*fields).iterator(chunk_size=CHUNK_SIZE)
+
+
+def stream_csv(headers, rows):
+    """ Yield the lines of a CSV file, starting with a BOM so that spreadsheets detect UTF-8 """
+    writer = csv.writer(Echo())
+    yield '\ufeff' + writer.writerow(headers)
+    for row in rows:
+        yield writer.writerow(row)
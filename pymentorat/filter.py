@@ -1,6 +1,6 @@
 from django_filters import FilterSet
 
-from .models import Mentor, EDA, Student, Teacher, Contract
+from .models import Mentor, EDA, Student, Teacher, Contract, Convocation
 
 
 class StudentFilter(FilterSet):
@@ -53,3 +53,14 @@ class ContractFilter(FilterSet):
             'begin_date': ['gt'],
             'end_date': ['lt'],
         }
+
+
+class ConvocationFilter(FilterSet):
+    class Meta:
+        model = Convocation
+        fields = {
+            'contract__eda__student__name': ['icontains'],
+            'contract__mentor__student__name': ['icontains'],
+            'contract': ['exact'],
+            'date': ['gt', 'lt'],
+        }
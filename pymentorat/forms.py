@@ -6,6 +6,7 @@ from django.forms.utils import ErrorList
 from .models import Mentor, EDA, Student, Teacher, Contract, Convocation, Discipline
 
 from .apps import CURRENT_YEAR
+from .contract_tree import RELATED as CONTRACT_RELATED
 
 
 class ParagraphErrorList(ErrorList):
@@ -117,7 +118,15 @@ class EDAFormWithStudent(forms.ModelForm):
 
 
 # Forms for contracts
-class ContractForm(forms.ModelForm):
+class ContractParentForm(forms.ModelForm):
+    """ Base of the contract forms, loading the labels of the parent contracts in the same query """
+
+    def __init__(self, *args, **kwargs):
+        super(ContractParentForm, self).__init__(*args, **kwargs)
+        self.fields['contract_parent'].queryset = Contract.objects.select_related(*CONTRACT_RELATED)
+
+
+class ContractForm(ContractParentForm):
     """ Form to create a contract """
     class Meta:
         model = Contract
@@ -149,15 +158,17 @@ class ContractForm(forms.ModelForm):
         ]
 
 
-class ContractFormWithEDA(forms.ModelForm):
+class ContractFormWithEDA(ContractParentForm):
     """ Form to create a contract with data of an EDA """
 
     def __init__(self, *args, **kwargs):
         discipline_id = kwargs.pop('discipline_id', None)
         super(ContractFormWithEDA, self).__init__(*args, **kwargs)
 
+        mentors = Mentor.objects.select_related('student', 'discipline')
         if discipline_id:
-            self.fields['mentor'].queryset = Mentor.objects.filter(discipline_id=discipline_id, year=CURRENT_YEAR)
+            mentors = mentors.filter(discipline_id=discipline_id, year=CURRENT_YEAR)
+        self.fields['mentor'].queryset = mentors
 
     class Meta:
         model = Contract
@@ -189,7 +200,7 @@ class ContractFormWithEDA(forms.ModelForm):
         ]
 
 
-class ContractFormDuplicate(forms.ModelForm):
+class ContractFormDuplicate(ContractParentForm):
     """ Form to create a contract from a parent one """
 
     class Meta:
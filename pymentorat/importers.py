@@ -0,0 +1,128 @@
+import codecs
+import csv
+import os
+from itertools import islice
+
+import tablib
+
+from .dashboard import invalidate_dashboard
+from .resources import StudentResource, TeacherResource, DisciplineResource
+
+# Resource used to import each kind of roster
+RESOURCES = {
+    'student': StudentResource,
+    'teacher': TeacherResource,
+    'discipline': DisciplineResource,
+}
+
+FORMATS = ('csv', 'xlsx')
+
+# Number of rows imported in each transaction
+CHUNK_SIZE = 1000
+
+# Number of row errors kept in the report, the following ones are only counted
+MAX_ERRORS = 100
+
+
+class ImportReport:
+    """ Totals and row errors of a streaming import """
+
+    def __init__(self):
+        # Rows of the kept chunks by import type, and rows of the rolled back chunks in 'error'
+        self.totals = {'new': 0, 'update': 0, 'delete': 0, 'skip': 0, 'error': 0, 'invalid': 0}
+        self.rows = 0
+        self.committed_rows = 0
+        self.errors = []
+        self.error_count = 0
+
+    def add_error(self, line, message):
+        self.error_count += 1
+        if len(self.errors) < MAX_ERRORS:
+            self.errors.append((line, message))
+
+    def has_errors(self):
+        return self.error_count > 0
+
+
+def get_format(filename):
+    """ Return the format of the file from its extension, or None if it is not supported """
+    extension = os.path.splitext(filename)[1].lower().lstrip('.')
+    return extension if extension in FORMATS else None
+
+
+def read_rows(file, file_format):
+    """ Return the headers and an iterator over the rows of a binary CSV or XLSX file, read one row at a time """
+    if file_format == 'csv':
+        reader = csv.reader(codecs.getreader('utf-8-sig')(file))
+    elif file_format == 'xlsx':
+        # Imported here, openpyxl is only needed for the XLSX files
+        from openpyxl import load_workbook
+        workbook = load_workbook(file, read_only=True, data_only=True)
+        reader = workbook.active.iter_rows(values_only=True)
+    else:
+        raise ValueError("Unsupported format: {0}".format(file_format))
+
+    headers = next(reader, None)
+    if headers is None:
+        return [], iter(())
+    # The empty cells at the end of the header line of a spreadsheet are not columns
+    headers = [str(header).strip() for header in headers if header is not None]
+    width = len(headers)
+
+    def rows():
+        for row in reader:
+            row = list(row[:width])
+            if not any(value not in (None, '') for value in row):
+                continue
+            row.extend([None] * (width - len(row)))
+            yield row
+
+    return headers, rows()
+
+
+def import_file(kind, file, file_format, chunk_size=CHUNK_SIZE, dry_run=False, progress=None):
+    """ Import a CSV or XLSX roster chunk by chunk, each chunk in its own transaction.
+
+    Only one chunk of rows is held in memory. A chunk with an error is rolled back as a whole,
+    the other chunks are kept. progress is called with the report after each chunk.
+    """
+    resource = RESOURCES[kind]()
+    headers, rows = read_rows(file, file_format)
+    report = ImportReport()
+    # Line of the first row of the chunk in the file, after the header line
+    line = 2
+
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            break
+
+        result = resource.import_data(tablib.Dataset(*chunk, headers=headers), dry_run=dry_run,
+                                      use_transactions=True, rollback_on_validation_errors=True)
+        for error in result.base_errors:
+            report.add_error(None, str(error.error))
+        for number, errors in result.row_errors():
+            for error in errors:
+                report.add_error(line + number - 1, str(error.error))
+        for invalid_row in result.invalid_rows:
+            for field, messages in invalid_row.error_dict.items():
+                report.add_error(line + invalid_row.number - 1, "{0}: {1}".format(field, ' '.join(messages)))
+
+        report.rows += len(chunk)
+        if result.has_errors() or result.has_validation_errors():
+            report.totals['error'] += len(chunk)
+        else:
+            for import_type, count in result.totals.items():
+                report.totals[import_type] = report.totals.get(import_type, 0) + count
+            if not dry_run:
+                report.committed_rows += len(chunk)
+        line += len(chunk)
+
+        if progress is not None:
+            progress(report)
+
+    # The rows written by batches send no signal. The imported disciplines, students and teachers
+    # change no counter, but their names are shown on the home page
+    if report.committed_rows:
+        invalidate_dashboard()
+    return report
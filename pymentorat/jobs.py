@@ -0,0 +1,149 @@
+import os
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils.timezone import now
+
+from .exporters import export_file
+from .importers import import_file
+from .models import Job
+
+# Seconds without news of a running job after which its worker is considered dead, and days the
+# files of the finished jobs are kept, overridden by the settings JOB_TIMEOUT and JOB_FILES_MAX_AGE
+TIMEOUT = 30 * 60
+FILES_MAX_AGE = 7
+
+
+def get_jobs_dir():
+    return getattr(settings, 'JOB_FILES_DIR', os.path.join(settings.BASE_DIR, 'job_files'))
+
+
+def _new_path(file_format):
+    directory = get_jobs_dir()
+    os.makedirs(directory, exist_ok=True)
+    return os.path.join(directory, "{0}.{1}".format(uuid.uuid4().hex, file_format))
+
+
+def enqueue_import(resource, uploaded_file, file_format, user=None, dry_run=False):
+    """ Store the uploaded file and create the job importing it """
+    path = _new_path(file_format)
+    with open(path, 'wb') as output:
+        for chunk in uploaded_file.chunks():
+            output.write(chunk)
+    return Job.objects.create(action=Job.IMPORT, resource=resource, file_format=file_format, path=path,
+                              dry_run=dry_run, user=user)
+
+
+def enqueue_export(resource, file_format, user=None):
+    """ Create the job exporting a roster, its file is created when it runs """
+    return Job.objects.create(action=Job.EXPORT, resource=resource, file_format=file_format, user=user)
+
+
+def fail_stale_jobs():
+    """ Mark as failed the running jobs whose worker gave no news for JOB_TIMEOUT seconds: it crashed.
+
+    The workers record their progress in modification_date, see _set_rows. Returns the number of jobs.
+    """
+    limit = now() - timedelta(seconds=getattr(settings, 'JOB_TIMEOUT', TIMEOUT))
+    return Job.objects.filter(status=Job.RUNNING, modification_date__lt=limit).update(
+        status=Job.FAILED, finished_at=now(), modification_date=now(),
+        message="Interrompue : le worker ne donne plus de nouvelles")
+
+
+def cleanup_job_files():
+    """ Delete the files of the jobs finished for more than JOB_FILES_MAX_AGE days, and the old files
+    of the jobs directory which belong to no job. Returns the number of deleted files.
+    """
+    limit = now() - timedelta(days=getattr(settings, 'JOB_FILES_MAX_AGE', FILES_MAX_AGE))
+    deleted = 0
+    finished = Job.objects.filter(status__in=[Job.DONE, Job.FAILED], finished_at__lt=limit).exclude(path='')
+    for path in finished.values_list('path', flat=True):
+        try:
+            os.unlink(path)
+            deleted += 1
+        except FileNotFoundError:
+            pass
+    finished.update(path='')
+
+    # Uploaded files whose job was not created or was deleted
+    directory = get_jobs_dir()
+    if not os.path.isdir(directory):
+        return deleted
+    known = set(Job.objects.exclude(path='').values_list('path', flat=True))
+    with os.scandir(directory) as it:
+        for entry in it:
+            if entry.path in known or not entry.is_file():
+                continue
+            try:
+                if entry.stat().st_mtime < limit.timestamp():
+                    os.unlink(entry.path)
+                    deleted += 1
+            except FileNotFoundError:
+                pass
+    return deleted
+
+
+def claim_job():
+    """ Mark the oldest pending job as running and return it, or None if there is none.
+
+    The row is locked while it is claimed and the rows locked by the other workers are skipped,
+    so that several workers never run the same job. The jobs of the crashed workers are failed first.
+    """
+    fail_stale_jobs()
+    with transaction.atomic():
+        job = Job.objects.select_for_update(skip_locked=True).filter(status=Job.PENDING).order_by('id').first()
+        if job is None:
+            return None
+        job.status = Job.RUNNING
+        job.started_at = now()
+        job.save(update_fields=['status', 'started_at', 'modification_date'])
+    return job
+
+
+def _set_rows(job, rows):
+    # Update only the counter, the admin polls it while the job runs. The modification date tells
+    # fail_stale_jobs that the worker is alive.
+    Job.objects.filter(pk=job.pk).update(rows=rows, modification_date=now())
+
+
+def run_job(job):
+    """ Run a claimed job and record its result.
+
+    Returns False when the job is no longer running, failed by fail_stale_jobs or deleted meanwhile:
+    its result is not recorded.
+    """
+    try:
+        if job.action == Job.IMPORT:
+            with open(job.path, 'rb') as file:
+                report = import_file(job.resource, file, job.file_format, dry_run=job.dry_run,
+                                     progress=lambda report: _set_rows(job, report.rows))
+            job.rows = report.rows
+            lines = ["{0}: {1}".format(key, value) for key, value in report.totals.items()]
+            lines += ["ligne {0}: {1}".format(line or '-', message) for line, message in report.errors]
+            if report.error_count > len(report.errors):
+                lines.append("... {0} erreurs".format(report.error_count))
+            job.message = '\n'.join(lines)
+            job.status = Job.FAILED if report.has_errors() else Job.DONE
+        else:
+            job.path = _new_path(job.file_format)
+            with open(job.path, 'wb') as output:
+                job.rows = export_file(job.resource, output, job.file_format,
+                                       progress=lambda rows: _set_rows(job, rows))
+            job.status = Job.DONE
+    except Exception as e:
+        job.status = Job.FAILED
+        job.message = "{0}: {1}".format(type(e).__name__, e)
+    job.finished_at = now()
+    # Only if still running, not to overwrite the failure recorded by fail_stale_jobs
+    updated = Job.objects.filter(pk=job.pk, status=Job.RUNNING).update(
+        status=job.status, rows=job.rows, message=job.message, path=job.path, finished_at=job.finished_at,
+        modification_date=now())
+    if not updated and job.action == Job.EXPORT and job.path:
+        # The exported file belongs to no job
+        try:
+            os.unlink(job.path)
+        except FileNotFoundError:
+            pass
+    return updated > 0
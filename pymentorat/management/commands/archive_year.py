@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from pymentorat.apps import CURRENT_YEAR
+from pymentorat.archive import ArchiveError, archive_year
+
+
+class Command(BaseCommand):
+    help = "Move the mentors, EDAs, contracts and convocations of a past year to the archive tables"
+
+    def add_arguments(self, parser):
+        parser.add_argument('year', type=int, help="Year to archive")
+        parser.add_argument('--dry-run', action='store_true', help="Count the rows without moving them")
+
+    def handle(self, *args, **options):
+        year = options['year']
+        if year >= CURRENT_YEAR:
+            raise CommandError("Only the years before {0} can be archived".format(CURRENT_YEAR))
+
+        try:
+            counts = archive_year(year, options['dry_run'])
+        except ArchiveError as e:
+            raise CommandError(str(e))
+
+        for model, count in counts.items():
+            self.stdout.write("{0}: {1}".format(model._meta.verbose_name_plural, count))
+        if options['dry_run']:
+            self.stdout.write(self.style.SUCCESS("Dry run, nothing was moved"))
+        else:
+            self.stdout.write(self.style.SUCCESS("Year {0} archived".format(year)))
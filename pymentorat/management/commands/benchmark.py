@@ -0,0 +1,85 @@
+import json
+import tempfile
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.test.utils import override_settings
+
+from pymentorat.benchmark import REPEAT, BenchmarkError, compare_reports, get_routes, run_benchmark
+from pymentorat.synthetic import SyntheticDataError, generate
+
+
+class Command(BaseCommand):
+    help = ("Request every page of pymentorat/urls.py and report its p50/p95 latency with empty (cold) and "
+            "filled (warm) caches, number of queries and peak memory in JSON. Everything is done in a "
+            "transaction which is rolled back, with throwaway caches")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=0,
+                            help="Generate synthetic data with this number of students first (default: use the database)")
+        parser.add_argument('--years', type=int, default=5, help="Number of school years of synthetic data")
+        parser.add_argument('--seed', type=int, default=0, help="Seed of the random generator")
+        parser.add_argument('--repeat', type=int, default=REPEAT, help="Number of timed requests by page")
+        parser.add_argument('--route', action='append', default=[], help="Only request this route (repeatable)")
+        parser.add_argument('--exclude', action='append', default=[], help="Do not request this route (repeatable)")
+        parser.add_argument('--output', help="File the JSON report is written to (default: standard output)")
+        parser.add_argument('--compare', help="JSON report of a previous run to compare with")
+        parser.add_argument('--max-regression', type=float,
+                            help="Fail if a page is slower than in the compared report by more than this "
+                                 "percentage, or does more queries")
+
+    def handle(self, *args, **options):
+        if options['repeat'] < 1:
+            raise CommandError("--repeat must be positive")
+        previous = None
+        if options['compare']:
+            with open(options['compare']) as file:
+                previous = json.load(file)
+
+        with transaction.atomic():
+            try:
+                if options['rows']:
+                    generate(options['rows'], options['years'], options['seed'], progress=self.progress)
+                routes = get_routes(options['route'], options['exclude'])
+            except (SyntheticDataError, BenchmarkError) as e:
+                raise CommandError(str(e))
+            user = get_user_model().objects.create_superuser('benchmark', 'benchmark@example.com', None)
+            # The pages are cached in a throwaway cache and directory, the real caches would keep the
+            # pages of the rolled back rows
+            with tempfile.TemporaryDirectory() as pdf_dir, override_settings(
+                    ALLOWED_HOSTS=['testserver'], PDF_CACHE_DIR=pdf_dir,
+                    CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+                                        'LOCATION': 'pymentorat-benchmark'}}):
+                report = run_benchmark(user, routes, options['repeat'], progress=self.progress_route)
+            transaction.set_rollback(True)
+
+        if options['output']:
+            with open(options['output'], 'w') as file:
+                json.dump(report, file, indent=2)
+        else:
+            self.stdout.write(json.dumps(report, indent=2))
+
+        if previous is not None:
+            self.compare(report, previous, options['max_regression'])
+
+    def progress(self, name, count):
+        self.stderr.write("{0}: {1}".format(name, count))
+
+    def progress_route(self, name, result):
+        self.stderr.write("{0}: cold {1} ms (p95 {2} ms), warm {3} ms (p95 {4} ms), {5} queries".format(
+            name, result['cold']['p50_ms'], result['cold']['p95_ms'], result['warm']['p50_ms'],
+            result['warm']['p95_ms'], result['queries']))
+
+    def compare(self, report, previous, max_regression):
+        regressions = []
+        for name, before, after, change, queries_before, queries in compare_reports(report, previous):
+            line = "{0}: {1} -> {2} ms ({3:+.0f}%), {4} -> {5} queries".format(
+                name, before, after, change, queries_before, queries)
+            if max_regression is not None and (change > max_regression or queries > queries_before):
+                regressions.append(name)
+                self.stderr.write(self.style.ERROR(line))
+            else:
+                self.stderr.write(line)
+        if regressions:
+            raise CommandError("Regressions in: {0}".format(', '.join(regressions)))
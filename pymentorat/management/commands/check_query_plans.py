@@ -0,0 +1,65 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils.timezone import now
+
+from pymentorat.apps import CURRENT_YEAR
+from pymentorat.models import Student, Teacher, Mentor, EDA, Contract, Convocation
+from pymentorat.synthetic import SyntheticDataError, generate
+
+
+def get_checked_queries():
+    """ Main query of the listed views, with the table which must not be scanned sequentially """
+    return [
+        ('index: mentors', 'pymentorat_mentor', Mentor.objects.filter(year=CURRENT_YEAR, is_active=True)),
+        ('index: edas', 'pymentorat_eda', EDA.objects.filter(year=CURRENT_YEAR, is_active=True)),
+        ('index: contracts', 'pymentorat_contract',
+         Contract.objects.filter(year=CURRENT_YEAR, end_date=None).order_by('discipline')),
+        ('index: convocations', 'pymentorat_convocation',
+         Convocation.objects.filter(date__gt=now()).order_by('date', 'time')),
+        ('student_list', 'pymentorat_student', Student.objects.order_by('name', 'pk')[:51]),
+        ('teacher_list', 'pymentorat_teacher', Teacher.objects.order_by('name', 'pk')[:51]),
+        ('mentor_list', 'pymentorat_mentor',
+         Mentor.objects.filter(year=CURRENT_YEAR, is_active=True).with_nb_contracts()),
+        ('eda_list', 'pymentorat_eda',
+         EDA.objects.filter(year=CURRENT_YEAR, is_active=True).order_by('inscription_date', 'pk')[:51]),
+        ('contract_list', 'pymentorat_contract',
+         Contract.objects.filter(year=CURRENT_YEAR).order_by('begin_date', 'pk')[:51]),
+    ]
+
+
+class Command(BaseCommand):
+    help = ("Fill the database with synthetic rows in a transaction which is rolled back, "
+            "and fail if the main query of a listed view scans its table sequentially (PostgreSQL only)")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=20000, help="Number of synthetic students")
+        parser.add_argument('--years', type=int, default=20, help="Number of school years of synthetic data")
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError("The query plans can only be checked on PostgreSQL")
+
+        failures = []
+        with transaction.atomic():
+            try:
+                generate(options['rows'], options['years'])
+            except SyntheticDataError as e:
+                raise CommandError(str(e))
+            with connection.cursor() as cursor:
+                for model in (Student, Teacher, Mentor, EDA, Contract, Convocation):
+                    cursor.execute('ANALYZE {0}'.format(connection.ops.quote_name(model._meta.db_table)))
+
+            for label, table, queryset in get_checked_queries():
+                plan = queryset.explain()
+                if 'Seq Scan on {0}'.format(table) in plan:
+                    failures.append(label)
+                    self.stdout.write(self.style.ERROR("{0}: sequential scan on {1}".format(label, table)))
+                    self.stdout.write(plan)
+                else:
+                    self.stdout.write("{0}: ok".format(label))
+
+            transaction.set_rollback(True)
+
+        if failures:
+            raise CommandError("Sequential scans in: {0}".format(', '.join(failures)))
+        self.stdout.write(self.style.SUCCESS("All the query plans use an index"))
@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand
+from django.utils.timezone import now
+
+from pymentorat.apps import CURRENT_YEAR
+from pymentorat.models import Contract, Convocation
+from pymentorat.pdf_export import stream_documents
+
+
+class Command(BaseCommand):
+    help = "Export the contracts of a year or the upcoming convocations to a ZIP archive or a single PDF"
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=['contracts', 'convocations'])
+        parser.add_argument('output', help="Path of the file to write")
+        parser.add_argument('--format', dest='output_format', choices=['zip', 'pdf'], default='zip')
+        parser.add_argument('--year', type=int, default=CURRENT_YEAR, help="Year of the contracts")
+        parser.add_argument('--open', action='store_true', help="Only export the contracts which are not closed")
+        parser.add_argument('--id', type=int, action='append', dest='ids', help="Only export these documents")
+        parser.add_argument('--processes', type=int, help="Number of rendering processes")
+
+    def handle(self, *args, **options):
+        if options['kind'] == 'contracts':
+            kind = 'contract'
+            documents = Contract.objects.filter(year=options['year']).order_by('begin_date')
+            if options['open']:
+                documents = documents.filter(end_date=None)
+            documents = documents.select_related('eda__student', 'mentor__student', 'discipline')
+        else:
+            kind = 'convocation'
+            documents = Convocation.objects.filter(date__gt=now()).order_by('date', 'time')
+            documents = documents.select_related('contract__eda__student', 'contract__mentor__student')
+        if options['ids']:
+            documents = documents.filter(pk__in=options['ids'])
+
+        with open(options['output'], 'wb') as output:
+            for chunk in stream_documents(kind, documents.iterator(), options['output_format'],
+                                          options['processes']):
+                output.write(chunk)
+
+        self.stdout.write(self.style.SUCCESS("{0} written".format(options['output'])))
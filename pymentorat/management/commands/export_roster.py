@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from pymentorat.exporters import export_file
+from pymentorat.importers import RESOURCES, FORMATS, get_format
+
+
+class Command(BaseCommand):
+    help = "Export the students, teachers or disciplines to a CSV or XLSX file"
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=sorted(RESOURCES))
+        parser.add_argument('output', help="Path of the file to write")
+        parser.add_argument('--format', dest='file_format', choices=FORMATS,
+                            help="Format of the file, from its extension by default")
+
+    def handle(self, *args, **options):
+        file_format = options['file_format'] or get_format(options['output'])
+        if file_format is None:
+            raise CommandError("Unknown format, use --format")
+
+        with open(options['output'], 'wb') as output:
+            rows = export_file(options['kind'], output, file_format)
+
+        self.stdout.write(self.style.SUCCESS("{0} rows written to {1}".format(rows, options['output'])))
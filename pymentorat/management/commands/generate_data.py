@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from pymentorat.synthetic import SyntheticDataError, generate
+
+
+class Command(BaseCommand):
+    help = "Fill the database with synthetic students, teachers, mentors, EDAs, contracts and convocations"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=10000,
+                            help="Number of synthetic students, the other tables are sized from it (1000 to 1000000)")
+        parser.add_argument('--years', type=int, default=5, help="Number of school years of synthetic data")
+        parser.add_argument('--seed', type=int, default=0, help="Seed of the random generator")
+
+    def handle(self, *args, **options):
+        if options['rows'] < 1 or options['years'] < 1:
+            raise CommandError("--rows and --years must be positive")
+        try:
+            with transaction.atomic():
+                generate(options['rows'], options['years'], options['seed'], progress=self.progress)
+        except SyntheticDataError as e:
+            raise CommandError(str(e))
+        self.stdout.write(self.style.SUCCESS("Synthetic data generated"))
+
+    def progress(self, name, count):
+        self.stdout.write("{0}: {1}".format(name, count))
@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from pymentorat.importers import RESOURCES, FORMATS, CHUNK_SIZE, get_format, import_file
+
+
+class Command(BaseCommand):
+    help = "Import a CSV or XLSX file of students, teachers or disciplines, by chunks of rows"
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=sorted(RESOURCES))
+        parser.add_argument('path', help="Path of the file to import")
+        parser.add_argument('--format', dest='file_format', choices=FORMATS,
+                            help="Format of the file, from its extension by default")
+        parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE, help="Number of rows per transaction")
+        parser.add_argument('--dry-run', action='store_true', help="Check the file without saving it")
+
+    def handle(self, *args, **options):
+        file_format = options['file_format'] or get_format(options['path'])
+        if file_format is None:
+            raise CommandError("Unknown format, use --format")
+
+        def progress(report):
+            self.stdout.write("{0} rows imported".format(report.rows))
+
+        with open(options['path'], 'rb') as file:
+            report = import_file(options['kind'], file, file_format, options['chunk_size'],
+                                 options['dry_run'], progress)
+
+        for line, message in report.errors:
+            self.stdout.write(self.style.ERROR("line {0}: {1}".format(line or '-', message)))
+        if report.error_count > len(report.errors):
+            self.stdout.write(self.style.ERROR("... {0} errors".format(report.error_count)))
+        self.stdout.write(', '.join("{0}: {1}".format(key, value) for key, value in report.totals.items()))
+        if report.has_errors():
+            raise CommandError("{0} of {1} rows imported".format(report.committed_rows, report.rows))
+        if options['dry_run']:
+            self.stdout.write(self.style.SUCCESS("{0} rows checked".format(report.rows)))
+        else:
+            self.stdout.write(self.style.SUCCESS("{0} rows imported".format(report.committed_rows)))
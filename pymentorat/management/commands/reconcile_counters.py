@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from pymentorat.counters import reconcile_counters
+
+
+class Command(BaseCommand):
+    help = "Rebuild the discipline counters from the mentors, EDAs and contracts, and report the drifts"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--check', action='store_true', help="Only report the drifts, without fixing them")
+
+    def handle(self, *args, **options):
+        drifts = reconcile_counters(fix=not options['check'])
+        for (discipline_id, year), field, stored, expected in drifts:
+            self.stdout.write(self.style.WARNING("discipline {0}, year {1}, {2}: {3} instead of {4}".format(
+                discipline_id, year, field, stored, expected)))
+        if not drifts:
+            self.stdout.write(self.style.SUCCESS("The counters are exact"))
+        elif options['check']:
+            raise CommandError("{0} drifts".format(len(drifts)))
+        else:
+            self.stdout.write(self.style.SUCCESS("{0} drifts fixed".format(len(drifts))))
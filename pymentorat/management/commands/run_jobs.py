@@ -0,0 +1,40 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from pymentorat.jobs import claim_job, cleanup_job_files, run_job
+
+
+# Seconds between two cleanups of the old job files
+CLEANUP_INTERVAL = 60 * 60
+
+
+class Command(BaseCommand):
+    help = "Run the pending import and export jobs, waiting for new ones unless --once is given"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help="Stop when there is no pending job")
+        parser.add_argument('--sleep', type=float, default=2, help="Seconds between two checks for new jobs")
+
+    def handle(self, *args, **options):
+        last_cleanup = None
+        while True:
+            if last_cleanup is None or time.monotonic() - last_cleanup > CLEANUP_INTERVAL:
+                deleted = cleanup_job_files()
+                if deleted:
+                    self.stdout.write("Deleted {0} old job files".format(deleted))
+                last_cleanup = time.monotonic()
+
+            job = claim_job()
+            if job is None:
+                if options['once']:
+                    break
+                time.sleep(options['sleep'])
+                continue
+
+            self.stdout.write("Running job {0}: {1}".format(job.pk, job))
+            if not run_job(job):
+                self.stdout.write(self.style.ERROR("Job {0}: no longer running, result discarded".format(job.pk)))
+                continue
+            style = self.style.SUCCESS if job.status == job.DONE else self.style.ERROR
+            self.stdout.write(style("Job {0}: {1}, {2} rows".format(job.pk, job.get_status_display(), job.rows)))
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from pymentorat.apps import CURRENT_YEAR
+from pymentorat.models import Contract
+from pymentorat.pdf_cache import get_cache, contract_key
+from pymentorat.pdf_export import render_documents
+
+
+class Command(BaseCommand):
+    help = "Render the contracts of a year which are not in the PDF cache yet"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--year', type=int, default=CURRENT_YEAR, help="Year of the contracts")
+        parser.add_argument('--processes', type=int, help="Number of rendering processes")
+
+    def handle(self, *args, **options):
+        cache = get_cache()
+        if cache is None:
+            raise CommandError("The PDF cache is disabled (PDF_CACHE_DIR)")
+
+        contracts = Contract.objects.filter(year=options['year']).select_related(
+            'eda__student', 'mentor__student', 'discipline')
+        missing = [contract for contract in contracts.iterator() if cache.get(contract_key(contract)) is None]
+
+        rendered = render_documents('contract', missing, options['processes'])
+        for contract, (filename, data) in zip(missing, rendered):
+            cache.put(contract_key(contract), [data], evict=False)
+        cache.evict()
+
+        self.stdout.write(self.style.SUCCESS("{0} contracts rendered".format(len(missing))))
@@ -0,0 +1,230 @@
+import re
+from collections import deque, namedtuple
+from datetime import date
+
+from django.conf import settings
+from django.db import transaction
+
+from .apps import CURRENT_YEAR
+from .models import Mentor, EDA, Contract
+
+# Default number of open contracts a mentor can have
+MAX_CONTRACTS = 2
+
+# Weights of the cost of a pair, the engine minimizes the total cost.
+# They are integers, so that the costs of the paths compared by the solver are exact.
+SAME_LEVEL_COST = 300       # mentor in the same year as the EDA
+LEVEL_GAP_COST = 50         # by year of difference beyond the next one
+UNKNOWN_LEVEL_COST = 100    # class which cannot be parsed
+OTHER_SECTION_COST = 30     # different section (C, M, ...)
+LOAD_COST = 100             # by contract the mentor already has
+WAITING_BONUS = 1           # by day the EDA has been waiting, serves the oldest requests first
+
+Proposal = namedtuple('Proposal', ['eda', 'mentor', 'cost'])
+
+CLASSE_RE = re.compile(r'^\s*(\d)\s*([A-Za-z]*)')
+
+
+def parse_classe(classe):
+    """ Return the (year, section) of a class like '2M3', or (None, '') if it cannot be parsed """
+    match = CLASSE_RE.match(classe or '')
+    if match is None:
+        return None, ''
+    return int(match.group(1)), match.group(2).upper()
+
+
+def get_pair_cost(eda_class, mentor_class, mentor_load):
+    """ Cost of giving a mentor with mentor_load open contracts to an EDA, from their parsed classes.
+
+    Returns None if the mentor is in a lower year than the EDA.
+    """
+    eda_level, eda_section = eda_class
+    mentor_level, mentor_section = mentor_class
+    if eda_level is None or mentor_level is None:
+        cost = UNKNOWN_LEVEL_COST
+    elif mentor_level < eda_level:
+        return None
+    elif mentor_level == eda_level:
+        cost = SAME_LEVEL_COST
+    else:
+        cost = LEVEL_GAP_COST * (mentor_level - eda_level - 1)
+    if eda_section and mentor_section and eda_section != mentor_section:
+        cost += OTHER_SECTION_COST
+    return cost + LOAD_COST * mentor_load
+
+
+def get_waiting_cost(waiting_days):
+    """ Cost of an EDA waiting for waiting_days, lower for the oldest requests """
+    return -WAITING_BONUS * waiting_days
+
+
+def solve_transport(unit_costs, capacities, costs):
+    """ Send as many units as possible from the row groups to the column groups, at the minimum total cost.
+
+    unit_costs[r] lists the costs of the successive units of the row group r, in non-decreasing order.
+    capacities[c] is the number of units the column group c can take, and costs[r][c] the cost of a unit
+    going from r to c (None if forbidden). Returns the number of units sent from r to c as flow[r][c].
+
+    Successive shortest paths: the units are added one at a time along the cheapest path of the residual
+    graph, which may move units already sent to other column groups. Grouping the interchangeable EDAs
+    and mentor places keeps the graph small whatever the number of rows.
+    """
+    nb_rows, nb_columns = len(unit_costs), len(capacities)
+    source, sink = 0, nb_rows + nb_columns + 1
+    sent = [0] * nb_rows
+    received = [0] * nb_columns
+    flow = [[0] * nb_columns for r in range(nb_rows)]
+
+    def edges(node):
+        """ Yield the (next node, cost) of the residual edges leaving node """
+        if node == source:
+            for r in range(nb_rows):
+                if sent[r] < len(unit_costs[r]):
+                    yield r + 1, unit_costs[r][sent[r]]
+        elif node <= nb_rows:
+            r = node - 1
+            for c, cost in enumerate(costs[r]):
+                if cost is not None:
+                    yield nb_rows + 1 + c, cost
+        elif node != sink:
+            c = node - nb_rows - 1
+            if received[c] < capacities[c]:
+                yield sink, 0
+            for r in range(nb_rows):
+                if flow[r][c]:
+                    yield r + 1, -costs[r][c]
+
+    while True:
+        # Cheapest path from the source to the sink (Bellman-Ford with a queue, the costs may be negative)
+        distance = [None] * (sink + 1)
+        previous = [None] * (sink + 1)
+        distance[source] = 0
+        queue = deque([source])
+        queued = {source}
+        while queue:
+            node = queue.popleft()
+            queued.discard(node)
+            for next_node, cost in edges(node):
+                if distance[next_node] is None or distance[node] + cost < distance[next_node]:
+                    distance[next_node] = distance[node] + cost
+                    previous[next_node] = node
+                    if next_node not in queued and next_node != sink:
+                        queue.append(next_node)
+                        queued.add(next_node)
+        if distance[sink] is None:
+            return flow
+
+        # Send one unit along the path
+        node = sink
+        while node != source:
+            before = previous[node]
+            if node == sink:
+                received[before - nb_rows - 1] += 1
+            elif before == source:
+                sent[node - 1] += 1
+            elif before <= nb_rows:
+                flow[before - 1][node - nb_rows - 1] += 1
+            else:
+                # The unit previously sent from the row group to this column group goes elsewhere
+                flow[node - 1][before - nb_rows - 1] -= 1
+            node = before
+
+
+def get_waiting_edas(year=CURRENT_YEAR):
+    """ Active EDAs of the year without an open contract """
+    return EDA.objects.waiting().filter(year=year)
+
+
+def get_max_contracts():
+    return getattr(settings, 'MATCHING_MAX_CONTRACTS', MAX_CONTRACTS)
+
+
+def _match_discipline(edas, slots, today):
+    """ Best assignment of the EDAs of a discipline, sorted by inscription date, to the places of its mentors """
+    # The EDAs of a class are interchangeable, except that the ones waiting for the longest are served first
+    eda_groups = {}
+    for eda in edas:
+        eda_groups.setdefault(parse_classe(eda.student.classe), []).append(eda)
+    # The free places of the mentors are interchangeable if they have the same class and the same load
+    slot_groups = {}
+    for mentor, load in slots:
+        slot_groups.setdefault((parse_classe(mentor.student.classe), load), []).append(mentor)
+
+    eda_classes = list(eda_groups)
+    slot_keys = list(slot_groups)
+    unit_costs = [[get_waiting_cost((today - eda.inscription_date).days) for eda in eda_groups[eda_class]]
+                  for eda_class in eda_classes]
+    costs = [[get_pair_cost(eda_class, mentor_class, load) for mentor_class, load in slot_keys]
+             for eda_class in eda_classes]
+    flow = solve_transport(unit_costs, [len(slot_groups[key]) for key in slot_keys], costs)
+
+    proposals = []
+    free_mentors = [iter(slot_groups[key]) for key in slot_keys]
+    for r, eda_class in enumerate(eda_classes):
+        waiting_edas = iter(eda_groups[eda_class])
+        for c in sorted(range(len(slot_keys)), key=lambda c: costs[r][c] if costs[r][c] is not None else 0):
+            for unit in range(flow[r][c]):
+                eda = next(waiting_edas)
+                cost = costs[r][c] + get_waiting_cost((today - eda.inscription_date).days)
+                proposals.append(Proposal(eda, next(free_mentors[c]), cost))
+    return proposals
+
+
+def propose_matching(year=CURRENT_YEAR, max_contracts=None):
+    """ Propose mentors for the waiting EDAs of a year, in two queries.
+
+    A mentor is only given to EDAs of its discipline, in its capacity of max_contracts open contracts.
+    The assignment minimizes the total cost of the pairs, see get_pair_cost.
+    """
+    if max_contracts is None:
+        max_contracts = get_max_contracts()
+    today = date.today()
+
+    edas_by_discipline = {}
+    for eda in get_waiting_edas(year).select_related('student', 'discipline').order_by('inscription_date', 'pk'):
+        edas_by_discipline.setdefault(eda.discipline_id, []).append(eda)
+
+    slots_by_discipline = {}
+    mentors = Mentor.objects.filter(year=year, is_active=True, discipline__in=list(edas_by_discipline))
+    for mentor in mentors.with_nb_contracts().order_by('pk'):
+        # One slot by free place, the following slots of a mentor cost more
+        for load in range(mentor.nb_open_contracts, max_contracts):
+            slots_by_discipline.setdefault(mentor.discipline_id, []).append((mentor, load))
+
+    proposals = []
+    for discipline_id, edas in edas_by_discipline.items():
+        slots = slots_by_discipline.get(discipline_id)
+        if slots:
+            proposals.extend(_match_discipline(edas, slots, today))
+    proposals.sort(key=lambda proposal: (proposal.eda.discipline.name, proposal.eda.inscription_date))
+    return proposals
+
+
+def create_contracts(pairs, year=CURRENT_YEAR, max_contracts=None):
+    """ Create the contracts of the (eda_id, mentor_id) pairs in a transaction, and return them.
+
+    The pairs which are no longer valid (EDA already matched, mentor full, other discipline) are skipped.
+    The contracts are saved one by one, so that the signals update the counters and the cache.
+    """
+    if max_contracts is None:
+        max_contracts = get_max_contracts()
+    created = []
+    with transaction.atomic():
+        eda_ids = {eda_id for eda_id, mentor_id in pairs}
+        mentor_ids = {mentor_id for eda_id, mentor_id in pairs}
+        edas = get_waiting_edas(year).select_for_update().in_bulk(eda_ids)
+        mentors = Mentor.objects.filter(year=year, is_active=True).select_for_update().in_bulk(mentor_ids)
+        loads = dict(Mentor.objects.filter(pk__in=mentors).with_nb_contracts().values_list('pk', 'nb_open_contracts'))
+
+        for eda_id, mentor_id in pairs:
+            eda = edas.pop(eda_id, None)
+            mentor = mentors.get(mentor_id)
+            if eda is None or mentor is None or eda.discipline_id != mentor.discipline_id:
+                continue
+            if loads[mentor_id] >= max_contracts:
+                continue
+            contract = Contract(eda=eda, mentor=mentor, discipline_id=eda.discipline_id, year=year)
+            contract.save()
+            loads[mentor_id] += 1
+            created.append(contract)
+    return created
@@ -0,0 +1,157 @@
+import contextvars
+import logging
+import time
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.db import connections
+from django.template.backends import django as django_backend
+from django.template import TemplateDoesNotExist
+
+logger = logging.getLogger('pymentorat.metrics')
+
+# Default budgets of a request, overridden by the settings METRICS_QUERY_BUDGET and METRICS_TIME_BUDGET,
+# and for some views by METRICS_VIEW_BUDGETS = {'<view name>': {'queries': ..., 'time': ...}}
+QUERY_BUDGET = 50
+TIME_BUDGET = 1000      # milliseconds
+
+# Timers shown in the Server-Timing header, with their description
+TIMERS = [
+    ('db', "Database"),
+    ('template', "Templates"),
+    ('pdf', "PDF"),
+]
+
+_current = contextvars.ContextVar('pymentorat_metrics', default=None)
+
+
+class RequestMetrics:
+    """ Number of SQL queries and time spent in the database, the templates and the PDF rendering during a request """
+
+    def __init__(self):
+        self.queries = 0
+        self.durations = {name: 0.0 for name, description in TIMERS}
+
+    def execute(self, execute, sql, params, many, context):
+        """ Database execute wrapper, counting the queries and their time """
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.durations['db'] += time.perf_counter() - start
+            self.queries += 1
+
+    def get_server_timing(self, total):
+        """ Value of the Server-Timing header, durations in milliseconds """
+        timings = ['{0};dur={1:.1f};desc="{2}"'.format(name, self.durations[name] * 1000, description)
+                   for name, description in TIMERS]
+        timings.append('total;dur={0:.1f}'.format(total * 1000))
+        return ', '.join(timings)
+
+
+def get_current():
+    """ Metrics of the request being processed, or None outside of a request """
+    return _current.get()
+
+
+@contextmanager
+def timer(name):
+    """ Add the time spent in the block to a timer of the current request, if any """
+    metrics = _current.get()
+    if metrics is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics.durations[name] += time.perf_counter() - start
+
+
+class TimedTemplate(django_backend.Template):
+    """ Template timing its rendering. Only the templates rendered by the views use this class,
+    the included templates are timed with the template including them. """
+
+    def render(self, context=None, request=None):
+        with timer('template'):
+            return super().render(context, request)
+
+
+class DjangoTemplates(django_backend.DjangoTemplates):
+    """ Django template backend timing the rendering of the templates """
+
+    def from_string(self, template_code):
+        return TimedTemplate(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        try:
+            return TimedTemplate(self.engine.get_template(template_name), self)
+        except TemplateDoesNotExist as exc:
+            django_backend.reraise(exc, self)
+
+
+def get_budgets(view_name):
+    """ (query budget, time budget in milliseconds) of a view """
+    budgets = getattr(settings, 'METRICS_VIEW_BUDGETS', {}).get(view_name, {})
+    return (budgets.get('queries', getattr(settings, 'METRICS_QUERY_BUDGET', QUERY_BUDGET)),
+            budgets.get('time', getattr(settings, 'METRICS_TIME_BUDGET', TIME_BUDGET)))
+
+
+class MetricsMiddleware:
+    """ Measure each request and report it in the Server-Timing header and in the 'pymentorat.metrics' log.
+
+    The requests over their query or time budget are logged as warnings, the others at the INFO level,
+    which the default LOGGING setting does not log. The rendering of the
+    streamed responses (bulk PDF exports, CSV exports) happens after the response is returned,
+    so it is not measured.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.server_timing = getattr(settings, 'METRICS_SERVER_TIMING', True)
+
+    def __call__(self, request):
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        start = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(metrics.execute))
+                response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        total = time.perf_counter() - start
+
+        if self.server_timing:
+            response['Server-Timing'] = metrics.get_server_timing(total)
+        self.log(request, response, metrics, total)
+        return response
+
+    def log(self, request, response, metrics, total):
+        match = request.resolver_match
+        view_name = match.view_name if match is not None else ''
+        query_budget, time_budget = get_budgets(view_name)
+        fields = {
+            'method': request.method,
+            'path': request.path,
+            'view': view_name,
+            'status': response.status_code,
+            'queries': metrics.queries,
+            'db_ms': round(metrics.durations['db'] * 1000, 1),
+            'template_ms': round(metrics.durations['template'] * 1000, 1),
+            'pdf_ms': round(metrics.durations['pdf'] * 1000, 1),
+            'total_ms': round(total * 1000, 1),
+        }
+        over_budget = []
+        if metrics.queries > query_budget:
+            over_budget.append('queries')
+        if fields['total_ms'] > time_budget:
+            over_budget.append('time')
+        if over_budget:
+            fields['over_budget'] = ','.join(over_budget)
+
+        level = logging.WARNING if over_budget else logging.INFO
+        if logger.isEnabledFor(level):
+            line = ' '.join('{0}={1}'.format(key, value) for key, value in fields.items())
+            logger.log(level, line, extra={'metrics': fields})
@@ -0,0 +1,56 @@
+from django.db import migrations
+
+# Columns searched with icontains by the filters. On PostgreSQL, icontains compiles to
+# UPPER("column"::text) LIKE UPPER('%...%'), which these expression indexes can serve.
+TRIGRAM_INDEXES = [
+    ('pymentorat_student', 'name'),
+    ('pymentorat_student', 'vorname'),
+    ('pymentorat_teacher', 'name'),
+    ('pymentorat_teacher', 'vorname'),
+]
+
+
+def _index_name(schema_editor, table, column):
+    return schema_editor.quote_name('{0}_{1}_trgm'.format(table, column))
+
+
+def create_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for table, column in TRIGRAM_INDEXES:
+        index = _index_name(schema_editor, table, column)
+        # A concurrent build which failed leaves an invalid index, which IF NOT EXISTS would keep
+        with schema_editor.connection.cursor() as cursor:
+            cursor.execute('SELECT NOT indisvalid FROM pg_index WHERE indexrelid = to_regclass(%s)', [index])
+            row = cursor.fetchone()
+        if row is not None and row[0]:
+            schema_editor.execute('DROP INDEX CONCURRENTLY {0}'.format(index))
+        # Built without locking the writes to the table
+        schema_editor.execute(
+            'CREATE INDEX CONCURRENTLY IF NOT EXISTS {index} ON {table} USING gin ((UPPER({column}::text)) gin_trgm_ops)'.format(
+                index=index,
+                table=schema_editor.quote_name(table),
+                column=schema_editor.quote_name(column),
+            )
+        )
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for table, column in TRIGRAM_INDEXES:
+        schema_editor.execute('DROP INDEX CONCURRENTLY IF EXISTS {0}'.format(_index_name(schema_editor, table, column)))
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY cannot run in a transaction
+    atomic = False
+
+    dependencies = [
+        ('pymentorat', '0016_auto_20210204_1536'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_trigram_indexes, drop_trigram_indexes),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 3.2.25 on 2026-10-18 10:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pymentorat', '0017_trigram_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='contract',
+            index=models.Index(fields=['year', 'end_date'], name='contract_year_end_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='contract',
+            index=models.Index(fields=['year', 'begin_date', 'id'], name='contract_year_begin_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='contract',
+            index=models.Index(condition=models.Q(('end_date__isnull', True)), fields=['year'], name='contract_open_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='convocation',
+            index=models.Index(fields=['date', 'time'], name='convocation_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='eda',
+            index=models.Index(fields=['year', 'is_active', 'inscription_date', 'id'], name='eda_year_active_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='mentor',
+            index=models.Index(fields=['year', 'is_active'], name='mentor_year_active_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='student',
+            index=models.Index(fields=['name', 'id'], name='student_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='teacher',
+            index=models.Index(fields=['name', 'id'], name='teacher_name_idx'),
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 3.2.25 on 2026-10-18 10:35
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('pymentorat', '0018_query_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Job',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('creation_date', models.DateTimeField(auto_now_add=True)),
+                ('modification_date', models.DateTimeField(auto_now=True)),
+                ('action', models.CharField(choices=[('import', 'Import'), ('export', 'Export')], max_length=6, verbose_name='Action')),
+                ('resource', models.CharField(max_length=20, verbose_name='Données')),
+                ('file_format', models.CharField(max_length=4, verbose_name='Format')),
+                ('path', models.CharField(blank=True, max_length=255, verbose_name='Fichier')),
+                ('dry_run', models.BooleanField(default=False, verbose_name='Test seulement')),
+                ('status', models.CharField(choices=[('pending', 'En attente'), ('running', 'En cours'), ('done', 'Terminé'), ('failed', 'Echoué')], default='pending', max_length=7, verbose_name='Etat')),
+                ('rows', models.PositiveIntegerField(default=0, verbose_name='Lignes traitées')),
+                ('message', models.TextField(blank=True, verbose_name='Message')),
+                ('started_at', models.DateTimeField(blank=True, null=True, verbose_name='Début')),
+                ('finished_at', models.DateTimeField(blank=True, null=True, verbose_name='Fin')),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Tâche',
+                'verbose_name_plural': 'Tâches',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='job',
+            index=models.Index(fields=['status', 'id'], name='job_status_idx'),
+        ),
+    ]
@@ -0,0 +1,109 @@
+# Generated by Django 3.2.25 on 2026-10-18 10:37
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pymentorat', '0019_jobs'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedContract',
+            fields=[
+                ('id', models.IntegerField(primary_key=True, serialize=False)),
+                ('creation_date', models.DateTimeField()),
+                ('modification_date', models.DateTimeField()),
+                ('year', models.PositiveIntegerField(verbose_name='Année')),
+                ('begin_date', models.DateField(verbose_name='Date de début')),
+                ('end_date', models.DateField(blank=True, null=True, verbose_name='Date de fin')),
+                ('remark', models.TextField(blank=True, null=True, verbose_name='Remarque')),
+                ('contract_parent', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='pymentorat.archivedcontract')),
+                ('discipline', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='pymentorat.discipline')),
+            ],
+            options={
+                'verbose_name': 'Contrat archivé',
+                'verbose_name_plural': 'Contrats archivés',
+            },
+        ),
+        migrations.CreateModel(
+            name='ArchivedMentor',
+            fields=[
+                ('id', models.IntegerField(primary_key=True, serialize=False)),
+                ('creation_date', models.DateTimeField()),
+                ('modification_date', models.DateTimeField()),
+                ('year', models.PositiveIntegerField(verbose_name='Année')),
+                ('inscription_date', models.DateField(verbose_name="Date d'inscription")),
+                ('remark', models.TextField(blank=True, null=True, verbose_name='Remarque')),
+                ('is_active', models.BooleanField(verbose_name='Actif')),
+                ('discipline', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='pymentorat.discipline')),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='pymentorat.student')),
+                ('teacher', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='pymentorat.teacher')),
+            ],
+            options={
+                'verbose_name': 'Elève mentor archivé',
+                'verbose_name_plural': 'Elèves mentors archivés',
+            },
+        ),
+        migrations.CreateModel(
+            name='ArchivedEDA',
+            fields=[
+                ('id', models.IntegerField(primary_key=True, serialize=False)),
+                ('creation_date', models.DateTimeField()),
+                ('modification_date', models.DateTimeField()),
+                ('year', models.PositiveIntegerField(verbose_name='Année')),
+                ('inscription_date', models.DateField(verbose_name="Date d'inscription")),
+                ('remark', models.TextField(blank=True, null=True, verbose_name='Remarque')),
+                ('is_active', models.BooleanField(verbose_name='Actif')),
+                ('discipline', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='pymentorat.discipline')),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='pymentorat.student')),
+                ('teacher', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='pymentorat.teacher')),
+            ],
+            options={
+                'verbose_name': "Elève demandeur d'aide archivé",
+                'verbose_name_plural': "Elèves demandeurs d'aide archivés",
+            },
+        ),
+        migrations.CreateModel(
+            name='ArchivedConvocation',
+            fields=[
+                ('id', models.IntegerField(primary_key=True, serialize=False)),
+                ('creation_date', models.DateTimeField()),
+                ('modification_date', models.DateTimeField()),
+                ('date', models.DateField(verbose_name='Date de rendez-vous')),
+                ('time', models.TimeField(verbose_name='Heure du rendez-vous')),
+                ('place', models.CharField(max_length=64, verbose_name='Lieu de rendez-vous')),
+                ('message', models.CharField(blank=True, max_length=64, null=True, verbose_name='Message')),
+                ('contract', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='pymentorat.archivedcontract')),
+            ],
+            options={
+                'verbose_name': 'Convocation archivée',
+                'verbose_name_plural': 'Convocations archivées',
+            },
+        ),
+        migrations.AddField(
+            model_name='archivedcontract',
+            name='eda',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='pymentorat.archivededa'),
+        ),
+        migrations.AddField(
+            model_name='archivedcontract',
+            name='mentor',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='pymentorat.archivedmentor'),
+        ),
+        migrations.AddIndex(
+            model_name='archivedmentor',
+            index=models.Index(fields=['year'], name='archived_mentor_year_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='archivededa',
+            index=models.Index(fields=['year'], name='archived_eda_year_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='archivedcontract',
+            index=models.Index(fields=['year', 'begin_date'], name='archived_contract_year_idx'),
+        ),
+    ]
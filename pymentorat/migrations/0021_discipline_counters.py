@@ -0,0 +1,50 @@
+# Generated by Django 3.2.25 on 2026-10-18 10:39
+
+from django.db import migrations, models
+from django.db.models import Count, Q
+import django.db.models.deletion
+
+
+def fill_counters(apps, schema_editor):
+    """ Count the existing rows, the signals keep the counters up to date afterwards """
+    DisciplineCounter = apps.get_model('pymentorat', 'DisciplineCounter')
+    counted = [
+        (apps.get_model('pymentorat', 'Mentor'), 'nb_mentors', Q(is_active=True)),
+        (apps.get_model('pymentorat', 'EDA'), 'nb_edas', Q(is_active=True)),
+        (apps.get_model('pymentorat', 'Contract'), 'nb_contracts', Q(end_date=None)),
+    ]
+    counters = {}
+    for model, field, condition in counted:
+        rows = model.objects.filter(condition).order_by().values('discipline_id', 'year').annotate(n=Count('pk'))
+        for row in rows:
+            key = row['discipline_id'], row['year']
+            counter = counters.setdefault(key, DisciplineCounter(discipline_id=key[0], year=key[1]))
+            setattr(counter, field, row['n'])
+    DisciplineCounter.objects.bulk_create(counters.values())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pymentorat', '0020_archives'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DisciplineCounter',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('year', models.PositiveIntegerField(verbose_name='Année')),
+                ('nb_mentors', models.IntegerField(default=0, verbose_name='Mentors actifs')),
+                ('nb_edas', models.IntegerField(default=0, verbose_name='EDA actifs')),
+                ('nb_contracts', models.IntegerField(default=0, verbose_name='Contrats en cours')),
+                ('discipline', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='pymentorat.discipline')),
+            ],
+            options={
+                'verbose_name': 'Compteur de branche',
+                'verbose_name_plural': 'Compteurs de branche',
+                'unique_together': {('year', 'discipline')},
+            },
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 3.2.25 on 2026-10-18 10:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pymentorat', '0021_discipline_counters'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='contract',
+            index=models.Index(condition=models.Q(('end_date__isnull', True)), fields=['eda'], name='contract_open_eda_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='eda',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['discipline', 'year', 'inscription_date', 'id'], name='eda_queue_idx'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 3.2.25 on 2026-10-18 16:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pymentorat', '0022_waiting_queue'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='contract',
+            name='year',
+            field=models.PositiveIntegerField(default=2021, verbose_name='Année'),
+        ),
+        migrations.AlterField(
+            model_name='eda',
+            name='year',
+            field=models.PositiveIntegerField(default=2021, verbose_name='Année'),
+        ),
+        migrations.AlterField(
+            model_name='mentor',
+            name='year',
+            field=models.PositiveIntegerField(default=2021, verbose_name='Année'),
+        ),
+    ]
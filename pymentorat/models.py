@@ -1,7 +1,10 @@
+from django.conf import settings
 from django.db import models
+from django.db.models import Count, Exists, IntegerField, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
 from django.urls import reverse
 from django.core.exceptions import ValidationError
-from django.utils.timezone import now
+from django.utils.timezone import localdate, now
 
 from core.models import TimeStampedModel
 from .apps import CURRENT_YEAR
@@ -33,6 +36,9 @@ class Student(TimeStampedModel):
     class Meta:
         verbose_name = "Elève"
         verbose_name_plural = "Elèves"
+        indexes = [
+            models.Index(fields=['name', 'id'], name='student_name_idx'),
+        ]
 
     def get_absolute_url(self):
         return reverse('pymentorat:student_details', kwargs={'id_student': self.pk})
@@ -49,6 +55,44 @@ class Teacher(TimeStampedModel):
     class Meta:
         verbose_name = "Maître"
         verbose_name_plural = "Maîtres"
+        indexes = [
+            models.Index(fields=['name', 'id'], name='teacher_name_idx'),
+        ]
+
+
+class ContractHolderQuerySet(models.QuerySet):
+    """ QuerySet shared by Mentor and EDA, the two sides of a contract """
+
+    def with_nb_contracts(self):
+        """ Annotate each row with its number of open contracts and join the data displayed in the lists """
+        return self.select_related('student', 'teacher', 'discipline').annotate(
+            nb_open_contracts=Count('contract', filter=Q(contract__end_date=None))
+        )
+
+
+class EDAQuerySet(ContractHolderQuerySet):
+    """ QuerySet of the EDAs, with their queue for a mentor """
+
+    def waiting(self):
+        """ Active EDAs without an open contract """
+        open_contracts = Contract.objects.filter(eda=OuterRef('pk'), end_date=None)
+        return self.filter(is_active=True).exclude(Exists(open_contracts))
+
+    def with_queue_position(self):
+        """ Annotate the waiting EDAs with their position in the queue of their discipline and year
+        (by inscription date), and the length of that queue """
+        queue = EDA.objects.waiting().filter(discipline=OuterRef('discipline'), year=OuterRef('year'))
+        ahead = queue.filter(Q(inscription_date__lt=OuterRef('inscription_date')) |
+                             Q(inscription_date=OuterRef('inscription_date'), pk__lt=OuterRef('pk')))
+        return self.annotate(
+            queue_position=Coalesce(self._count(ahead), 0) + 1,
+            queue_length=Coalesce(self._count(queue), 0),
+        )
+
+    @staticmethod
+    def _count(queryset):
+        subquery = queryset.order_by().values('discipline').annotate(n=Count('pk')).values('n')
+        return Subquery(subquery, output_field=IntegerField())
 
 
 class Mentor(TimeStampedModel):
@@ -60,9 +104,14 @@ class Mentor(TimeStampedModel):
     remark = models.TextField('Remarque', null=True, blank=True)
     is_active = models.BooleanField('Actif', default=True, null=False, blank=False)
 
+    objects = ContractHolderQuerySet.as_manager()
+
     class Meta:
         verbose_name = "Elève mentor"
         verbose_name_plural = "Elèves mentors"
+        indexes = [
+            models.Index(fields=['year', 'is_active'], name='mentor_year_active_idx'),
+        ]
 
     def __str__(self):
         return "{0} {1} ({3}) mentor pour {2}".format(self.student.name, self.student.vorname, self.discipline.name,
@@ -82,6 +131,9 @@ class Mentor(TimeStampedModel):
         return reverse('pymentorat:mentor_update', kwargs={'id_mentor': self.pk})
 
     def get_nb_contracts(self):
+        # Use the value computed by with_nb_contracts() when available
+        if hasattr(self, 'nb_open_contracts'):
+            return self.nb_open_contracts
         nb = Contract.objects.filter(mentor=self, end_date=None).count()
         return nb
 
@@ -95,9 +147,18 @@ class EDA(TimeStampedModel):
     remark = models.TextField('Remarque', null=True, blank=True)
     is_active = models.BooleanField('Actif', default=True, null=False, blank=False)
 
+    objects = EDAQuerySet.as_manager()
+
     class Meta:
         verbose_name = "Elève demandeur d'aide"
         verbose_name_plural = "Elèves demandeurs d'aide"
+        indexes = [
+            # Also serves the list ordered by inscription date
+            models.Index(fields=['year', 'is_active', 'inscription_date', 'id'], name='eda_year_active_idx'),
+            # Serves the positions in the queues of the disciplines
+            models.Index(fields=['discipline', 'year', 'inscription_date', 'id'], name='eda_queue_idx',
+                         condition=Q(is_active=True)),
+        ]
 
     def __str__(self):
         return "{0} {1} eda pour {2}".format(self.student.name, self.student.vorname, self.discipline.name)
@@ -116,9 +177,15 @@ class EDA(TimeStampedModel):
         return reverse('pymentorat:eda_update', kwargs={'id_eda': self.pk})
 
     def get_nb_contracts(self):
+        # Use the value computed by with_nb_contracts() when available
+        if hasattr(self, 'nb_open_contracts'):
+            return self.nb_open_contracts
         nb = Contract.objects.filter(eda=self, end_date=None).count()
         return nb
 
+    def get_waiting_days(self):
+        return (localdate() - self.inscription_date).days
+
     def get_school_year(self):
         cl = Student.objects.filter(id=self.student_id)
         return cl[0]
@@ -138,6 +205,13 @@ class Contract(TimeStampedModel):
     class Meta:
         verbose_name = "Contrat"
         verbose_name_plural = "Contrats"
+        indexes = [
+            models.Index(fields=['year', 'end_date'], name='contract_year_end_idx'),
+            models.Index(fields=['year', 'begin_date', 'id'], name='contract_year_begin_idx'),
+            models.Index(fields=['year'], name='contract_open_idx', condition=Q(end_date__isnull=True)),
+            # Serves the search of the open contract of an EDA, see EDA.objects.waiting()
+            models.Index(fields=['eda'], name='contract_open_eda_idx', condition=Q(end_date__isnull=True)),
+        ]
 
 
     def __str__(self):
@@ -164,6 +238,9 @@ class Contract(TimeStampedModel):
         return reverse('pymentorat:contract_update', kwargs={'id_contract': self.pk})
 
     def get_contract_children(self):
+        # Use the children linked by link_contract_tree() when available
+        if hasattr(self, 'children'):
+            return self.children
         return Contract.objects.filter(contract_parent_id=self.id);
 
 class Convocation(TimeStampedModel):
@@ -176,9 +253,165 @@ class Convocation(TimeStampedModel):
     class Meta:
         verbose_name = "Convocation"
         verbose_name_plural = "Convocations"
+        indexes = [
+            models.Index(fields=['date', 'time'], name='convocation_date_idx'),
+        ]
 
     def __str__(self):
         return "Convocation {0} et {1} le {2} à {3} ".format(self.contract.eda.student.__str__(),
                                                       self.contract.mentor.student.__str__(),
                                                       self.date,
                                                       self.time)
+
+
+class DisciplineCounter(models.Model):
+    """ Number of active mentors, active EDAs and open contracts of a discipline in a year.
+
+    Kept up to date by the signals of Mentor, EDA and Contract, and rebuilt by the reconcile_counters command.
+    """
+    discipline = models.ForeignKey(Discipline, on_delete=models.CASCADE)
+    year = models.PositiveIntegerField('Année')
+    nb_mentors = models.IntegerField('Mentors actifs', default=0)
+    nb_edas = models.IntegerField('EDA actifs', default=0)
+    nb_contracts = models.IntegerField('Contrats en cours', default=0)
+
+    class Meta:
+        verbose_name = "Compteur de branche"
+        verbose_name_plural = "Compteurs de branche"
+        unique_together = ('year', 'discipline')
+
+    def __str__(self):
+        return "{0} {1}".format(self.discipline, self.year)
+
+
+class Job(TimeStampedModel):
+    """ Import or export of a roster, run in the background by the run_jobs command """
+
+    IMPORT = 'import'
+    EXPORT = 'export'
+    ACTION_CHOICES = [(IMPORT, 'Import'), (EXPORT, 'Export')]
+
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = [(PENDING, 'En attente'), (RUNNING, 'En cours'), (DONE, 'Terminé'), (FAILED, 'Echoué')]
+
+    action = models.CharField('Action', max_length=6, choices=ACTION_CHOICES)
+    resource = models.CharField('Données', max_length=20)
+    file_format = models.CharField('Format', max_length=4)
+    path = models.CharField('Fichier', max_length=255, blank=True)
+    dry_run = models.BooleanField('Test seulement', default=False)
+    status = models.CharField('Etat', max_length=7, choices=STATUS_CHOICES, default=PENDING)
+    rows = models.PositiveIntegerField('Lignes traitées', default=0)
+    message = models.TextField('Message', blank=True)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, null=True, blank=True, on_delete=models.SET_NULL)
+    started_at = models.DateTimeField('Début', null=True, blank=True)
+    finished_at = models.DateTimeField('Fin', null=True, blank=True)
+
+    class Meta:
+        verbose_name = "Tâche"
+        verbose_name_plural = "Tâches"
+        indexes = [
+            models.Index(fields=['status', 'id'], name='job_status_idx'),
+        ]
+
+    def __str__(self):
+        return "{0} {1} ({2})".format(self.get_action_display(), self.resource, self.get_status_display())
+
+    def is_finished(self):
+        return self.status in (self.DONE, self.FAILED)
+
+
+# Archives of the past school years, moved out of the live tables by the archive_year command.
+# The rows keep their primary key, and their timestamps are copied.
+
+class ArchivedMentor(models.Model):
+    id = models.IntegerField(primary_key=True)
+    creation_date = models.DateTimeField()
+    modification_date = models.DateTimeField()
+    student = models.ForeignKey(Student, on_delete=models.CASCADE)
+    discipline = models.ForeignKey(Discipline, on_delete=models.CASCADE)
+    teacher = models.ForeignKey(Teacher, on_delete=models.CASCADE)
+    year = models.PositiveIntegerField('Année')
+    inscription_date = models.DateField("Date d'inscription")
+    remark = models.TextField('Remarque', null=True, blank=True)
+    is_active = models.BooleanField('Actif')
+
+    class Meta:
+        verbose_name = "Elève mentor archivé"
+        verbose_name_plural = "Elèves mentors archivés"
+        indexes = [
+            models.Index(fields=['year'], name='archived_mentor_year_idx'),
+        ]
+
+    def __str__(self):
+        return "{0} {1} mentor pour {2} ({3})".format(self.student.name, self.student.vorname, self.discipline.name,
+                                                       self.year)
+
+
+class ArchivedEDA(models.Model):
+    id = models.IntegerField(primary_key=True)
+    creation_date = models.DateTimeField()
+    modification_date = models.DateTimeField()
+    student = models.ForeignKey(Student, on_delete=models.CASCADE)
+    discipline = models.ForeignKey(Discipline, on_delete=models.CASCADE)
+    teacher = models.ForeignKey(Teacher, on_delete=models.CASCADE)
+    year = models.PositiveIntegerField('Année')
+    inscription_date = models.DateField("Date d'inscription")
+    remark = models.TextField('Remarque', null=True, blank=True)
+    is_active = models.BooleanField('Actif')
+
+    class Meta:
+        verbose_name = "Elève demandeur d'aide archivé"
+        verbose_name_plural = "Elèves demandeurs d'aide archivés"
+        indexes = [
+            models.Index(fields=['year'], name='archived_eda_year_idx'),
+        ]
+
+    def __str__(self):
+        return "{0} {1} eda pour {2} ({3})".format(self.student.name, self.student.vorname, self.discipline.name,
+                                                   self.year)
+
+
+class ArchivedContract(models.Model):
+    id = models.IntegerField(primary_key=True)
+    creation_date = models.DateTimeField()
+    modification_date = models.DateTimeField()
+    eda = models.ForeignKey(ArchivedEDA, on_delete=models.CASCADE)
+    mentor = models.ForeignKey(ArchivedMentor, on_delete=models.CASCADE)
+    discipline = models.ForeignKey(Discipline, on_delete=models.CASCADE)
+    contract_parent = models.ForeignKey('self', null=True, blank=True, on_delete=models.CASCADE)
+    year = models.PositiveIntegerField('Année')
+    begin_date = models.DateField('Date de début')
+    end_date = models.DateField('Date de fin', null=True, blank=True)
+    remark = models.TextField('Remarque', null=True, blank=True)
+
+    class Meta:
+        verbose_name = "Contrat archivé"
+        verbose_name_plural = "Contrats archivés"
+        indexes = [
+            models.Index(fields=['year', 'begin_date'], name='archived_contract_year_idx'),
+        ]
+
+    def __str__(self):
+        return "Contrat {0} avec {1} en {2} - {3}".format(self.eda.student.name, self.mentor.student.name,
+                                                          self.discipline.name, self.begin_date)
+
+
+class ArchivedConvocation(models.Model):
+    id = models.IntegerField(primary_key=True)
+    creation_date = models.DateTimeField()
+    modification_date = models.DateTimeField()
+    contract = models.ForeignKey(ArchivedContract, on_delete=models.CASCADE)
+    date = models.DateField('Date de rendez-vous')
+    time = models.TimeField('Heure du rendez-vous')
+    place = models.CharField('Lieu de rendez-vous', max_length=64)
+    message = models.CharField('Message', null=True, blank=True, max_length=64)
+
+    class Meta:
+        verbose_name = "Convocation archivée"
+        verbose_name_plural = "Convocations archivées"
+
+    def __str__(self):
+        return "Convocation du contrat {0} le {1} à {2}".format(self.contract_id, self.date, self.time)
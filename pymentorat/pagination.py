@@ -0,0 +1,117 @@
+import base64
+import binascii
+import json
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+
+PAGE_SIZE = 50
+
+
+class KeysetPage:
+    """ A page of rows, with the query strings of the neighbouring pages """
+
+    def __init__(self, object_list, has_previous, has_next, first_query='', previous_query='', next_query=''):
+        self.object_list = object_list
+        self.has_previous = has_previous
+        self.has_next = has_next
+        self.first_query = first_query
+        self.previous_query = previous_query
+        self.next_query = next_query
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+
+class KeysetPaginator:
+    """ Paginate a queryset by seeking after (or before) the ordering key of a row, instead of using an offset.
+
+    The ordering must be unique (end it with 'pk') and ascending. The position is kept in the
+    'after' or 'before' parameter of the query string, so that every page costs the same query.
+    """
+
+    def __init__(self, queryset, ordering, per_page=PAGE_SIZE):
+        self.queryset = queryset
+        self.ordering = tuple(ordering)
+        self.per_page = per_page
+
+    def get_page(self, query_dict):
+        """ Return the page selected by the query string (the first page by default) """
+        queryset = self.queryset.order_by(*self.ordering)
+        after = self._seek(queryset, query_dict.get('after'), 'gt')
+        before = self._seek(queryset, query_dict.get('before'), 'lt') if after is None else None
+
+        if before is not None:
+            reverse_ordering = ['-' + field for field in self.ordering]
+            rows = list(before.order_by(*reverse_ordering)[:self.per_page + 1])
+            has_previous = len(rows) > self.per_page
+            rows = rows[:self.per_page][::-1]
+            has_next = True
+        else:
+            if after is not None:
+                queryset = after
+            rows = list(queryset[:self.per_page + 1])
+            has_next = len(rows) > self.per_page
+            rows = rows[:self.per_page]
+            has_previous = after is not None
+
+        page = KeysetPage(rows, has_previous, has_next, first_query=self._query(query_dict))
+        if rows:
+            page.previous_query = self._query(query_dict, before=self._encode(rows[0]))
+            page.next_query = self._query(query_dict, after=self._encode(rows[-1]))
+        return page
+
+    def _seek(self, queryset, cursor, lookup):
+        """ Filter the rows whose key is after ('gt') or before ('lt') the cursor, None if the cursor is invalid """
+        values = self._decode(cursor)
+        if values is None:
+            return None
+        condition = Q()
+        for i, field in enumerate(self.ordering):
+            term = Q(**{field + '__' + lookup: values[i]})
+            for previous_field, value in zip(self.ordering[:i], values):
+                term &= Q(**{previous_field: value})
+            condition |= term
+        try:
+            return queryset.filter(condition)
+        except (ValueError, TypeError, ValidationError):
+            return None
+
+    def _key(self, row):
+        # The rows of a values() queryset are dicts holding the ordering fields
+        if isinstance(row, dict):
+            return [row[field] for field in self.ordering]
+        values = []
+        for field in self.ordering:
+            value = row
+            for attribute in field.split('__'):
+                value = getattr(value, attribute)
+            values.append(value)
+        return values
+
+    def _encode(self, row):
+        data = json.dumps(self._key(row), default=str).encode('utf-8')
+        return base64.urlsafe_b64encode(data).decode('ascii')
+
+    def _decode(self, cursor):
+        """ Return the key values of the cursor, or None if it is missing or invalid """
+        if not cursor:
+            return None
+        try:
+            values = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+        except (ValueError, binascii.Error):
+            return None
+        if not isinstance(values, list) or len(values) != len(self.ordering):
+            return None
+        return values
+
+    @staticmethod
+    def _query(query_dict, **cursor):
+        params = query_dict.copy()
+        params.pop('after', None)
+        params.pop('before', None)
+        params.update(cursor)
+        return params.urlencode()
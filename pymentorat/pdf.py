@@ -0,0 +1,274 @@
+import os
+import threading
+from datetime import date
+
+from django.utils.text import slugify
+
+from reportlab.pdfgen import canvas
+from reportlab.lib.pagesizes import A4, landscape
+from reportlab.lib.units import cm
+from reportlab.lib.utils import ImageReader
+from reportlab.pdfbase.ttfonts import TTFont
+from reportlab.pdfbase.pdfmetrics import registerFont
+
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static')
+
+FONTS = {
+    'Arial': 'fonts/Arial.ttf',
+    'Arial-Bold': 'fonts/Arial Bold.ttf',
+}
+
+LOGO = 'img/logo_texte_adresse.png'
+LOGO_SCALE = 0.1
+LOGO_WIDTH = 1075 * LOGO_SCALE
+LOGO_HEIGHT = 544 * LOGO_SCALE
+
+# Landscape A4, each document is split in two halves
+HEIGHT, WIDTH = A4
+LEFT = 1 * cm
+
+
+class PDFResources:
+    """ Fonts and images of the PDF documents, loaded once per process """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._logo = None
+
+    def load(self):
+        """ Register the fonts and decode the logo, the first time only """
+        if self._logo is not None:
+            return
+        with self._lock:
+            if self._logo is not None:
+                return
+            for name, path in FONTS.items():
+                registerFont(TTFont(name, os.path.join(STATIC_DIR, path)))
+            logo = ImageReader(os.path.join(STATIC_DIR, LOGO))
+            # Decode the PNG now, so that the reader can be shared between threads
+            logo.getRGBData()
+            self._logo = logo
+
+    @property
+    def logo(self):
+        self.load()
+        return self._logo
+
+
+resources = PDFResources()
+
+
+class ChunkSink:
+    """ Writable file-like object keeping the written chunks until they are drained """
+
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        """ Return the chunks written since the last call and forget them """
+        chunks, self.chunks = self.chunks, []
+        return chunks
+
+
+def new_canvas(output):
+    """ Return a landscape A4 canvas writing to output, with the resources loaded """
+    resources.load()
+    return canvas.Canvas(output, pagesize=landscape(A4))
+
+
+def draw_form(p, name, draw, lowerx=0, lowery=-HEIGHT, upperx=WIDTH, uppery=0):
+    """ Draw the form XObject name, defining it with draw(p) the first time it is used in the document.
+
+    The default bounding box is the page, once translated to the top left corner.
+    """
+    if not p.hasForm(name):
+        p.beginForm(name, lowerx, lowery, upperx, uppery)
+        draw(p)
+        p.endForm()
+    p.doForm(name)
+
+
+def _positions(head, left=LEFT):
+    """ Return the functions converting the layout coordinates (in cm from the top left) to points """
+    def xpos(x):
+        return x * cm + left
+
+    def ypos(y):
+        return -y * cm - head
+
+    return xpos, ypos
+
+
+# Contracts
+
+def _draw_contract_static(p):
+    """ Draw the parts of the contract which are the same for every contract """
+    width, height = WIDTH, HEIGHT
+    xpos, ypos = _positions(2.5 * cm)
+
+    p.setFont("Arial-Bold", 18)
+    p.drawImage(resources.logo, xpos(0), ypos(0), LOGO_WIDTH, LOGO_HEIGHT, anchor='sw', anchorAtXY=True,
+                showBoundary=False)
+    p.drawCentredString(width / 4, ypos(1), "Contrat de Mentorat")
+
+    p.setFont("Arial", 9)
+    p.drawCentredString(width / 4, ypos(1.5), "(A conserver en parfait état)")
+
+    p.line(xpos(0), ypos(2), width / 2 - 1 * cm, ypos(2))
+    p.setFont("Arial-Bold", 12)
+    p.drawString(xpos(0), ypos(2.5), "Branche :")
+
+    p.line(xpos(0), ypos(3), width / 2 - 1 * cm, ypos(3))
+    p.drawString(xpos(0), ypos(3.5), "Mentor : ")
+
+    p.line(xpos(0), ypos(5), width / 2 - 1 * cm, ypos(5))
+    p.drawString(xpos(0), ypos(5.5), "Demandeur d'aide :")
+
+    p.line(xpos(0), ypos(7), width / 2 - 1 * cm, ypos(7))
+
+    p.setFont("Arial", 10)
+    p.drawString(xpos(0), ypos(8), "Date et lieu : Cheseaux-Noréaz, le ")
+    p.drawString(xpos(6), ypos(8), "...........................................")
+    p.drawString(xpos(0), ypos(9), "Signature du mentor")
+    p.drawString(xpos(6), ypos(9), "...........................................")
+    p.drawString(xpos(0), ypos(10), "Signature du demandeur")
+    p.drawString(xpos(6), ypos(10), "...........................................")
+
+    p.line(xpos(0), ypos(10.5), width / 2 - 1 * cm, ypos(10.5))
+
+    p.setFont("Arial-Bold", 12)
+    p.drawString(xpos(0), ypos(11.5), "Signatures de la responsable du mentorat (S. Amy) :")
+
+    p.setFont("Arial", 11)
+    p.drawString(xpos(0), ypos(12.5), "Avant la première séance")
+    p.drawString(xpos(6), ypos(12.5), "...........................................")
+    p.drawString(xpos(0), ypos(13.5), "Après la dernière séance")
+    p.drawString(xpos(6), ypos(13.5), "...........................................")
+
+    p.line(xpos(0), ypos(14), width / 2 - 1 * cm, ypos(14))
+    p.setFont("Arial-Bold", 11)
+    p.drawString(xpos(0), ypos(15), "A remettre au secrétariat en fin de contrat, avec les deux signatures")
+    p.drawString(xpos(0), ypos(15.5), "de la responsable, pour l'obtention de l'aide à la formation.")
+
+    # separation
+    p.line(width / 2, -0.5 * cm, width / 2, -height + 0.5 * cm)
+
+    # Page 2: follow-up grid
+    xpos, ypos = _positions(2 * cm)
+
+    p.setFont("Arial-Bold", 18)
+    p.drawCentredString(3 * width / 4, ypos(0), "Fiche de suivi")
+
+    p.setFont("Arial", 11)
+    p.drawCentredString(3 * width / 4, ypos(1), "A remplir à l'issue de chaque séance.")
+
+    for y in (1.5, 2.5, 5, 7.5, 10, 12.5, 15, 17.5):
+        p.line(width / 2 + 1 * cm, ypos(y), width - 1 * cm, ypos(y))
+    for x in (width / 2 + 1 * cm, width / 2 + 2.5 * cm, width / 2 + 11 * cm, width - 1 * cm):
+        p.line(x, ypos(1.5), x, ypos(17.5))
+
+    p.drawString(width / 2 + xpos(0.1), ypos(2), "Dates")
+    p.drawString(width / 2 + xpos(1.6), ypos(2), "Sujets abordés")
+    p.drawString(width / 2 + xpos(10.1), ypos(2), "Signatures")
+    for i, y in enumerate((3, 5.5, 8, 10.5, 13, 15.5), start=1):
+        p.drawString(width / 2 + xpos(0.1), ypos(y), "{0}.".format(i))
+
+
+def contract_filename(contract):
+    """ Return the name of the PDF file of the contract """
+    return "contrat_mentorat_{0}_{1}.pdf".format(slugify(contract.eda.student.name),
+                                                 slugify(contract.mentor.student.name))
+
+
+def draw_contract(p, contract):
+    """ Draw the contract on a new page of the canvas p """
+    xpos, ypos = _positions(2.5 * cm)
+
+    p.saveState()
+    p.translate(0, HEIGHT)
+
+    draw_form(p, 'contract_static', _draw_contract_static)
+
+    p.setFont("Arial", 11)
+    p.drawString(xpos(4.5), ypos(2.5), "{branche}".format(branche=contract.discipline))
+
+    for student, y in ((contract.mentor.student, 3.5), (contract.eda.student, 5.5)):
+        p.setFont("Arial", 11)
+        p.drawString(xpos(4.5), ypos(y), "{nom} {prenom} ({classe})".format(nom=student.name,
+                                                                        prenom=student.vorname,
+                                                                        classe=student.classe))
+        p.setFont("Arial", 10)
+        p.drawString(xpos(0.5), ypos(y + 1), "Port. : {natel}".format(natel=student.portable))
+        p.drawString(xpos(4.5), ypos(y + 1), "Email : {email}".format(email=student.email))
+
+    p.restoreState()
+    p.showPage()
+
+
+# Convocations
+
+def _draw_convocation_static(p):
+    """ Draw the parts of a convocation half page which are the same for every convocation """
+    xpos, ypos = _positions(2.5 * cm, left=0)
+
+    p.drawImage(resources.logo, xpos(0), ypos(0), LOGO_WIDTH, LOGO_HEIGHT, anchor='sw', anchorAtXY=True,
+                showBoundary=False)
+
+    p.setFont("Arial-Bold", 18)
+    p.drawCentredString(xpos(6.5), ypos(1.5), "Convocation")
+
+    p.setFont("Arial", 14)
+    p.drawString(xpos(0), ypos(5), "Concerne : Contrat de mentorat")
+
+    p.drawCentredString(xpos(8), ypos(13), "Sandrine Amy")
+    p.drawCentredString(xpos(8), ypos(14), "Responsable du mentorat")
+
+
+def convocation_filename(convocation):
+    """ Return the name of the PDF file of the convocation """
+    return "convocation_mentorat_{0}_{1}.pdf".format(slugify(convocation.contract.eda.student.name),
+                                                     slugify(convocation.contract.mentor.student.name))
+
+
+def draw_convocation(p, convocation):
+    """ Draw the convocation on a new page of the canvas p, one half for the EDA and one for the mentor """
+    xpos, ypos = _positions(2.5 * cm, left=0)
+
+    p.saveState()
+    p.translate(0, HEIGHT)
+
+    for dest, left in ((convocation.contract.eda, LEFT), (convocation.contract.mentor, WIDTH / 2 + LEFT)):
+        p.saveState()
+        p.translate(left, 0)
+
+        draw_form(p, 'convocation_static', _draw_convocation_static, upperx=WIDTH / 2)
+
+        p.setFont("Arial", 10)
+        p.drawString(xpos(7), ypos(0), "Cheseaux-Noréaz, le {0}".format(date.today().strftime('%d.%m.%Y')))
+
+        p.setFont("Arial", 18)
+        p.drawString(xpos(0), ypos(3), "{0} {1} ({2})".format(dest.student.vorname, dest.student.name,
+                                                              dest.student.classe))
+
+        p.setFont("Arial", 14)
+        p.drawString(xpos(0), ypos(7), "Merci de vous présenter {0}".format(convocation.place.casefold()))
+        p.drawString(xpos(5.45), ypos(8), "le {0} à {1}".format(convocation.date.strftime('%A %d.%m.%Y'),
+                                                                convocation.time.strftime('%H:%M')))
+
+        if convocation.message is not None:
+            p.drawString(xpos(0), ypos(10), "{0}".format(convocation.message))
+
+        p.restoreState()
+
+    # separation
+    p.line(WIDTH / 2, -0.5 * cm, WIDTH / 2, -HEIGHT + 0.5 * cm)
+
+    p.restoreState()
+    p.showPage()
@@ -0,0 +1,115 @@
+import hashlib
+import os
+import tempfile
+from datetime import date
+
+from django.conf import settings
+
+# Change it when the layout of the documents changes, to invalidate the cached files
+LAYOUT_VERSION = 1
+
+
+class PDFCache:
+    """ Directory of rendered PDF files, named by the hash of the rows they are rendered from.
+
+    The least recently used files are removed when the directory exceeds max_size bytes.
+    """
+
+    def __init__(self, directory, max_size):
+        self.directory = directory
+        self.max_size = max_size
+
+    def path(self, key):
+        return os.path.join(self.directory, key + '.pdf')
+
+    def get(self, key):
+        """ Return the path of the cached file, or None """
+        path = self.path(key)
+        try:
+            # The modification time records the last use
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return path
+
+    def put(self, key, chunks, evict=True):
+        """ Store the PDF written in chunks and return its path """
+        os.makedirs(self.directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as tmp:
+                for chunk in chunks:
+                    tmp.write(chunk)
+            os.replace(tmp_path, self.path(key))
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        if evict:
+            self.evict()
+        return self.path(key)
+
+    def clear(self):
+        """ Remove every cached file """
+        if not os.path.isdir(self.directory):
+            return
+        with os.scandir(self.directory) as it:
+            for entry in it:
+                if entry.name.endswith('.pdf'):
+                    try:
+                        os.unlink(entry.path)
+                    except FileNotFoundError:
+                        pass
+
+    def evict(self):
+        """ Remove the least recently used files until the cache fits in max_size """
+        if not os.path.isdir(self.directory):
+            return
+        entries = []
+        total = 0
+        with os.scandir(self.directory) as it:
+            for entry in it:
+                if not entry.name.endswith('.pdf'):
+                    continue
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+                total += stat.st_size
+        if total <= self.max_size:
+            return
+        for mtime, size, path in sorted(entries):
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            if total <= self.max_size:
+                break
+
+
+def get_cache():
+    """ Return the PDF cache configured in the settings, or None if it is disabled """
+    directory = getattr(settings, 'PDF_CACHE_DIR', None)
+    if not directory:
+        return None
+    return PDFCache(directory, getattr(settings, 'PDF_CACHE_MAX_SIZE', 200 * 1024 * 1024))
+
+
+def _make_key(kind, rows, *extra):
+    parts = [kind, str(LAYOUT_VERSION)]
+    for row in rows:
+        parts.append("{0}:{1}:{2}".format(row._meta.label, row.pk, row.modification_date.isoformat()))
+    parts.extend(str(value) for value in extra)
+    return hashlib.sha256('|'.join(parts).encode('utf-8')).hexdigest()
+
+
+def contract_key(contract):
+    """ Key of the PDF of a contract, changing when one of the rows it displays is modified """
+    return _make_key('contract', [contract, contract.eda.student, contract.mentor.student, contract.discipline])
+
+
+def convocation_key(convocation):
+    """ Key of the PDF of a convocation, which is also dated from the day it is printed """
+    rows = [convocation, convocation.contract.eda.student, convocation.contract.mentor.student]
+    return _make_key('convocation', rows, date.today().isoformat())
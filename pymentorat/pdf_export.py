@@ -0,0 +1,125 @@
+import atexit
+import multiprocessing
+import os
+import threading
+import zipfile
+from io import BytesIO
+from itertools import islice
+
+from django.conf import settings
+
+from . import pdf
+from .pdf_merge import PDFMerger
+
+# Drawing function and file name of each kind of document
+DOCUMENTS = {
+    'contract': (pdf.draw_contract, pdf.contract_filename),
+    'convocation': (pdf.draw_convocation, pdf.convocation_filename),
+}
+
+# Number of documents sent to the pool at once, bounds the rendered documents waiting to be streamed
+BATCH_SIZE = 32
+
+# Maximum number of rendering processes when PDF_EXPORT_PROCESSES is not set
+MAX_PROCESSES = 4
+
+# Pool shared by the exports of the server process, started by the first export
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _batches(iterable, size):
+    iterator = iter(iterable)
+    batch = list(islice(iterator, size))
+    while batch:
+        yield batch
+        batch = list(islice(iterator, size))
+
+
+def _render_document(args):
+    """ Render one document in its own PDF, executed in the worker processes """
+    kind, document = args
+    draw, filename = DOCUMENTS[kind]
+    buffer = BytesIO()
+    p = pdf.new_canvas(buffer)
+    draw(p, document)
+    p.save()
+    return "{0:06d}_{1}".format(document.pk, filename(document)), buffer.getvalue()
+
+
+def get_processes():
+    """ Number of processes of the shared pool, one per CPU up to MAX_PROCESSES by default """
+    return getattr(settings, 'PDF_EXPORT_PROCESSES', None) or min(os.cpu_count() or 1, MAX_PROCESSES)
+
+
+def _init_worker():
+    """ Set up Django and the PDF resources in a worker, which inherits nothing from the server process """
+    import django
+    django.setup()
+    pdf.resources.load()
+
+
+def _new_pool(processes):
+    # Spawned, not forked: a forked worker would share the database connection, the open transaction
+    # and the threads of the request
+    return multiprocessing.get_context('spawn').Pool(processes, initializer=_init_worker)
+
+
+def get_pool():
+    """ The pool shared by the exports of the process, started once and bounded by get_processes() """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = _new_pool(get_processes())
+            atexit.register(_pool.terminate)
+        return _pool
+
+
+def _render(pool, kind, documents):
+    for batch in _batches(documents, BATCH_SIZE):
+        yield from pool.imap(_render_document, [(kind, document) for document in batch])
+
+
+def render_documents(kind, documents, processes=None):
+    """ Yield the (filename, PDF data) of each document, in order, rendered by a pool of processes.
+
+    The documents must have their related objects loaded (select_related), as the workers
+    do not access the database. Without processes, the documents are rendered by the pool shared
+    by the requests of the process, otherwise by a pool of this number of processes for this export.
+    """
+    if processes is None:
+        yield from _render(get_pool(), kind, documents)
+        return
+    with _new_pool(processes) as pool:
+        yield from _render(pool, kind, documents)
+
+
+def stream_zip(kind, documents, processes=None):
+    """ Yield the chunks of a ZIP archive containing one PDF per document """
+    sink = pdf.ChunkSink()
+    with zipfile.ZipFile(sink, 'w', zipfile.ZIP_DEFLATED) as archive:
+        for filename, data in render_documents(kind, documents, processes):
+            archive.writestr(filename, data)
+            yield from sink.drain()
+    yield from sink.drain()
+
+
+def stream_merged_pdf(kind, documents, processes=None):
+    """ Yield the chunks of a single PDF containing the pages of every document, in order.
+
+    The documents are rendered by the pool like for the ZIP archive, and their pages appended as they arrive.
+    """
+    sink = pdf.ChunkSink()
+    merger = PDFMerger(sink)
+    for filename, data in render_documents(kind, documents, processes):
+        merger.add(data)
+        yield from sink.drain()
+    merger.close()
+    yield from sink.drain()
+
+
+def stream_documents(kind, documents, output_format='zip', processes=None):
+    """ Yield the chunks of the export of the documents, as a 'zip' archive or a merged 'pdf' """
+    if output_format == 'pdf':
+        return stream_merged_pdf(kind, documents, processes)
+    return stream_zip(kind, documents, processes)
@@ -0,0 +1,145 @@
+import hashlib
+import re
+
+HEADER = b'%PDF-1.4\n%\x93\x8c\x8b\x9e\n'
+
+# Numbers of the catalog and of the page tree of the merged document, written at the end
+CATALOG = 1
+PAGES = 2
+
+REFERENCE = re.compile(rb'\b(\d+) 0 R\b')
+OBJECT = re.compile(rb'\s*(\d+) 0 obj\s*(.*?)\s*endobj\s*$', re.S)
+STREAM = re.compile(rb'>>\s*stream\r?\n')
+TYPE = re.compile(rb'/Type\s*/(\w+)')
+
+
+def _reference(data, key):
+    match = re.search(rb'/' + key + rb'\s+(\d+) 0 R', data)
+    return int(match.group(1)) if match else None
+
+
+def read_objects(data):
+    """ Return ({number: (dictionary, stream)}, root, info) of a PDF with a cross-reference table,
+    as written by reportlab.
+
+    stream is the rest of the object after its dictionary, from '>>' included, empty when it has no stream.
+    """
+    start = int(data[data.rindex(b'startxref') + len(b'startxref'):].split()[0])
+    lines = data[start:].split(b'\n', 2)
+    first, count = (int(value) for value in lines[1].split())
+    table = lines[2]
+    offsets = {}
+    for i in range(count):
+        entry = table[i * 20:(i + 1) * 20].split()
+        if entry[2] == b'n':
+            offsets[first + i] = int(entry[0])
+    trailer = table[count * 20:]
+    ends = sorted(offsets.values()) + [start]
+    objects = {}
+    for number, offset in offsets.items():
+        end = ends[ends.index(offset) + 1]
+        body = OBJECT.match(data, offset, end).group(2)
+        stream = STREAM.search(body)
+        if stream:
+            objects[number] = (body[:stream.start()], body[stream.start():])
+        else:
+            objects[number] = (body, b'')
+    return objects, _reference(trailer, b'Root'), _reference(trailer, b'Info')
+
+
+class PDFMerger:
+    """ Concatenate the pages of PDFs in one PDF, written to output as each PDF is added.
+
+    Only the offsets of the written objects and the list of the pages are kept until close(). The objects
+    without references which were already written, like the logo or the standard fonts, are written once.
+    """
+
+    def __init__(self, output):
+        self.output = output
+        self.position = 0
+        self.offsets = {}
+        self.pages = []
+        self.shared = {}
+        self._write(HEADER)
+
+    def _write(self, data):
+        self.output.write(data)
+        self.position += len(data)
+
+    def _write_object(self, number, data):
+        self.offsets[number] = self.position
+        self._write(b'%d 0 obj\n' % number + data + b'\nendobj\n')
+
+    def _next_number(self):
+        return len(self.offsets) + PAGES + 1
+
+    def add(self, data):
+        """ Append the pages of the PDF data, in order """
+        objects, root, info = read_objects(data)
+        # The catalog, the page tree and the information of the document are replaced by the merged ones
+        skipped = {root, info}
+        numbers = {}
+        for number, (dictionary, stream) in objects.items():
+            kind = TYPE.search(dictionary)
+            if kind and kind.group(1) == b'Pages':
+                skipped.add(number)
+                numbers[number] = PAGES
+        pages = self._page_order(objects, _reference(objects[root][0], b'Pages'))
+
+        written = []
+        for number in sorted(objects):
+            if number in skipped:
+                continue
+            dictionary, stream = objects[number]
+            if REFERENCE.search(dictionary):
+                written.append(number)
+                numbers[number] = None
+                continue
+            digest = hashlib.sha256(dictionary + stream).digest()
+            if digest not in self.shared:
+                written.append(number)
+                self.shared[digest] = None
+            numbers[number] = digest
+
+        # Number the objects in the order they are written
+        next_number = self._next_number()
+        for number in written:
+            key = numbers[number]
+            numbers[number] = next_number
+            if key is not None:
+                self.shared[key] = next_number
+            next_number += 1
+        for number, key in numbers.items():
+            if isinstance(key, bytes):
+                numbers[number] = self.shared[key]
+
+        def renumber(match):
+            return b'%d 0 R' % numbers[int(match.group(1))]
+
+        for number in written:
+            dictionary, stream = objects[number]
+            self._write_object(numbers[number], REFERENCE.sub(renumber, dictionary) + stream)
+        self.pages.extend(numbers[page] for page in pages)
+
+    def _page_order(self, objects, number):
+        """ The numbers of the pages of the tree number, in order """
+        dictionary = objects[number][0]
+        if TYPE.search(dictionary).group(1) == b'Page':
+            return [number]
+        kids = re.search(rb'/Kids\s*\[(.*?)\]', dictionary, re.S).group(1)
+        pages = []
+        for kid in REFERENCE.finditer(kids):
+            pages.extend(self._page_order(objects, int(kid.group(1))))
+        return pages
+
+    def close(self):
+        """ Write the page tree, the catalog and the cross-reference table """
+        kids = b' '.join(b'%d 0 R' % page for page in self.pages)
+        self._write_object(PAGES, b'<< /Type /Pages /Count %d /Kids [ %s ] >>' % (len(self.pages), kids))
+        self._write_object(CATALOG, b'<< /Type /Catalog /Pages %d 0 R >>' % PAGES)
+        start = self.position
+        size = len(self.offsets) + 1
+        table = [b'xref\n0 %d\n' % size, b'0000000000 65535 f \n']
+        table.extend(b'%010d 00000 n \n' % self.offsets[number] for number in range(1, size))
+        table.append(b'trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n' % (size, CATALOG, start))
+        self._write(b''.join(table))
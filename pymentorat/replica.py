@@ -0,0 +1,105 @@
+import contextvars
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, transaction
+
+# Default alias of the read replica in DATABASES, and number of seconds after a write during which
+# the session reads from the primary database, overridden by the settings DATABASE_REPLICA and
+# DATABASE_REPLICA_PIN
+REPLICA = 'replica'
+PIN_SECONDS = 10
+
+# Session key of the time of the last write of the session
+SESSION_KEY = '_pymentorat_last_write'
+
+# Set while a read-only view runs and the session is not pinned to the primary database
+_reading = contextvars.ContextVar('pymentorat_replica_reading', default=False)
+# Set when the current request writes to the database
+_written = contextvars.ContextVar('pymentorat_replica_written', default=False)
+
+
+def get_replica():
+    """ Alias of the read replica, or None if it is not configured """
+    alias = getattr(settings, 'DATABASE_REPLICA', REPLICA)
+    return alias if alias in settings.DATABASES else None
+
+
+def is_pinned(request):
+    """ Whether the session wrote recently, and must read its writes from the primary database """
+    session = getattr(request, 'session', None)
+    if session is None:
+        return False
+    last_write = session.get(SESSION_KEY)
+    return last_write is not None and time.time() - last_write < getattr(settings, 'DATABASE_REPLICA_PIN', PIN_SECONDS)
+
+
+class ReplicaRouter:
+    """ Send the reads of the read-only views to the replica, and everything else to the primary database """
+
+    def db_for_read(self, model, **hints):
+        if _reading.get():
+            return get_replica()
+        return None
+
+    def db_for_write(self, model, **hints):
+        # The sessions are saved on every request, they do not pin the session to the primary database
+        if model._meta.app_label != 'sessions':
+            _written.set(True)
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # The replica holds the same rows as the primary database
+        return True
+
+
+def _read_from_replica(chunks):
+    """ Keep reading from the replica while a streamed response is rendered """
+    token = _reading.set(True)
+    try:
+        yield from chunks
+    finally:
+        _reading.reset(token)
+
+
+def read_only(view):
+    """ Mark a view as read-only: it does not run in a transaction (ATOMIC_REQUESTS), and its queries
+    go to the replica unless the session wrote recently. Put it under login_required. """
+
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if get_replica() is None or is_pinned(request):
+            return view(request, *args, **kwargs)
+        token = _reading.set(True)
+        try:
+            response = view(request, *args, **kwargs)
+        finally:
+            _reading.reset(token)
+        if response.streaming:
+            response.streaming_content = _read_from_replica(response.streaming_content)
+        return response
+
+    # Without a replica the view reads from the primary database, also outside of a transaction
+    aliases = {DEFAULT_DB_ALIAS, getattr(settings, 'DATABASE_REPLICA', REPLICA)}
+    for alias in aliases:
+        wrapper = transaction.non_atomic_requests(using=alias)(wrapper)
+    return wrapper
+
+
+class ReplicaMiddleware:
+    """ Record the time of the requests which wrote to the database in their session, see is_pinned.
+    Put it after the SessionMiddleware. """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        token = _written.set(False)
+        try:
+            response = self.get_response(request)
+            if _written.get() and hasattr(request, 'session'):
+                request.session[SESSION_KEY] = time.time()
+        finally:
+            _written.reset(token)
+        return response
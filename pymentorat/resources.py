@@ -1,35 +1,45 @@
-from django.core.exceptions import ObjectDoesNotExist
+from django.utils.timezone import now
+from import_export import fields, resources
+from import_export.instance_loaders import CachedInstanceLoader
 
-from import_export import resources
 from .models import Discipline, Student, Teacher
 
-class DisciplineResource(resources.ModelResource):
-    class Meta:
-        model = Discipline
-
+class IdODResource(resources.ModelResource):
+    """ Base class for importing rows identified by their id_OD instead of their primary key """
 
-class StudentResource(resources.ModelResource):
-    """ Class for importing and exporting Students data """
+    # Exported only: the existing rows are found by id_OD
+    id = fields.Field(attribute='id', column_name='id', readonly=True)
 
-    def get_or_init_instance(self, instance_loader, row):
-        """ For existing item, get the object in database based on the id_OD and fill the id with the primary key """
+    def before_save_instance(self, instance, row, **kwargs):
+        # bulk_update does not set the auto_now field, the PDF cache, the ETags and the API rely on it
+        instance.modification_date = now()
+        super().before_save_instance(instance, row, **kwargs)
 
-        id_OD = row["id_OD"]
-        try:
-            obj = Student.objects.get(id_OD=id_OD)
+    def get_bulk_update_fields(self):
+        """ The primary key cannot be written by bulk_update, the modification date is written by hand """
+        fields = [name for name, field in self.fields.items()
+                  if not field.readonly and name not in self._meta.import_id_fields]
+        return fields + ['modification_date']
 
-            row["id"]=obj.pk
 
-        except ObjectDoesNotExist:
-            pass
+class DisciplineResource(resources.ModelResource):
+    class Meta:
+        model = Discipline
 
-        return super(StudentResource,self).get_or_init_instance(instance_loader, row)
 
+class StudentResource(IdODResource):
+    """ Class for importing and exporting Students data """
 
     class Meta:
         model = Student
         skip_unchanged = True
         report_skipped = True
+        # Load the existing students of the file in one query, keyed by id_OD, and compare them in memory
+        import_id_fields = ('id_OD',)
+        instance_loader_class = CachedInstanceLoader
+        # Write the new and changed students by batches
+        use_bulk = True
+        batch_size = 500
         fields = (
             'id',
             'id_OD',
@@ -41,30 +51,20 @@ class StudentResource(resources.ModelResource):
 
         export_order = fields
 
-#        import_id_fields = ('id_OD')
-
 
-class TeacherResource(resources.ModelResource):
+class TeacherResource(IdODResource):
     """ Class for importing and exporting Teacher data """
 
-    def get_or_init_instance(self, instance_loader, row):
-        """ For existing item, get the object in database based on the id_OD and fill the id with the primary key """
-        id_OD = row["id_OD"]
-        try:
-            obj = Teacher.objects.get(id_OD=id_OD)
-
-            row["id"]=obj.pk
-
-        except ObjectDoesNotExist:
-            pass
-
-        return super(TeacherResource,self).get_or_init_instance(instance_loader, row)
-
-
     class Meta:
         model = Teacher
         skip_unchanged = True
         report_skipped = True
+        # Load the existing teachers of the file in one query, keyed by id_OD, and compare them in memory
+        import_id_fields = ('id_OD',)
+        instance_loader_class = CachedInstanceLoader
+        # Write the new and changed teachers by batches
+        use_bulk = True
+        batch_size = 500
         fields = (
             'id',
             'id_OD',
@@ -0,0 +1,58 @@
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+
+from .apps import CURRENT_YEAR
+from .counters import get_counted_key, get_saved_key, move_counted_row
+from .dashboard import invalidate_dashboard
+from .models import Discipline, Student, Mentor, EDA, Contract, Convocation
+
+
+@receiver(post_save, sender=Mentor)
+@receiver(post_delete, sender=Mentor)
+@receiver(post_save, sender=EDA)
+@receiver(post_delete, sender=EDA)
+@receiver(post_save, sender=Contract)
+@receiver(post_delete, sender=Contract)
+def invalidate_dashboard_of_year(sender, instance, **kwargs):
+    """ Invalidate the home page of the year of the row, and of the current year in case the year was changed """
+    invalidate_dashboard(instance.year, CURRENT_YEAR)
+
+
+@receiver(post_save, sender=Convocation)
+@receiver(post_delete, sender=Convocation)
+@receiver(post_save, sender=Student)
+def invalidate_current_dashboard(sender, instance, **kwargs):
+    """ The upcoming convocations and the names of the students are displayed on the current home page """
+    invalidate_dashboard()
+
+
+@receiver(post_save, sender=Discipline)
+@receiver(post_delete, sender=Discipline)
+def invalidate_dashboard_of_discipline(sender, instance, **kwargs):
+    """ The name of the discipline is displayed with its contracts on the home page of their years.
+    The contracts of a deleted discipline were deleted before it, and invalidated their years. """
+    years = Contract.objects.filter(discipline=instance).values_list('year', flat=True).distinct()
+    invalidate_dashboard(CURRENT_YEAR, *years)
+
+
+@receiver(pre_save, sender=Mentor)
+@receiver(pre_save, sender=EDA)
+@receiver(pre_save, sender=Contract)
+def remember_counted_key(sender, instance, **kwargs):
+    """ Remember the counter of the row before the save, to move it to its new counter afterwards """
+    instance._saved_counted_key = get_saved_key(instance)
+
+
+@receiver(post_save, sender=Mentor)
+@receiver(post_save, sender=EDA)
+@receiver(post_save, sender=Contract)
+def update_counters_on_save(sender, instance, **kwargs):
+    move_counted_row(sender, getattr(instance, '_saved_counted_key', None), get_counted_key(instance))
+    instance._saved_counted_key = get_counted_key(instance)
+
+
+@receiver(post_delete, sender=Mentor)
+@receiver(post_delete, sender=EDA)
+@receiver(post_delete, sender=Contract)
+def update_counters_on_delete(sender, instance, **kwargs):
+    move_counted_row(sender, get_counted_key(instance), None)
@@ -0,0 +1,85 @@
+from django.db.models import Count, IntegerField, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+
+from .models import Discipline, Student, Mentor, EDA, Contract
+
+# Counters of EDAs by prefix of the student's class
+CLASS_PREFIXES = {
+    'eda1': '1',
+    'eda2': '2',
+    'eda3': '3',
+    'eda1c': '1C',
+    'eda2c': '2C',
+    'eda3c': '3C',
+    'eda1m': '1M',
+    'eda2m': '2M',
+    'eda3m': '3M',
+    'eda4': '4',
+}
+
+
+def _count_by_discipline(queryset):
+    """ Correlated subquery counting the rows of queryset for the outer discipline """
+    subquery = queryset.filter(discipline=OuterRef('pk')).order_by().values('discipline')
+    subquery = subquery.annotate(n=Count('pk')).values('n')
+    return Coalesce(Subquery(subquery, output_field=IntegerField()), 0)
+
+
+def get_statistics(year=None):
+    """ Compute the statistics of the mentorat in two queries.
+
+    Returns the "numberof" structure of the statistiques page: the counters by discipline
+    ("byBranch", keyed by Discipline), the totals of EDAs by class ("totaux") and the overall counts.
+    If year is given, only the mentors, EDAs and contracts of that year are counted.
+
+    The counts include the inactive rows and the closed contracts of every year, which the
+    DisciplineCounter table does not hold: the active rows of a year are read with counters.get_totals.
+    """
+    mentors = Mentor.objects.all()
+    contracts = Contract.objects.all()
+    eda_filter = Q()
+    if year is not None:
+        mentors = mentors.filter(year=year)
+        contracts = contracts.filter(year=year)
+        eda_filter = Q(eda__year=year)
+
+    eda_counters = {
+        key: Count('eda', filter=eda_filter & Q(eda__student__classe__startswith=prefix))
+        for key, prefix in CLASS_PREFIXES.items()
+    }
+    disciplines = Discipline.objects.order_by('name').annotate(
+        nb_mentors=_count_by_discipline(mentors),
+        nb_contracts=_count_by_discipline(contracts),
+        nb_eda=Count('eda', filter=eda_filter),
+        **eda_counters
+    )
+
+    by_branch = {}
+    totaux = dict.fromkeys(CLASS_PREFIXES, 0)
+    nb_mentors = nb_eda = nb_contracts = 0
+    for disc in disciplines:
+        by_branch[disc] = {
+            'contracts': disc.nb_contracts,
+            'mentors': disc.nb_mentors,
+            'eda': disc.nb_eda,
+        }
+        for key in CLASS_PREFIXES:
+            by_branch[disc][key] = getattr(disc, key)
+            totaux[key] += getattr(disc, key)
+        nb_mentors += disc.nb_mentors
+        nb_eda += disc.nb_eda
+        nb_contracts += disc.nb_contracts
+
+    # The totals by year only count the C and M classes
+    totaux['eda1'] = totaux['eda1c'] + totaux['eda1m']
+    totaux['eda2'] = totaux['eda2c'] + totaux['eda2m']
+    totaux['eda3'] = totaux['eda3c'] + totaux['eda3m']
+
+    return {
+        'byBranch': by_branch,
+        'totaux': totaux,
+        'nbstudents': Student.objects.count(),
+        'nbmentors': nb_mentors,
+        'nbeda': nb_eda,
+        'nbcontracts': nb_contracts,
+    }
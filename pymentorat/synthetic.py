@@ -0,0 +1,150 @@
+import random
+from datetime import date, time, timedelta
+
+from django.db.models import Max
+
+from .apps import CURRENT_YEAR
+from .counters import reconcile_counters
+from .dashboard import invalidate_dashboard
+from .models import Discipline, Student, Teacher, Mentor, EDA, Contract, Convocation
+
+# Prefix of the names and id_OD of the synthetic rows
+PREFIX = 'synthetic-'
+
+# Number of rows inserted at once
+BATCH_SIZE = 2000
+
+NB_DISCIPLINES = 12
+# Proportions of the number of students
+TEACHER_RATIO = 0.02
+MENTOR_RATIO = 0.25
+EDA_RATIO = 0.5
+# Probabilities that an EDA has a contract, that a contract is followed by another one,
+# and that the last contract of an EDA of the current year is still open
+CONTRACT_RATE = 0.8
+FOLLOWING_RATE = 0.3
+OPEN_RATE = 0.5
+MAX_CHAIN = 4
+
+
+class SyntheticDataError(Exception):
+    pass
+
+
+def has_synthetic_data():
+    return Student.objects.filter(id_OD__startswith=PREFIX).exists()
+
+
+def _insert(model, objects, batch_size=BATCH_SIZE):
+    """ Insert the objects by batches and return the primary keys of the new rows, in insertion order.
+
+    The keys are read back from the table, bulk_create does not set them on every database.
+    """
+    last = model.objects.aggregate(last=Max('pk'))['last'] or 0
+    batch = []
+    for instance in objects:
+        batch.append(instance)
+        if len(batch) == batch_size:
+            model.objects.bulk_create(batch)
+            batch = []
+    model.objects.bulk_create(batch)
+    return list(model.objects.filter(pk__gt=last).order_by('pk').values_list('pk', flat=True))
+
+
+def generate(rows, years=5, seed=0, progress=None):
+    """ Fill the database with rows students and the teachers, mentors, EDAs, contracts (some of them
+    following a previous one) and convocations going with them, spread over the last years.
+
+    The same seed always generates the same data. The rows are created by batches, the objects of
+    a table are never all in memory at once. progress is called with the name and the number of rows of each filled table.
+    Returns the number of rows created for each model.
+    """
+    if has_synthetic_data():
+        raise SyntheticDataError("The database already contains synthetic data")
+    rng = random.Random(seed)
+    first_year = CURRENT_YEAR - years + 1
+    counts = {}
+
+    def report(model, ids):
+        counts[model] = len(ids)
+        if progress is not None:
+            progress(model._meta.verbose_name_plural, len(ids))
+
+    disciplines = _insert(Discipline, (Discipline(name='{0}{1}'.format(PREFIX, i)) for i in range(NB_DISCIPLINES)))
+    report(Discipline, disciplines)
+    teachers = _insert(Teacher, (
+        Teacher(name='T{0:06d}'.format(i), vorname='t', id_OD='{0}t{1}'.format(PREFIX, i))
+        for i in range(max(int(rows * TEACHER_RATIO), 1))))
+    report(Teacher, teachers)
+    students = _insert(Student, (
+        Student(name='S{0:08d}'.format(rng.randrange(10 ** 8)), vorname='s', id_OD='{0}s{1}'.format(PREFIX, i),
+                classe='{0}M{1}'.format(rng.randint(1, 4), rng.randint(1, 9)))
+        for i in range(rows)))
+    report(Student, students)
+
+    def holders(model, ratio):
+        """ Insert the mentors or EDAs, and return their (pk, discipline_id, year, inscription_date) """
+        values = []
+        for i in range(int(rows * ratio)):
+            year = rng.randint(first_year, CURRENT_YEAR)
+            values.append((rng.choice(students), rng.choice(disciplines), rng.choice(teachers), year,
+                           date(year, 9, 1) + timedelta(days=rng.randrange(300)), rng.random() < 0.9))
+        ids = _insert(model, (
+            model(student_id=student, discipline_id=discipline, teacher_id=teacher, year=year,
+                  inscription_date=inscription_date, is_active=is_active)
+            for student, discipline, teacher, year, inscription_date, is_active in values))
+        report(model, ids)
+        return [(pk, discipline, year, inscription_date)
+                for pk, (student, discipline, teacher, year, inscription_date, is_active) in zip(ids, values)]
+
+    mentors_by_key = {}
+    for pk, discipline, year, inscription_date in holders(Mentor, MENTOR_RATIO):
+        mentors_by_key.setdefault((discipline, year), []).append(pk)
+    edas = holders(EDA, EDA_RATIO)
+
+    # Contracts of an EDA with a mentor of its discipline and year, a following contract starts when
+    # the previous one ends. Inserted level by level, so that the parent contracts have their key.
+    level = []
+    for eda, discipline, year, inscription_date in edas:
+        mentors = mentors_by_key.get((discipline, year))
+        if mentors and rng.random() < CONTRACT_RATE:
+            chain = 1
+            while chain < MAX_CHAIN and rng.random() < FOLLOWING_RATE:
+                chain += 1
+            level.append((eda, discipline, year, inscription_date, chain, None, mentors))
+    contracts = []
+    while level:
+        following = []
+        values = []
+        for eda, discipline, year, begin_date, chain, parent, mentors in level:
+            if chain == 1 and year == CURRENT_YEAR and rng.random() < OPEN_RATE:
+                end_date = None
+            else:
+                end_date = begin_date + timedelta(days=rng.randrange(14, 120))
+            values.append((eda, rng.choice(mentors), discipline, year, begin_date, end_date, parent))
+        ids = _insert(Contract, (
+            Contract(eda_id=eda, mentor_id=mentor, discipline_id=discipline, year=year, begin_date=begin_date,
+                     end_date=end_date, contract_parent_id=parent)
+            for eda, mentor, discipline, year, begin_date, end_date, parent in values))
+        for pk, (eda, discipline, year, begin_date, chain, parent, mentors), value in zip(ids, level, values):
+            end_date = value[5]
+            contracts.append((pk, begin_date, end_date is None))
+            if chain > 1:
+                following.append((eda, discipline, year, end_date, chain - 1, pk, mentors))
+        level = following
+    counts[Contract] = len(contracts)
+    if progress is not None:
+        progress(Contract._meta.verbose_name_plural, len(contracts))
+
+    # A convocation a week after the beginning of each contract, in the next weeks for the open contracts
+    today = date.today()
+    convocations = _insert(Convocation, (
+        Convocation(contract_id=pk, time=time(12, 15),
+                    date=today + timedelta(days=rng.randrange(1, 30)) if is_open else begin_date + timedelta(days=7))
+        for pk, begin_date, is_open in contracts))
+    report(Convocation, convocations)
+
+    # The signals are not sent by bulk_create
+    reconcile_counters(fix=True)
+    invalidate_dashboard(*range(first_year, CURRENT_YEAR + 1))
+    return counts
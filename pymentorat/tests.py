@@ -1,3 +1,682 @@
-from django.test import TestCase
+import os
+import random
+import re
+import tempfile
+from collections import Counter
+from datetime import date, time, timedelta
+from io import BytesIO
+from itertools import product
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.contrib.sessions.backends.db import SessionStore
+from django.core.cache import cache
+from django.db import connection, router
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils.timezone import now
+
+from .apps import CURRENT_YEAR
+from .benchmark import get_routes
+from .dashboard import get_dashboard
+from .importers import import_file
+from .jobs import claim_job, cleanup_job_files, run_job
+from .matching import create_contracts, propose_matching, solve_transport
+from .pdf_export import stream_merged_pdf, _render_document
+from .pdf_merge import read_objects
+from .replica import SESSION_KEY, ReplicaMiddleware, is_pinned, read_only
+from .stats import CLASS_PREFIXES, get_statistics
+from .models import Discipline, Student, Teacher, Mentor, EDA, Contract, Convocation, Job
+
+# Number of rows of each table in the two measures
+SMALL = 10
+LARGE = 500
+
+# Models whose admin changelist is measured
+ADMIN_MODELS = ['discipline', 'student', 'teacher', 'mentor', 'eda', 'contract', 'convocation', 'job']
+
+# Maximum number of queries of each page, including the session and user queries and the savepoint
+# of the request transaction (ATOMIC_REQUESTS)
+BUDGETS = {
+    'pymentorat:index': 7,
+    'pymentorat:student_list': 5,
+    'pymentorat:student_details': 11,
+    'pymentorat:student_update': 5,
+    'pymentorat:teacher_list': 5,
+    'pymentorat:teacher_update': 5,
+    'pymentorat:mentor_list': 6,
+    'pymentorat:mentor_export': 5,
+    'pymentorat:mentor_details': 7,
+    'pymentorat:mentor_create': 7,
+    'pymentorat:mentor_create_from_student': 7,
+    'pymentorat:mentor_update': 8,
+    'pymentorat:eda_list': 6,
+    'pymentorat:eda_nomentor_list': 6,
+    'pymentorat:eda_export': 5,
+    'pymentorat:eda_details': 7,
+    'pymentorat:eda_create': 7,
+    'pymentorat:eda_create_from_student': 7,
+    'pymentorat:eda_update': 8,
+    'pymentorat:contract_list': 8,
+    'pymentorat:contract_export': 5,
+    'pymentorat:contract_create': 9,
+    'pymentorat:contract_matching': 6,
+    'pymentorat:contract_duplicate': 11,
+    'pymentorat:contract_update': 11,
+    'pymentorat:contract_simple_list': 4,
+    'pymentorat:contract_pdf': 5,
+    'pymentorat:contract_pdf_bulk': 5,
+    'pymentorat:convocation_create': 10,
+    'pymentorat:convocation_update': 11,
+    'pymentorat:convocation_delete': 10,
+    'pymentorat:convocation_pdf': 5,
+    'pymentorat:convocation_pdf_bulk': 5,
+    'pymentorat:statistiques': 6,
+    'pymentorat:api_list': 3,
+    'admin:pymentorat_discipline_changelist': 7,
+    'admin:pymentorat_student_changelist': 7,
+    'admin:pymentorat_teacher_changelist': 7,
+    'admin:pymentorat_mentor_changelist': 8,
+    'admin:pymentorat_eda_changelist': 8,
+    'admin:pymentorat_contract_changelist': 8,
+    'admin:pymentorat_convocation_changelist': 8,
+    'admin:pymentorat_job_changelist': 8,
+}
+
+
+def create_rows(number, discipline, teacher, start=0, mentor=None):
+    """ Create number rows of each table: pairs of an EDA and a mentor of the current year, with a
+    contract following an ended contract and an upcoming convocation, and an EDA waiting for a mentor.
+
+    Every fifth contract is given to mentor if set. Returns the mentor of the first row.
+    """
+    today = date.today()
+    for i in range(start, start + number):
+        def student(prefix):
+            return Student.objects.create(name='{0}{1:04d}'.format(prefix, i), vorname=prefix.lower(),
+                                          id_OD='{0}{1}'.format(prefix, i), classe='{0}M1'.format(1 + i % 4))
+        eda = EDA.objects.create(student=student('Eda'), discipline=discipline, teacher=teacher, year=CURRENT_YEAR)
+        row_mentor = Mentor.objects.create(student=student('Mentor'), discipline=discipline, teacher=teacher,
+                                           year=CURRENT_YEAR)
+        EDA.objects.create(student=student('Attente'), discipline=discipline, teacher=teacher, year=CURRENT_YEAR)
+        if mentor is None:
+            mentor = row_mentor
+        contract_mentor = mentor if i % 5 == 0 else row_mentor
+        # The two contracts of a row begin the same day, so that they are on the same page of the lists
+        begin_date = today - timedelta(days=30 + i)
+        ended = Contract.objects.create(eda=eda, mentor=contract_mentor, discipline=discipline, year=CURRENT_YEAR,
+                                        begin_date=begin_date, end_date=begin_date)
+        contract = Contract.objects.create(eda=eda, mentor=contract_mentor, discipline=discipline, year=CURRENT_YEAR,
+                                           begin_date=begin_date, contract_parent=ended)
+        Convocation.objects.create(contract=contract, date=today + timedelta(days=1 + i % 20), time=time(12, 15))
+    return mentor
+
+
+def format_queries(queries):
+    """ The distinct SQL of the queries, the most repeated first, the queries run once per row stand out """
+    counts = Counter(query['sql'] for query in queries)
+    return '\n'.join('{0} x {1}'.format(count, sql) for sql, count in counts.most_common())
+
+
+@override_settings(PDF_CACHE_DIR=None, CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class QueryBudgetTests(TestCase):
+    """ The number of queries of each page must not grow with the number of rows, and stay in its budget """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_superuser('admin', 'admin@example.com', 'admin')
+        cls.discipline = Discipline.objects.create(name='Maths')
+        cls.teacher = Teacher.objects.create(name='Maitre', vorname='m', id_OD='T1')
+        cls.mentor = create_rows(SMALL, cls.discipline, cls.teacher)
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def get_routes(self):
+        routes = get_routes()
+        for model in ADMIN_MODELS:
+            name = 'admin:pymentorat_{0}_changelist'.format(model)
+            routes.append((name, reverse(name)))
+        return routes
+
+    def capture_queries(self, url):
+        """ Request the url, reading the streamed responses, and return the executed queries """
+        # The cached home page would hide its queries
+        cache.clear()
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+            if response.streaming:
+                b''.join(response.streaming_content)
+        self.assertEqual(response.status_code, 200, url)
+        return context.captured_queries
+
+    def test_queries_do_not_grow(self):
+        routes = self.get_routes()
+        small = {name: self.capture_queries(url) for name, url in routes}
+        create_rows(LARGE - SMALL, self.discipline, self.teacher, start=SMALL, mentor=self.mentor)
+        large = {name: self.capture_queries(url) for name, url in routes}
+
+        for name, url in routes:
+            with self.subTest(view=name):
+                self.assertIn(name, BUDGETS, "No query budget declared for {0}".format(name))
+                queries = large[name]
+                if len(queries) > len(small[name]) or len(queries) > BUDGETS[name]:
+                    self.fail("{0} ({1}): {2} queries with {3} rows, {4} with {5} rows, budget {6}:\n{7}".format(
+                        name, url, len(queries), LARGE, len(small[name]), SMALL, BUDGETS[name],
+                        format_queries(queries)))
+
+
+@override_settings(PDF_CACHE_DIR=None)
+class ConditionalGetTests(TestCase):
+    """ The detail pages and the PDFs answer 304 without rendering while their rows did not change """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_superuser('admin', 'admin@example.com', 'admin')
+        discipline = Discipline.objects.create(name='Maths')
+        teacher = Teacher.objects.create(name='Maitre', vorname='m', id_OD='T1')
+        create_rows(1, discipline, teacher)
+        cls.contract = Contract.objects.filter(contract_parent__isnull=False).select_related('eda', 'mentor').get()
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def get_urls(self):
+        contract = self.contract
+        return [
+            reverse('pymentorat:student_details', args=[contract.eda.student_id]),
+            reverse('pymentorat:mentor_details', args=[contract.mentor_id]),
+            reverse('pymentorat:eda_details', args=[contract.eda_id]),
+            reverse('pymentorat:contract_pdf', args=[contract.pk]),
+            reverse('pymentorat:convocation_pdf', args=[contract.convocation_set.get().pk]),
+        ]
+
+    def test_not_modified(self):
+        for url in self.get_urls():
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+                # The session, the user and the validators
+                with self.assertNumQueries(3):
+                    response = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+                self.assertEqual(response.status_code, 304)
+
+    def test_modified(self):
+        urls = self.get_urls()
+        etags = [self.client.get(url)['ETag'] for url in urls]
+        # Displayed on every page and document
+        student = self.contract.mentor.student
+        student.name = 'Renamed'
+        student.save()
+        for url, etag in zip(urls, etags):
+            with self.subTest(url=url):
+                self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_deleted_contract(self):
+        url = reverse('pymentorat:eda_details', args=[self.contract.eda_id])
+        etag = self.client.get(url)['ETag']
+        self.contract.delete()
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+
+class ImportTests(TestCase):
+    """ The rows written by batches by the roster imports """
+
+    def import_students(self, *rows):
+        lines = ['id_OD,name,vorname,classe,email'] + [','.join(row) for row in rows]
+        return import_file('student', BytesIO('\n'.join(lines).encode('utf-8')), 'csv')
+
+    def test_update_moves_modification_date(self):
+        self.import_students(('S1', 'Dupont', 'Jean', '1M1', 'jean@example.com'))
+        created = Student.objects.get(id_OD='S1')
+
+        report = self.import_students(('S1', 'Dupont', 'Jean', '2M1', 'jean@example.com'))
+        self.assertEqual(report.totals['update'], 1)
+        updated = Student.objects.get(id_OD='S1')
+        self.assertEqual(updated.classe, '2M1')
+        self.assertGreater(updated.modification_date, created.modification_date)
+
+    def test_unchanged_row_is_skipped(self):
+        self.import_students(('S1', 'Dupont', 'Jean', '1M1', 'jean@example.com'))
+        created = Student.objects.get(id_OD='S1')
+
+        report = self.import_students(('S1', 'Dupont', 'Jean', '1M1', 'jean@example.com'))
+        self.assertEqual(report.totals['skip'], 1)
+        self.assertEqual(Student.objects.get(id_OD='S1').modification_date, created.modification_date)
+
+
+def brute_force_transport(unit_costs, capacities, costs):
+    """ (number of units, total cost) of the best flow of solve_transport, by trying every flow """
+    cells = [(r, c) for r in range(len(unit_costs)) for c in range(len(capacities)) if costs[r][c] is not None]
+    best = (0, 0)
+    for amounts in product(*[range(min(len(unit_costs[r]), capacities[c]) + 1) for r, c in cells]):
+        sent = [0] * len(unit_costs)
+        received = [0] * len(capacities)
+        total = 0
+        for (r, c), amount in zip(cells, amounts):
+            sent[r] += amount
+            received[c] += amount
+            total += amount * costs[r][c]
+        if any(sent[r] > len(units) for r, units in enumerate(unit_costs)) or \
+                any(received[c] > capacity for c, capacity in enumerate(capacities)):
+            continue
+        # The units of a row group are sent cheapest first
+        total += sum(sum(units[:sent[r]]) for r, units in enumerate(unit_costs))
+        units = sum(sent)
+        if units > best[0] or (units == best[0] and total < best[1]):
+            best = (units, total)
+    return best
+
+
+class MatchingTests(TestCase):
+    """ The matching engine and the creation of the proposed contracts """
+
+    def test_solve_transport_is_optimal(self):
+        rng = random.Random(0)
+        for instance in range(200):
+            nb_rows, nb_columns = rng.randint(1, 3), rng.randint(1, 3)
+            unit_costs = [sorted(rng.randint(-20, 5) for unit in range(rng.randint(0, 3))) for r in range(nb_rows)]
+            capacities = [rng.randint(0, 2) for c in range(nb_columns)]
+            costs = [[rng.choice([None, rng.randint(0, 30)]) for c in range(nb_columns)] for r in range(nb_rows)]
+            with self.subTest(unit_costs=unit_costs, capacities=capacities, costs=costs):
+                flow = solve_transport(unit_costs, capacities, costs)
+                sent = [sum(row) for row in flow]
+                for r, row in enumerate(flow):
+                    for c, amount in enumerate(row):
+                        self.assertGreaterEqual(amount, 0)
+                        if costs[r][c] is None:
+                            self.assertEqual(amount, 0)
+                for c, capacity in enumerate(capacities):
+                    self.assertLessEqual(sum(row[c] for row in flow), capacity)
+                total = sum(amount * costs[r][c] for r, row in enumerate(flow) for c, amount in enumerate(row) if amount)
+                total += sum(sum(units[:sent[r]]) for r, units in enumerate(unit_costs))
+                self.assertEqual((sum(sent), total), brute_force_transport(unit_costs, capacities, costs))
+
+    def setUp(self):
+        self.maths = Discipline.objects.create(name='Maths')
+        self.allemand = Discipline.objects.create(name='Allemand')
+        self.teacher = Teacher.objects.create(name='Maitre', vorname='m', id_OD='T1')
+        self.number = 0
+
+    def create(self, model, classe, discipline, days=0):
+        self.number += 1
+        student = Student.objects.create(name='{0}{1}'.format(model.__name__, self.number), vorname='v',
+                                         id_OD=str(self.number), classe=classe)
+        return model.objects.create(student=student, discipline=discipline, teacher=self.teacher, year=CURRENT_YEAR,
+                                    inscription_date=date.today() - timedelta(days=days))
+
+    def proposed_pairs(self, **kwargs):
+        return {(proposal.eda, proposal.mentor) for proposal in propose_matching(**kwargs)}
+
+    def test_mentor_of_the_discipline(self):
+        eda = self.create(EDA, '2M1', self.maths)
+        self.create(Mentor, '3M1', self.allemand)
+        mentor = self.create(Mentor, '3M1', self.maths)
+        self.assertEqual(self.proposed_pairs(), {(eda, mentor)})
+
+    def test_mentor_not_in_a_lower_year(self):
+        eda = self.create(EDA, '3M1', self.maths)
+        self.create(Mentor, '2M1', self.maths)
+        self.assertEqual(self.proposed_pairs(), set())
+        mentor = self.create(Mentor, '4M1', self.maths)
+        self.assertEqual(self.proposed_pairs(), {(eda, mentor)})
+
+    def test_capacity_of_the_mentors(self):
+        edas = [self.create(EDA, '1M1', self.maths, days=days) for days in (3, 2, 1)]
+        mentor = self.create(Mentor, '3M1', self.maths)
+        # The EDAs waiting for the longest are served first
+        self.assertEqual(self.proposed_pairs(max_contracts=2), {(edas[0], mentor), (edas[1], mentor)})
+        Contract.objects.create(eda=edas[0], mentor=mentor, discipline=self.maths, year=CURRENT_YEAR)
+        self.assertEqual(self.proposed_pairs(max_contracts=2), {(edas[1], mentor)})
+        self.assertEqual(self.proposed_pairs(max_contracts=1), set())
+
+    def test_create_contracts(self):
+        eda = self.create(EDA, '1M1', self.maths)
+        other_eda = self.create(EDA, '1M1', self.maths)
+        german_eda = self.create(EDA, '1M1', self.allemand)
+        mentor = self.create(Mentor, '3M1', self.maths)
+        pairs = [(eda.pk, mentor.pk), (eda.pk, mentor.pk), (german_eda.pk, mentor.pk), (other_eda.pk, mentor.pk)]
+        created = create_contracts(pairs, max_contracts=2)
+        self.assertEqual([(contract.eda, contract.mentor) for contract in created],
+                         [(eda, mentor), (other_eda, mentor)])
+
+    def test_create_contracts_skips_stale_pairs(self):
+        eda = self.create(EDA, '1M1', self.maths)
+        matched_eda = self.create(EDA, '1M1', self.maths)
+        mentor = self.create(Mentor, '3M1', self.maths)
+        full_mentor = self.create(Mentor, '3M1', self.maths)
+        # Matched since the proposal was made
+        Contract.objects.create(eda=matched_eda, mentor=mentor, discipline=self.maths, year=CURRENT_YEAR)
+        Contract.objects.create(eda=self.create(EDA, '1M1', self.maths), mentor=full_mentor,
+                                discipline=self.maths, year=CURRENT_YEAR)
+        created = create_contracts([(matched_eda.pk, mentor.pk), (eda.pk, full_mentor.pk)], max_contracts=1)
+        self.assertEqual(created, [])
+        created = create_contracts([(eda.pk, mentor.pk)], max_contracts=2)
+        self.assertEqual([(contract.eda, contract.mentor) for contract in created], [(eda, mentor)])
+
+
+class WaitingQueueTests(TestCase):
+    """ The EDAs waiting for a mentor and their position in the queue of their discipline """
+
+    def setUp(self):
+        self.maths = Discipline.objects.create(name='Maths')
+        self.teacher = Teacher.objects.create(name='Maitre', vorname='m', id_OD='T1')
+        self.number = 0
+
+    def create(self, model, days, discipline=None, **kwargs):
+        self.number += 1
+        student = Student.objects.create(name='{0}{1}'.format(model.__name__, self.number), vorname='v',
+                                         id_OD='{0}{1}'.format(model.__name__, self.number), classe='1M1')
+        return model.objects.create(student=student, discipline=discipline or self.maths, teacher=self.teacher,
+                                    year=CURRENT_YEAR, inscription_date=date.today() - timedelta(days=days),
+                                    **kwargs)
+
+    def contract(self, eda, mentor, end_date=None):
+        return Contract.objects.create(eda=eda, mentor=mentor, discipline=self.maths, year=CURRENT_YEAR,
+                                       end_date=end_date)
+
+    def test_waiting_queue(self):
+        mentor = self.create(Mentor, 30)
+        with_open_contract = self.create(EDA, 20)
+        self.contract(with_open_contract, mentor)
+        self.create(EDA, 15, is_active=False)
+        with_ended_contracts = self.create(EDA, 10)
+        self.contract(with_ended_contracts, mentor, date.today() - timedelta(days=5))
+        self.contract(with_ended_contracts, mentor, date.today() - timedelta(days=2))
+        first_same_day = self.create(EDA, 5)
+        second_same_day = self.create(EDA, 5)
+        other_discipline = self.create(EDA, 50, Discipline.objects.create(name='Allemand'))
+
+        queue = EDA.objects.waiting().with_queue_position().order_by('pk')
+        self.assertEqual([(eda, eda.queue_position, eda.queue_length) for eda in queue], [
+            (with_ended_contracts, 1, 3),
+            (first_same_day, 2, 3),
+            (second_same_day, 3, 3),
+            (other_discipline, 1, 1),
+        ])
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class DashboardTests(TestCase):
+    """ The cached home page is invalidated when the rows it displays change """
+
+    def test_discipline_renamed(self):
+        cache.clear()
+        maths = Discipline.objects.create(name='Maths')
+        create_rows(1, maths, Teacher.objects.create(name='Maitre', vorname='m', id_OD='T1'))
+        self.assertEqual({contract['discipline_name'] for contract in get_dashboard()['contracts']}, {'Maths'})
+
+        maths.name = 'Mathématiques'
+        with self.captureOnCommitCallbacks(execute=True):
+            maths.save()
+        self.assertEqual({contract['discipline_name'] for contract in get_dashboard()['contracts']},
+                         {'Mathématiques'})
+
+
+class ApiTests(TestCase):
+    """ The JSON API: field selection, synchronisation with ?since= and errors """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_superuser('admin', 'admin@example.com', 'admin')
+        discipline = Discipline.objects.create(name='Maths')
+        teacher = Teacher.objects.create(name='Maitre', vorname='m', id_OD='T1')
+        create_rows(3, discipline, teacher)
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def get(self, resource, status=200, **params):
+        response = self.client.get(reverse('pymentorat:api_list', args=[resource]), params)
+        self.assertEqual(response.status_code, status)
+        return response.json()
+
+    def test_fields(self):
+        data = self.get('contracts', fields='eda_name,mentor_name', limit=2)
+        self.assertEqual([set(row) for row in data['results']], [{'eda_name', 'mentor_name'}] * 2)
+        contract = Contract.objects.select_related('eda__student', 'mentor__student').order_by('pk').first()
+        self.assertEqual(data['results'][0], {'eda_name': contract.eda.student.name,
+                                              'mentor_name': contract.mentor.student.name})
+        # The columns of the table by default, without joins
+        row = self.get('contracts')['results'][0]
+        self.assertIn('eda_id', row)
+        self.assertNotIn('eda_name', row)
+
+    def test_unknown_field(self):
+        self.assertEqual(self.get('contracts', 400, fields='id,salary'), {'error': "Unknown field: salary"})
+
+    def test_since(self):
+        base = now()
+        students = list(Student.objects.order_by('pk'))
+        # The first one is older than since, the others are modified two by two at the same time
+        Student.objects.filter(pk=students[0].pk).update(modification_date=base - timedelta(days=2))
+        for i, student in enumerate(students[1:]):
+            Student.objects.filter(pk=student.pk).update(modification_date=base - timedelta(hours=len(students) - i // 2))
+        expected = [student.pk for student in students[1:]]
+
+        data = self.get('students', since=(base - timedelta(days=1)).isoformat(), fields='id', limit=2)
+        ids = [row['id'] for row in data['results']]
+        while data['next']:
+            data = self.client.get(data['next']).json()
+            ids += [row['id'] for row in data['results']]
+        self.assertEqual(ids, expected)
+        self.assertGreater(len(expected), 2)
+
+        data = self.get('students', since='2020-01-01', fields='id', limit=1000)
+        self.assertEqual([row['id'] for row in data['results']], [students[0].pk] + expected)
+
+    def test_pages(self):
+        data = self.get('students', fields='name', limit=4)
+        names = [row['name'] for row in data['results']]
+        self.assertIsNone(data['previous'])
+        second = self.client.get(data['next']).json()
+        first = self.client.get(second['previous']).json()
+        self.assertEqual([row['name'] for row in first['results']], names)
+        self.assertFalse(set(names) & {row['name'] for row in second['results']})
+
+    def test_invalid_parameters(self):
+        for params in ({'limit': '0'}, {'limit': '1001'}, {'limit': 'all'}, {'since': 'yesterday'},
+                       {'year': 'current'}):
+            with self.subTest(params=params):
+                self.assertIn('error', self.get('contracts', 400, **params))
+        self.assertIn('contract', self.get('convocations', 400, contract='abc')['error'])
+
+    def test_unknown_resource(self):
+        self.assertEqual(self.get('salaries', 404), {'error': "Unknown resource: salaries"})
+
+
+def count_statistics_one_by_one(year=None):
+    """ The statistics of get_statistics, counted with one query per number like the former view """
+    mentors, edas, contracts = Mentor.objects.all(), EDA.objects.all(), Contract.objects.all()
+    if year is not None:
+        mentors, edas, contracts = mentors.filter(year=year), edas.filter(year=year), contracts.filter(year=year)
+    by_branch = {}
+    for discipline in Discipline.objects.order_by('name'):
+        discipline_edas = edas.filter(discipline=discipline)
+        by_branch[discipline] = {
+            'contracts': contracts.filter(discipline=discipline).count(),
+            'mentors': mentors.filter(discipline=discipline).count(),
+            'eda': discipline_edas.count(),
+        }
+        for key, prefix in CLASS_PREFIXES.items():
+            by_branch[discipline][key] = discipline_edas.filter(student__classe__startswith=prefix).count()
+    totaux = {key: edas.filter(student__classe__startswith=prefix).count() for key, prefix in CLASS_PREFIXES.items()}
+    for level in '123':
+        totaux['eda' + level] = totaux['eda{0}c'.format(level)] + totaux['eda{0}m'.format(level)]
+    return {
+        'byBranch': by_branch,
+        'totaux': totaux,
+        'nbstudents': Student.objects.count(),
+        'nbmentors': mentors.count(),
+        'nbeda': edas.count(),
+        'nbcontracts': contracts.count(),
+    }
+
+
+class StatisticsTests(TestCase):
+    """ get_statistics counts like the one query per number it replaced """
+
+    @classmethod
+    def setUpTestData(cls):
+        teacher = Teacher.objects.create(name='Maitre', vorname='m', id_OD='T1')
+        disciplines = [Discipline.objects.create(name=name) for name in ('Maths', 'Allemand', 'Chimie', 'Vide')]
+        classes = ['1C1', '1M2', '2C3', '2M1', '3C2', '3M4', '4A', '1E1', '', 'X']
+        rng = random.Random(0)
+        for i in range(60):
+            discipline = disciplines[i % 3]
+            year = CURRENT_YEAR - i % 2
+            student = Student.objects.create(name='S{0}'.format(i), vorname='v', id_OD=str(i),
+                                             classe=classes[i % len(classes)])
+            eda = EDA.objects.create(student=student, discipline=discipline, teacher=teacher, year=year,
+                                     is_active=rng.random() < 0.8)
+            if i % 4:
+                mentor = Mentor.objects.create(student=student, discipline=disciplines[(i + 1) % 3], teacher=teacher,
+                                               year=year, is_active=rng.random() < 0.8)
+                if i % 3 == 0:
+                    # The discipline of the contract is the one of the EDA, the mentor's may differ
+                    Contract.objects.create(eda=eda, mentor=mentor, discipline=discipline, year=year,
+                                            end_date=date.today() if i % 2 else None)
+
+    def test_all_years(self):
+        self.assertEqual(get_statistics(), count_statistics_one_by_one())
+
+    def test_year(self):
+        for year in (CURRENT_YEAR, CURRENT_YEAR - 1, CURRENT_YEAR - 5):
+            with self.subTest(year=year):
+                self.assertEqual(get_statistics(year), count_statistics_one_by_one(year))
+
+    def test_queries(self):
+        with self.assertNumQueries(2):
+            get_statistics()
+
+
+class JobTests(TestCase):
+    """ The jobs of the crashed workers and the old job files """
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        settings = override_settings(JOB_FILES_DIR=self.directory)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def create_file(self, name, days=0):
+        path = os.path.join(self.directory, name)
+        with open(path, 'w') as file:
+            file.write('id_OD,name')
+        age = (now() - timedelta(days=days)).timestamp()
+        os.utime(path, (age, age))
+        return path
+
+    def test_stale_running_job_fails(self):
+        stale = Job.objects.create(action=Job.EXPORT, resource='student', file_format='csv', status=Job.RUNNING)
+        alive = Job.objects.create(action=Job.EXPORT, resource='teacher', file_format='csv', status=Job.RUNNING)
+        Job.objects.filter(pk=stale.pk).update(modification_date=now() - timedelta(hours=1))
+
+        self.assertIsNone(claim_job())
+        stale.refresh_from_db()
+        alive.refresh_from_db()
+        self.assertEqual(stale.status, Job.FAILED)
+        self.assertIsNotNone(stale.finished_at)
+        self.assertEqual(alive.status, Job.RUNNING)
+
+    def test_result_of_failed_job_is_discarded(self):
+        Student.objects.create(name='Eleve', vorname='e', id_OD='S1', classe='1M1')
+        job = Job.objects.create(action=Job.EXPORT, resource='student', file_format='csv')
+        self.assertEqual(claim_job(), job)
+        self.assertTrue(run_job(job))
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.rows), (Job.DONE, 1))
+
+        job = Job.objects.create(action=Job.EXPORT, resource='student', file_format='csv')
+        job = claim_job()
+        Job.objects.filter(pk=job.pk).update(status=Job.FAILED, message='Interrompue')
+        self.assertFalse(run_job(job))
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.message, job.path), (Job.FAILED, 'Interrompue', ''))
+        self.assertEqual(len(os.listdir(self.directory)), 1)
+
+    def test_cleanup_job_files(self):
+        def job(path, days, status=Job.DONE):
+            return Job.objects.create(action=Job.EXPORT, resource='student', file_format='csv', path=path,
+                                      status=status, finished_at=now() - timedelta(days=days))
+
+        old = job(self.create_file('old.csv', days=10), days=10)
+        recent = job(self.create_file('recent.csv', days=10), days=1)
+        pending = job(self.create_file('pending.csv', days=10), days=10, status=Job.PENDING)
+        self.create_file('orphan.csv', days=10)
+        self.create_file('upload.csv')
+
+        self.assertEqual(cleanup_job_files(), 2)
+        self.assertEqual(sorted(os.listdir(self.directory)), ['pending.csv', 'recent.csv', 'upload.csv'])
+        old.refresh_from_db()
+        self.assertEqual(old.path, '')
+        recent.refresh_from_db()
+        pending.refresh_from_db()
+        self.assertTrue(recent.path and pending.path)
+
+
+class PdfExportTests(TestCase):
+    """ The merged PDF holds the pages of the documents rendered one by one, in order """
+
+    def page_streams(self, data):
+        """ The content streams of the pages of the PDF data, in order """
+        objects, root, info = read_objects(data)
+
+        def reference(number, key):
+            return int(re.search(key + rb'\s+(\d+) 0 R', objects[number][0]).group(1))
+
+        kids = re.search(rb'/Kids\s*\[(.*?)\]', objects[reference(root, b'/Pages')][0]).group(1)
+        return [objects[reference(int(page), b'/Contents')][1] for page in re.findall(rb'(\d+) 0 R', kids)]
+
+    def test_merged_pdf(self):
+        teacher = Teacher.objects.create(name='Maitre', vorname='m', id_OD='T1')
+        create_rows(3, Discipline.objects.create(name='Maths'), teacher)
+        contracts = list(Contract.objects.select_related('eda__student', 'mentor__student', 'discipline')
+                         .order_by('-pk'))
+        merged = b''.join(stream_merged_pdf('contract', contracts, processes=1))
+
+        expected = [self.page_streams(_render_document(('contract', contract))[1]) for contract in contracts]
+        self.assertEqual(self.page_streams(merged), [stream for streams in expected for stream in streams])
+        self.assertIn(b'/Count 6', merged)
+
+
+class ReplicaTests(TestCase):
+    """ The read-only views read from the replica, unless their session wrote recently """
+
+    def setUp(self):
+        databases = dict(settings.DATABASES, replica=dict(settings.DATABASES['default'], TEST={'MIRROR': 'default'}))
+        replica = override_settings(DATABASES=databases)
+        replica.enable()
+        self.addCleanup(replica.disable)
+        self.view = read_only(lambda request: HttpResponse(router.db_for_read(Student)))
+
+    def request(self):
+        request = RequestFactory().get('/')
+        request.session = SessionStore()
+        return request
+
+    def test_read_only_view_reads_from_replica(self):
+        self.assertEqual(self.view(self.request()).content, b'replica')
+        self.assertEqual(router.db_for_read(Student), 'default')
+
+    def test_write_pins_session(self):
+        def writing_view(request):
+            Discipline.objects.create(name='Maths')
+            return HttpResponse()
+
+        reading = self.request()
+        ReplicaMiddleware(self.view)(reading)
+        self.assertNotIn(SESSION_KEY, reading.session)
+
+        writing = self.request()
+        ReplicaMiddleware(writing_view)(writing)
+        self.assertIn(SESSION_KEY, writing.session)
+        self.assertTrue(is_pinned(writing))
+        self.assertEqual(self.view(writing).content, b'default')
+
+    def test_read_only_view_is_not_atomic(self):
+        self.assertEqual(self.view._non_atomic_requests, {'default', 'replica'})
@@ -1,7 +1,7 @@
 from django.urls import path, include
 from django_filters.views import FilterView
 
-from . import views
+from . import api, views
 from .models import Contract
 
 app_name='pymentorat'
@@ -51,6 +51,11 @@ urlpatterns = [
         views.mentor_filter_list,
         name='mentor_list'
     ),
+    path(
+        'mentors_export/',
+        views.mentor_export,
+        name='mentor_export'
+    ),
     path(
         'mentor/<int:id_mentor>/',
         views.mentor_details,
@@ -82,6 +87,11 @@ urlpatterns = [
         views.eda_filter_nomentor_list,
         name='eda_nomentor_list'
     ),
+    path(
+        'eda_export/',
+        views.eda_export,
+        name='eda_export'
+    ),
     path(
         'eda/<int:id_eda>/',
         views.eda_details,
@@ -108,11 +118,21 @@ urlpatterns = [
         views.contract_filter_list,
         name='contract_list'
     ),
+    path(
+        'contract_export/',
+        views.contract_export,
+        name='contract_export'
+    ),
     path(
         'contract_create/<int:id_eda>/',
         views.contract_create_from_eda,
         name='contract_create'
     ),
+    path(
+        'contract_matching/',
+        views.contract_matching,
+        name='contract_matching'
+    ),
     path(
         'contract_duplicate/<int:id_contract>/',
         views.contract_duplicate,
@@ -133,6 +153,11 @@ urlpatterns = [
         views.contract_pdf,
         name='contract_pdf'
     ),
+    path(
+        'contract_print/',
+        views.contract_pdf_bulk,
+        name='contract_pdf_bulk'
+    ),
     # Convocation's pages
     path(
         'convocation_create/<int:id_contract>/',
@@ -154,11 +179,22 @@ urlpatterns = [
         views.convocation_pdf,
         name='convocation_pdf'
     ),
+    path(
+        'convocation_print/',
+        views.convocation_pdf_bulk,
+        name='convocation_pdf_bulk'
+    ),
     # Stats pages
     path(
         'statistiques/',
         views.statistiques,
         name='statistiques'
+    ),
+    # JSON API
+    path(
+        'api/<str:resource>/',
+        api.api_list,
+        name='api_list'
     )
     # For Class Based Views
     # path(
@@ -1,65 +1,56 @@
-from datetime import date
+import tempfile
 
 from django.shortcuts import render, get_object_or_404, redirect
 from django.views.generic import ListView
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.mixins import LoginRequiredMixin
-from django.http import HttpResponse, HttpResponseRedirect
+from django.http import HttpResponse, HttpResponseRedirect, StreamingHttpResponse, FileResponse
 from django.db.models import Q
+from django.utils.decorators import method_decorator
 from django.utils.timezone import now
-from django.utils.text import slugify
 
-from reportlab.pdfgen import canvas
-from reportlab.lib.pagesizes import A4, landscape
-from reportlab.lib.units import cm
-from reportlab.lib.utils import ImageReader
-from reportlab.pdfbase.ttfonts import TTFont
-from reportlab.pdfbase.pdfmetrics import registerFont
-from io import BytesIO
-
-from .models import Discipline, Student, Teacher, EDA, Mentor, Contract, Convocation
+from .models import Student, Teacher, EDA, Mentor, Contract, Convocation
 from .forms import MentorForm, EDAForm, StudentForm, TeacherForm, ContractForm, ParagraphErrorList, ContractFormWithEDA
 from .forms import MentorFormWithStudent, EDAFormWithStudent, ConvocationFormWithContract, ContractFormDuplicate
 from .apps import CURRENT_YEAR
 from .filter import MentorFilter, EDAFilter, StudentFilter, TeacherFilter, ContractFilter
+from .contract_tree import link_contract_tree, RELATED as CONTRACT_RELATED
+from .pagination import KeysetPaginator
+from .stats import get_statistics
+from .counters import get_totals
+from .dashboard import get_dashboard
+from .matching import propose_matching, create_contracts
+from .replica import read_only
+from .conditional import conditional_get, student_validators, mentor_validators, eda_validators
+from .conditional import contract_validators, convocation_validators
+from . import exporters, metrics, pdf, pdf_cache, pdf_export
 
 @login_required
 def index(request):
-    """ Function based view to render the home page """
-    disciplines = Discipline.objects.order_by('name')
-    mentors = Mentor.objects.filter(year=CURRENT_YEAR, is_active=True)
-    edas = EDA.objects.filter(year=CURRENT_YEAR, is_active=True)
-    contracts = Contract.objects.filter(year=CURRENT_YEAR, end_date=None).order_by('discipline')
-    convocations = Convocation.objects.filter(date__gt = now()).order_by('date', 'time')
-    context = {
-        'disciplines': disciplines,
-        'mentors': mentors,
-        'nb_mentors': mentors.count(),
-        'edas': edas,
-        'nb_edas': edas.count(),
-        'contracts': contracts,
-        'nb_contracts': contracts.count(),
-        'convocations': convocations,
-        'nbconvocations': convocations.count(),
-    }
-    return render(request, 'pymentorat/index.html', context)
+    """ Function based view to render the home page, from the cached dashboard """
+    return render(request, 'pymentorat/index.html', get_dashboard())
 
 
 # Views for students
 @login_required
+@read_only
 def student_filter_list(request):
     """ Function based view to render the list of all the students, with a filter. """
     student_list = Student.objects.order_by('name')
     student_filter = StudentFilter(request.GET, queryset=student_list)
-    return render(request, 'pymentorat/student_list.html', {'filter': student_filter})
+    page = KeysetPaginator(student_filter.qs, ('name', 'pk')).get_page(request.GET)
+    return render(request, 'pymentorat/student_list.html', {'filter': student_filter, 'page': page})
 
 @login_required
+@read_only
+@conditional_get(student_validators)
 def student_details(request, id_student):
     """ Function based view to edit an EDA. """
     student = get_object_or_404(Student, pk=id_student)
     contract_list = Contract.objects.filter(Q(mentor__student=student) | Q(eda__student=student), year=CURRENT_YEAR)
-    mentor_list = Mentor.objects.filter(student=student, year=CURRENT_YEAR)
-    eda_list = EDA.objects.filter(student=student, year=CURRENT_YEAR)
+    contract_list = contract_list.select_related(*CONTRACT_RELATED)
+    mentor_list = Mentor.objects.filter(student=student, year=CURRENT_YEAR).with_nb_contracts()
+    eda_list = EDA.objects.filter(student=student, year=CURRENT_YEAR).with_nb_contracts()
     context = {
         'student_pk' : student.pk,
         'student_name': student.name,
@@ -97,11 +88,13 @@ def student_update(request, id_student):
 
 # Views for teachers
 @login_required
+@read_only
 def teacher_filter_list(request):
     """ Function based view to render the list of all the teachers, with a filter. """
     teacher_list = Teacher.objects.order_by('name')
     teacher_filter = TeacherFilter(request.GET, queryset=teacher_list)
-    return render(request, 'pymentorat/teacher_list.html', {'filter': teacher_filter})
+    page = KeysetPaginator(teacher_filter.qs, ('name', 'pk')).get_page(request.GET)
+    return render(request, 'pymentorat/teacher_list.html', {'filter': teacher_filter, 'page': page})
 
 
 @login_required
@@ -117,17 +110,26 @@ def teacher_update(request, id_teacher):
 
 # Views for mentors
 @login_required
+@read_only
 def mentor_filter_list(request):
     """ Function based view to render the list of current year mentors, with a filter. """
-    mentor_list = Mentor.objects.filter(year=CURRENT_YEAR, is_active=True).order_by('student__name')
+    mentor_list = Mentor.objects.filter(year=CURRENT_YEAR, is_active=True).with_nb_contracts().order_by('student__name')
     mentor_filter = MentorFilter(request.GET, queryset=mentor_list)
-    return render(request, 'pymentorat/mentor_list.html', {'filter': mentor_filter})
+    page = KeysetPaginator(mentor_filter.qs, ('student__name', 'pk')).get_page(request.GET)
+    context = {
+        'filter': mentor_filter,
+        'page': page,
+        'nb_active': get_totals(CURRENT_YEAR)['nb_mentors'],
+    }
+    return render(request, 'pymentorat/mentor_list.html', context)
 
 @login_required
+@read_only
+@conditional_get(mentor_validators)
 def mentor_details(request, id_mentor):
     """ Function based view to edit an EDA. """
-    mentor = get_object_or_404(Mentor, pk=id_mentor)
-    contract_list = Contract.objects.filter(mentor=mentor, year=CURRENT_YEAR)
+    mentor = get_object_or_404(Mentor.objects.select_related('student', 'teacher', 'discipline'), pk=id_mentor)
+    contract_list = Contract.objects.filter(mentor=mentor, year=CURRENT_YEAR).select_related(*CONTRACT_RELATED)
     context = {
         'mentor_pk' : mentor.pk,
         'mentor_name': mentor.student.name,
@@ -197,33 +199,42 @@ def mentor_update(request, id_mentor):
 
 # Views for EDAs
 @login_required
+@read_only
 def eda_filter_list(request):
     """ Function based view to render the list of current year EDAs, with a filter. """
-    eda_list = EDA.objects.filter(year=CURRENT_YEAR, is_active=True).order_by('inscription_date')
+    eda_list = EDA.objects.filter(year=CURRENT_YEAR, is_active=True).with_nb_contracts().order_by('inscription_date')
     eda_filter = EDAFilter(request.GET, queryset=eda_list)
     context = {
         'filter': eda_filter,
-        'title': "Liste des élèves demandeurs d'aide"
+        'page': KeysetPaginator(eda_filter.qs, ('inscription_date', 'pk')).get_page(request.GET),
+        'title': "Liste des élèves demandeurs d'aide",
+        'can_export': True,
+        'nb_active': get_totals(CURRENT_YEAR)['nb_edas'],
     }
     return render(request, 'pymentorat/eda_list.html', context)
 
 
 @login_required
+@read_only
 def eda_filter_nomentor_list(request):
-    """ Function based view to render the list of current year EDAs waiting for a mentor, with a filter. """
-    eda_list = EDA.objects.filter(contract__end_date=None, year=CURRENT_YEAR, is_active=True).order_by('inscription_date')
+    """ Function based view to render the queue of current year EDAs waiting for a mentor, with a filter. """
+    eda_list = EDA.objects.filter(year=CURRENT_YEAR).waiting().with_queue_position()
+    eda_list = eda_list.select_related('student', 'teacher', 'discipline').order_by('inscription_date')
     eda_filter = EDAFilter(request.GET, queryset=eda_list)
     context = {
         'filter': eda_filter,
+        'page': KeysetPaginator(eda_filter.qs, ('inscription_date', 'pk')).get_page(request.GET),
         'title': "EDA sans mentor"
     }
-    return render(request, 'pymentorat/eda_list.html', context)
+    return render(request, 'pymentorat/eda_waiting_list.html', context)
 
 @login_required
+@read_only
+@conditional_get(eda_validators)
 def eda_details(request, id_eda):
     """ Function based view to edit an EDA. """
-    eda = get_object_or_404(EDA, pk=id_eda)
-    contract_list = Contract.objects.filter(eda=eda, year=CURRENT_YEAR)
+    eda = get_object_or_404(EDA.objects.select_related('student', 'teacher', 'discipline'), pk=id_eda)
+    contract_list = Contract.objects.filter(eda=eda, year=CURRENT_YEAR).select_related(*CONTRACT_RELATED)
     context = {
         'eda_pk' : eda.pk,
         'eda_name': eda.student.name,
@@ -294,12 +305,17 @@ def eda_update(request, id_eda):
 
 # Views for contracts
 @login_required
+@read_only
 def contract_filter_list(request):
     """ Function based view to render the list of current year contracts, with a filter. """
     contract_list = Contract.objects.filter(year=CURRENT_YEAR).order_by('begin_date')
     contract_filter = ContractFilter(request.GET, queryset=contract_list)
+    paginator = KeysetPaginator(contract_filter.qs.select_related(*CONTRACT_RELATED), ('begin_date', 'pk'))
+    page = paginator.get_page(request.GET)
+    link_contract_tree(page.object_list, contract_filter.qs.db)
     context = {
         'filter': contract_filter,
+        'page': page,
         'current_year': 2018
     }
     return render(request, 'pymentorat/contract_list.html', context)
@@ -325,6 +341,19 @@ def contract_create_from_eda(request, id_eda):
     context['form'] = form
     return render(request,'pymentorat/contract_form.html',context=context)
 
+@login_required
+def contract_matching(request):
+    """ Function based view to propose mentors for the waiting EDAs, and to create the selected contracts. """
+    if request.method == 'POST':
+        pairs = []
+        for value in request.POST.getlist('pair'):
+            eda_id, separator, mentor_id = value.partition(':')
+            if eda_id.isdigit() and mentor_id.isdigit():
+                pairs.append((int(eda_id), int(mentor_id)))
+        create_contracts(pairs)
+        return redirect('pymentorat:contract_list')
+    return render(request, 'pymentorat/matching.html', {'proposals': propose_matching()})
+
 @login_required
 def contract_duplicate(request, id_contract):
     """ Function based view to create a contract. """
@@ -440,301 +469,146 @@ def convocation_delete(request, id_convocation):
 
 
 
-@login_required
-def contract_pdf(request, id_contract):
-    contract = get_object_or_404(Contract, pk=id_contract)
-    response = HttpResponse(content_type='application/pdf')
-    filename = "contrat_mentorat_{0}_{1}.pdf".format(slugify(contract.eda.student.name), slugify(contract.mentor.student.name))
+def _pdf_response(draw, document, filename, cache_key):
+    """ Serve the document from the PDF cache, rendering it if needed.
+
+    Without cache, stream the chunks written by the canvas, without copying them.
+    """
+    cache = pdf_cache.get_cache()
+    path = cache.get(cache_key) if cache else None
+    if path is not None:
+        try:
+            return FileResponse(open(path, 'rb'), as_attachment=True, filename=filename,
+                                content_type='application/pdf')
+        except FileNotFoundError:
+            # Evicted in the meantime
+            pass
+
+    sink = pdf.ChunkSink()
+    with metrics.timer('pdf'):
+        p = pdf.new_canvas(sink)
+        draw(p, document)
+        p.save()
+    chunks = sink.drain()
+    if cache:
+        cache.put(cache_key, chunks)
+
+    response = StreamingHttpResponse(chunks, content_type='application/pdf')
+    response['Content-Length'] = sum(len(chunk) for chunk in chunks)
     response['Content-Disposition'] = "attachment;filename={0}".format(filename)
-
-    buffer = BytesIO()
-
-    registerFont(TTFont('Arial', 'pymentorat/static/fonts/Arial.ttf'))
-    registerFont(TTFont('Arial-Bold', 'pymentorat/static/fonts/Arial Bold.ttf'))
-
-    logo = ImageReader('pymentorat/static/img/logo_texte_adresse.png')
-    logo_scale = 0.1
-    logo_width = 1075*logo_scale
-    logo_height = 544*logo_scale
-
-    p = canvas.Canvas(buffer, pagesize=landscape(A4))
-    height, width  = A4
-    head = 2.5*cm
-    foot = 2*cm
-    left=1*cm
-
-    right=2*cm
-
-    def xpos(x):
-        return x*cm+left
-
-    def ypos(y):
-        return -y*cm-head
-
-    # p = canvas.Canvas(response, pagesize=landscape(A4))
-    p.translate(0,height)
-
-    p.setFont("Arial-Bold", 18)
-
-    p.drawImage(logo, xpos(0), ypos(0), logo_width, logo_height, anchor='sw', anchorAtXY=True, showBoundary=False)
-
-    p.drawCentredString(width/4, ypos(1), "Contrat de Mentorat" )
-
-    p.setFont("Arial", 9)
-    p.drawCentredString(width / 4, ypos(1.5), "(A conserver en parfait état)")
-
-    p.line(xpos(0), ypos(2), width / 2 - 1 * cm, ypos(2))
-
-    p.setFont("Arial-Bold", 12)
-    p.drawString(xpos(0), ypos(2.5), "Branche :")
-    p.setFont("Arial", 11)
-    p.drawString(xpos(4.5), ypos(2.5), "{branche}".format(branche=contract.discipline))
-
-    p.line(xpos(0), ypos(3), width / 2 - 1 * cm, ypos(3))
-
-    p.setFont("Arial-Bold", 12)
-    p.drawString(xpos(0), ypos(3.5), "Mentor : ")
-
-    p.setFont("Arial", 11)
-    p.drawString(xpos(4.5), ypos(3.5), "{nom} {prenom} ({classe})".format(nom=contract.mentor.student.name,
-                                                                          prenom=contract.mentor.student.vorname,
-                                                                          classe=contract.mentor.student.classe
-                                                                         ))
-
-    p.setFont("Arial", 10)
-    p.drawString(xpos(0.5), ypos(4.5), "Port. : {natel}".format(natel=contract.mentor.student.portable ))
-    p.drawString(xpos(4.5), ypos(4.5),"Email : {email}".format(email=contract.mentor.student.email))
-
-    p.line(xpos(0), ypos(5), width / 2 - 1 * cm, ypos(5))
-
-    p.setFont("Arial-Bold", 12)
-    p.drawString(xpos(0), ypos(5.5), "Demandeur d'aide :")
-    p.setFont("Arial", 11)
-    p.drawString(xpos(4.5), ypos(5.5), "{nom} {prenom} ({classe})".format(nom=contract.eda.student.name,
-                                                                         prenom=contract.eda.student.vorname,
-                                                                         classe=contract.eda.student.classe
-                                                                         ))
-    p.setFont("Arial", 10)
-    p.drawString(xpos(0.5), ypos(6.5), "Port. : {natel}".format(natel=contract.eda.student.portable))
-    p.drawString(xpos(4.5), ypos(6.5), "Email : {email}".format(email=contract.eda.student.email))
-
-
-
-    p.line(xpos(0), ypos(7), width / 2 - 1 * cm, ypos(7))
-
-    p.drawString(xpos(0), ypos(8), "Date et lieu : Cheseaux-Noréaz, le ")
-    p.drawString(xpos(6), ypos(8), "...........................................")
-    p.drawString(xpos(0), ypos(9), "Signature du mentor")
-    p.drawString(xpos(6), ypos(9), "...........................................")
-
-    p.drawString(xpos(0), ypos(10), "Signature du demandeur")
-    p.drawString(xpos(6), ypos(10), "...........................................")
-
-    p.line(xpos(0), ypos(10.5), width / 2 - 1 * cm, ypos(10.5))
-
-    p.setFont("Arial-Bold", 12)
-    p.drawString(xpos(0), ypos(11.5), "Signatures de la responsable du mentorat (S. Amy) :")
-
-    p.setFont("Arial", 11)
-    p.drawString(xpos(0), ypos(12.5), "Avant la première séance")
-    p.drawString(xpos(6), ypos(12.5), "...........................................")
-
-    p.drawString(xpos(0), ypos(13.5), "Après la dernière séance")
-    p.drawString(xpos(6), ypos(13.5), "...........................................")
-
-
-
-    p.line(xpos(0), ypos(14), width / 2 - 1 * cm, ypos(14))
-    p.setFont("Arial-Bold", 11)
-    p.drawString(xpos(0), ypos(15), "A remettre au secrétariat en fin de contrat, avec les deux signatures")
-    p.drawString(xpos(0), ypos(15.5), "de la responsable, pour l'obtention de l'aide à la formation.")
-
-
-    # sepéaration
-    p.line(width / 2, -0.5*cm , width / 2, -height + 0.5*cm)
-
-    # Page 2
-    head = 2 * cm
-
-    p.setFont("Arial-Bold", 18)
-
-    p.drawCentredString(3*width / 4, ypos(0), "Fiche de suivi")
-
-    p.setFont("Arial", 11)
-    p.drawCentredString(3 * width / 4, ypos(1), "A remplir à l'issue de chaque séance.")
-
-    p.line(width / 2 + 1 * cm, ypos(1.5), width - 1 * cm, ypos(1.5))
-
-    p.line(width / 2 + 1 * cm, ypos(2.5), width - 1 * cm, ypos(2.5))
-    p.line(width / 2 + 1 * cm, ypos(5), width - 1 * cm, ypos(5))
-    p.line(width / 2 + 1 * cm, ypos(7.5), width - 1 * cm, ypos(7.5))
-    p.line(width / 2 + 1 * cm, ypos(10), width - 1 * cm, ypos(10))
-    p.line(width / 2 + 1 * cm, ypos(12.5), width - 1 * cm, ypos(12.5))
-    p.line(width / 2 + 1 * cm, ypos(15), width - 1 * cm, ypos(15))
-    p.line(width / 2 + 1 * cm, ypos(17.5), width - 1 * cm, ypos(17.5))
-
-    p.line(width / 2 + 1 * cm, ypos(1.5), width / 2 + 1 * cm, ypos(17.5))
-    p.line(width / 2 + 2.5 * cm, ypos(1.5), width / 2 + 2.5 * cm, ypos(17.5))
-    p.line(width / 2 + 11 * cm, ypos(1.5), width / 2 + 11 * cm, ypos(17.5))
-    p.line(width - 1 * cm, ypos(1.5), width - 1 * cm, ypos(17.5))
-
-    p.setFont("Arial", 11)
-    p.drawString(width / 2 + xpos(0.1), ypos(2), "Dates")
-    p.drawString(width / 2 + xpos(1.6), ypos(2), "Sujets abordés")
-    p.drawString(width / 2 + xpos(10.1), ypos(2), "Signatures")
-    p.drawString(width / 2 + xpos(0.1), ypos(3), "1.")
-    p.drawString(width / 2 + xpos(0.1), ypos(5.5), "2.")
-    p.drawString(width / 2 + xpos(0.1), ypos(8), "3.")
-    p.drawString(width / 2 + xpos(0.1), ypos(10.5), "4.")
-    p.drawString(width / 2 + xpos(0.1), ypos(13), "5.")
-    p.drawString(width / 2 + xpos(0.1), ypos(15.5), "6.")
-
-    p.showPage()
-    p.save()
-
-    pdf = buffer.getvalue()
-    buffer.close()
-
-    response.write(pdf)
-
     return response
 
 @login_required
-def convocation_pdf(request, id_convocation):
-    convocation = get_object_or_404(Convocation, pk=id_convocation)
-    response = HttpResponse(content_type='application/pdf')
-    filename = "convocation_mentorat_{0}_{1}.pdf".format(slugify(convocation.contract.eda.student.name),
-                                                   slugify(convocation.contract.mentor.student.name))
-    response['Content-Disposition'] = "attachment;filename={0}".format(filename)
-
-    eda = convocation.contract.eda
-    mentor = convocation.contract.mentor
-
-
-    buffer = BytesIO()
-
-    registerFont(TTFont('Arial', 'pymentorat/static/fonts/Arial.ttf'))
-    registerFont(TTFont('Arial-Bold', 'pymentorat/static/fonts/Arial Bold.ttf'))
-
-    logo = ImageReader('pymentorat/static/img/logo_texte_adresse.png')
-    logo_scale = 0.1
-    logo_width = 1075*logo_scale
-    logo_height = 544*logo_scale
-
-    p = canvas.Canvas(buffer, pagesize=landscape(A4))
-    height, width  = A4
-    head = 2.5*cm
-    foot = 2*cm
-    left=1*cm
-
-    right=2*cm
-
-
-
-    p.translate(0,height)
-
-    def page(dest, head, left):
-        def xpos(x):
-            return x * cm + left
-
-        def ypos(y):
-            return -y * cm - head
-
-        p.setFont("Arial-Bold", 18)
-
-        p.drawImage(logo, xpos(0), ypos(0), logo_width, logo_height, anchor='sw', anchorAtXY=True, showBoundary=False)
-
-        p.setFont("Arial", 10)
-        p.drawString(xpos(7), ypos(0), "Cheseaux-Noréaz, le {0}".format(date.today().strftime('%d.%m.%Y')))
-
-        p.setFont("Arial-Bold", 18)
-        p.drawCentredString(xpos(6.5), ypos(1.5), "Convocation" )
-
-        p.setFont("Arial", 18)
-        p.drawString(xpos(0), ypos(3), "{0} {1} ({2})".format(dest.student.vorname, dest.student.name, dest.student.classe))
-
-        p.setFont("Arial", 14)
-        p.drawString(xpos(0), ypos(5), "Concerne : Contrat de mentorat")
-
-        p.setFont("Arial", 14)
-        p.drawString(xpos(0), ypos(7), "Merci de vous présenter {0}".format(convocation.place.casefold()))
-        p.drawString(xpos(5.45), ypos(8), "le {0} à {1}".format(convocation.date.strftime('%A %d.%m.%Y'),
-                                                                convocation.time.strftime('%H:%M')))
-
-        if (convocation.message != None):
-            p.drawString(xpos(0), ypos(10),"{0}".format(convocation.message))
-
-        p.drawCentredString(xpos(8), ypos(13), "Sandrine Amy")
-        p.drawCentredString(xpos(8), ypos(14), "Responsable du mentorat")
-
-    page(eda, head, left)
-
-    # sepéaration
-    p.line(width / 2, -0.5 * cm, width / 2, -height + 0.5 * cm)
+@read_only
+@conditional_get(contract_validators)
+def contract_pdf(request, id_contract):
+    """ Function based view to print a contract. """
+    contract = get_object_or_404(Contract.objects.select_related('eda__student', 'mentor__student', 'discipline'),
+                                 pk=id_contract)
+    return _pdf_response(pdf.draw_contract, contract, pdf.contract_filename(contract),
+                         pdf_cache.contract_key(contract))
 
-    # Page 2
+@login_required
+@read_only
+@conditional_get(convocation_validators)
+def convocation_pdf(request, id_convocation):
+    """ Function based view to print a convocation. """
+    convocation = get_object_or_404(Convocation.objects.select_related('contract__eda__student',
+                                                                       'contract__mentor__student'),
+                                    pk=id_convocation)
+    return _pdf_response(pdf.draw_convocation, convocation, pdf.convocation_filename(convocation),
+                         pdf_cache.convocation_key(convocation))
+
+def _bulk_pdf_response(request, kind, documents, basename):
+    """ Stream the documents as a ZIP archive, or as a single PDF with ?format=pdf """
+    output_format = 'pdf' if request.GET.get('format') == 'pdf' else 'zip'
+    content_type = 'application/pdf' if output_format == 'pdf' else 'application/zip'
+    response = StreamingHttpResponse(pdf_export.stream_documents(kind, documents, output_format),
+                                     content_type=content_type)
+    response['Content-Disposition'] = "attachment;filename={0}.{1}".format(basename, output_format)
+    return response
 
-    page(mentor, head, width/2 + left)
+@login_required
+@read_only
+def contract_pdf_bulk(request):
+    """ Function based view to print the selected contracts (?id=...), or the filtered contracts of the current year. """
+    contract_list = Contract.objects.filter(year=CURRENT_YEAR).order_by('begin_date')
+    ids = [pk for pk in request.GET.getlist('id') if pk.isdigit()]
+    if ids:
+        contract_list = contract_list.filter(pk__in=ids)
+    contract_filter = ContractFilter(request.GET, queryset=contract_list)
+    contracts = contract_filter.qs.select_related('eda__student', 'mentor__student', 'discipline').iterator()
+    return _bulk_pdf_response(request, 'contract', contracts, 'contrats_mentorat')
 
-    p.showPage()
-    p.save()
+@login_required
+@read_only
+def convocation_pdf_bulk(request):
+    """ Function based view to print the selected convocations (?id=...), or all the upcoming ones. """
+    convocation_list = Convocation.objects.filter(date__gt=now()).order_by('date', 'time')
+    ids = [pk for pk in request.GET.getlist('id') if pk.isdigit()]
+    if ids:
+        convocation_list = convocation_list.filter(pk__in=ids)
+    convocations = convocation_list.select_related('contract__eda__student', 'contract__mentor__student').iterator()
+    return _bulk_pdf_response(request, 'convocation', convocations, 'convocations_mentorat')
+
+
+def _export_year_list(request, queryset):
+    """ Filter the rows of the year given by ?year=, the current year by default, or of all the years with ?year=all """
+    year = request.GET.get('year', '')
+    if year == 'all':
+        return queryset
+    return queryset.filter(year=int(year) if year.isdigit() else CURRENT_YEAR)
+
+def _export_response(request, queryset, columns, basename):
+    """ Stream the rows as CSV, or send them as XLSX with ?format=xlsx """
+    headers = exporters.get_headers(columns)
+    rows = exporters.queryset_rows(queryset, columns)
+    if request.GET.get('format') == 'xlsx':
+        # The XLSX file must be complete before it is sent, it is written to a temporary file
+        output = tempfile.TemporaryFile()
+        exporters.write_rows(output, 'xlsx', headers, rows)
+        output.seek(0)
+        return FileResponse(output, as_attachment=True, filename="{0}.xlsx".format(basename))
+    response = StreamingHttpResponse(exporters.stream_csv(headers, rows), content_type='text/csv; charset=utf-8')
+    response['Content-Disposition'] = "attachment;filename={0}.csv".format(basename)
+    return response
 
-    pdf = buffer.getvalue()
-    buffer.close()
+@login_required
+@read_only
+def mentor_export(request):
+    """ Function based view to export the filtered mentors of a year to CSV or XLSX. """
+    mentor_list = _export_year_list(request, Mentor.objects.filter(is_active=True)).order_by('student__name', 'pk')
+    mentor_filter = MentorFilter(request.GET, queryset=mentor_list)
+    return _export_response(request, mentor_filter.qs, exporters.MENTOR_COLUMNS, 'mentors')
 
-    response.write(pdf)
+@login_required
+@read_only
+def eda_export(request):
+    """ Function based view to export the filtered EDAs of a year to CSV or XLSX. """
+    eda_list = _export_year_list(request, EDA.objects.filter(is_active=True)).order_by('inscription_date', 'pk')
+    eda_filter = EDAFilter(request.GET, queryset=eda_list)
+    return _export_response(request, eda_filter.qs, exporters.EDA_COLUMNS, 'eda')
 
-    return response
+@login_required
+@read_only
+def contract_export(request):
+    """ Function based view to export the filtered contracts of a year to CSV or XLSX. """
+    contract_list = _export_year_list(request, Contract.objects.all()).order_by('begin_date', 'pk')
+    contract_filter = ContractFilter(request.GET, queryset=contract_list)
+    return _export_response(request, contract_filter.qs, exporters.CONTRACT_COLUMNS, 'contrats')
 
 
 @login_required
+@read_only
 def statistiques(request):
-    ByBranch = {}
-
-    for disc in Discipline.objects.order_by('name'):
-        studentDisc = EDA.objects.filter(discipline=disc.id);
-
-        # TODO: A ameliorer, meme si pour la taille de la bd, pas necessaire...
-        ByBranch[disc] = {
-            'contracts': Contract.objects.filter(discipline=disc.id).count(),
-            'mentors': Mentor.objects.filter(discipline=disc.id).count(),
-            'eda': studentDisc.count(),
-            'eda1': studentDisc.filter(student__classe__startswith="1").count(),
-            'eda2': studentDisc.filter(student__classe__startswith="2").count(),
-            'eda3': studentDisc.filter(student__classe__startswith="3").count(),
-            'eda1c': studentDisc.filter(student__classe__startswith="1C").count(),
-            'eda2c': studentDisc.filter(student__classe__startswith="2C").count(),
-            'eda3c': studentDisc.filter(student__classe__startswith="3C").count(),
-            'eda1m': studentDisc.filter(student__classe__startswith="1M").count(),
-            'eda2m': studentDisc.filter(student__classe__startswith="2M").count(),
-            'eda3m': studentDisc.filter(student__classe__startswith="3M").count(),
-            'eda4': studentDisc.filter(student__classe__startswith="4").count(),
-        }
-    
-    totaux = {}
-    
-    totaux['eda1c'] = EDA.objects.filter(student__classe__startswith="1C").count();
-    totaux['eda2c'] = EDA.objects.filter(student__classe__startswith="2C").count();
-    totaux['eda3c'] = EDA.objects.filter(student__classe__startswith="3C").count();
-    totaux['eda1m'] = EDA.objects.filter(student__classe__startswith="1M").count();
-    totaux['eda2m'] = EDA.objects.filter(student__classe__startswith="2M").count();
-    totaux['eda3m'] = EDA.objects.filter(student__classe__startswith="3M").count();
-    
-    totaux['eda1'] = totaux['eda1c']+totaux['eda1m'];
-    totaux['eda2'] = totaux['eda2c']+totaux['eda2m'];
-    totaux['eda3'] = totaux['eda3c']+totaux['eda3m'];
-    totaux['eda4'] = EDA.objects.filter(student__classe__startswith="4").count();
-
-    return render(request, 'pymentorat/statistiques.html', {
-        'numberof': {
-            'byBranch': ByBranch,
-            'totaux': totaux,
-            'nbstudents': Student.objects.count(),
-            'nbmentors': Mentor.objects.count(),
-            'nbeda': EDA.objects.count(),
-            'nbcontracts': Contract.objects.count()
-        }
-        })
+    """ Function based view to render the statistics of the mentorat. """
+    context = {
+        'numberof': get_statistics(),
+        'year': CURRENT_YEAR,
+        'current': get_totals(CURRENT_YEAR),
+    }
+    return render(request, 'pymentorat/statistiques.html', context)
+
 # Several test to use Class Based Views (no success)
 
 # class StudentListView(LoginRequiredMixin, ListView):
@@ -795,6 +669,7 @@ def statistiques(request):
 #         'remark'
 #     ]
 
+@method_decorator(read_only, name='dispatch')
 class SimpleContractListView(LoginRequiredMixin, ListView):
     model = Contract
     fields = [